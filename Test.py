@@ -1,140 +1,73 @@
 import tkinter as tk
 from tkinter import ttk, messagebox
-import random
-import json
+import atexit
 import os
-from datetime import datetime
-
-# --- Sistem Elemen ---
-element_system = {
-    "Solar": {"weakness": "Taufan", "strength": "Halilintar", "color": "#ff6b35", "icon": "☀️"},
-    "Taufan": {"weakness": "Gempa", "strength": "Solar", "color": "#4ecdc4", "icon": "🌪️"},
-    "Gempa": {"weakness": "Halilintar", "strength": "Taufan", "color": "#8b4513", "icon": "🌋"},
-    "Halilintar": {"weakness": "Solar", "strength": "Gempa", "color": "#ffd700", "icon": "⚡"}
-}
-
-# --- Expanded Player Classes ---
-classes = {
-    "Warrior": {
-        "hp": 110, "attack": 15, "defense": 8, "speed": 5, "potions": 3, 
-        "special_ability": "Power Strike", "elemen": "Halilintar",
-        "description": "Tanky warrior with high HP and defense"
-    },
-    "Mage": {
-        "hp": 80, "attack": 25, "defense": 3, "speed": 8, "potions": 4, 
-        "special_ability": "Fireball", "elemen": "Solar",
-        "description": "Powerful spellcaster with high attack"
-    },
-    "Archer": {
-        "hp": 100, "attack": 18, "defense": 5, "speed": 12, "potions": 3, 
-        "special_ability": "Multi-Shot", "elemen": "Gempa",
-        "description": "Fast ranged attacker with high speed"
-    },
-    "Rogue": {
-        "hp": 90, "attack": 20, "defense": 4, "speed": 15, "potions": 3, 
-        "special_ability": "Backstab", "elemen": "Taufan",
-        "description": "Agile assassin with critical strikes"
-    }
-}
-
-# --- Enemy Types ---
-enemy_types = {
-    "Goblin": {"hp_range": (20, 30), "attack_range": (4, 8), "defense_range": (2, 4), "xp": 15, "gold": 5, "elemen": "Gempa"},
-    "Orc": {"hp_range": (40, 60), "attack_range": (8, 12), "defense_range": (5, 8), "xp": 25, "gold": 10, "elemen": "Gempa"},
-    "Bandit": {"hp_range": (30, 45), "attack_range": (6, 10), "defense_range": (3, 6), "xp": 20, "gold": 8, "elemen": "Taufan"},
-    "Slime": {"hp_range": (25, 35), "attack_range": (3, 6), "defense_range": (1, 3), "xp": 10, "gold": 3, "elemen": "Solar"},
-    "Skeleton": {"hp_range": (35, 50), "attack_range": (7, 11), "defense_range": (4, 7), "xp": 22, "gold": 7, "elemen": "Halilintar"},
-    "Dragon": {"hp_range": (100, 150), "attack_range": (15, 25), "defense_range": (10, 15), "xp": 100, "gold": 50, "elemen": "Solar"},
-    "Elemental": {"hp_range": (50, 70), "attack_range": (10, 15), "defense_range": (6, 9), "xp": 35, "gold": 15, "elemen": "Random"}
-}
-
-# --- Items Shop ---
-shop_items = {
-    "Healing Potion": {"price": 10, "type": "consumable", "effect": "heal"},
-    "Strength Elixir": {"price": 20, "type": "consumable", "effect": "strength"},
-    "Bomb": {"price": 15, "type": "consumable", "effect": "damage"},
-    "Iron Sword": {"price": 50, "type": "weapon", "attack_bonus": 5},
-    "Steel Armor": {"price": 60, "type": "armor", "defense_bonus": 5},
-    "Magic Amulet": {"price": 80, "type": "accessory", "hp_bonus": 20},
-    "Elemental Crystal": {"price": 100, "type": "special", "effect": "element_boost"},
-    "Phoenix Down": {"price": 150, "type": "consumable", "effect": "revive"}
-}
-
-# --- Elemental Skills ---
-elemental_skills = {
-    "Solar": ["Tembakan Solar", "Pedang Solar", "Tembakan Solar Maksimal"],
-    "Taufan": ["Pelindung Taufan", "Puting Beliung", "Naga Taufan"],
-    "Gempa": ["Tanah Tinggi", "Golem Tanah", "Naga Tanah"],
-    "Halilintar": ["Pedang Halilintar", "Tebasan Kilat", "Hujan Halilintar"]
-}
+import time
+from collections import deque
+from functools import partial
+
+from diagnostics import MemoryMonitor, Profiler
+from rpg_advisor import Advisor
+from rpg_engine import (BattleEngine, element_system, classes, shop_items, elemental_skills,
+                        new_player, new_enemy, new_game_state,
+                        LOG, STATUS, GAME_OVER, REVIVED, HIT, LEVEL_UP)
+from rpg_history import History
+from rpg_log import BattleLog, PAGE_LINES
+from rpg_observable import Model, Bindings
+from rpg_odds import preview
+from rpg_save import SaveSlots, format_playtime
+from rpg_scenes import SceneManager
+from rpg_telemetry import Telemetry
+
+LOG_WIDGET_LINES = 300  # lines kept in the battle log widget; older ones are in 📜 History
+LOG_ARCHIVE_FILE = os.environ.get("RPG_LOG_ARCHIVE", "battle_log.jsonl")  # empty disables
+# Player fields the engine mutates in place, so Model cannot see the change
+NESTED_PLAYER_FIELDS = ("inventory", "equipment", "element_mastery", "skills")
+AUTOSAVE_TURNS = int(os.environ.get("RPG_AUTOSAVE", "0"))  # journal every turn, snapshot every N; 0 = off
+ADVISOR_CACHE_FILE = "advisor_cache.json"  # opening moves found by the advisor
+AUTO_BATTLE_DELAY_MS = 30  # pause between auto-battle turns (each search takes up to 50 ms)
+STEP_DELAY_MS = int(os.environ.get("RPG_STEP_DELAY_MS", "150"))  # pause between the steps of a turn; 0 = no pacing
+QUEUED_ACTIONS = 2  # clicks remembered while a turn plays out; more replace the newest
+ACTION_NAMES = {("attack", None): "Attack", ("special", None): "Special", ("elemental", None): "Elemental",
+                ("heal", None): "Heal", ("flee", None): "Flee"}
 
 class RPGGame:
     def __init__(self):
-        self.initialize_game()
-        
-    def initialize_game(self):
-        # Player setup
-        self.player = {
-            "name": "Hero",
-            "class": None,
-            "elemen": None,
-            "hp": 0,
-            "max_hp": 0,
-            "attack": 0,
-            "base_attack": 0,
-            "defense": 0,
-            "base_defense": 0,
-            "speed": 0,
-            "level": 1,
-            "xp": 0,
-            "xp_to_next": 100,
-            "gold": 50,
-            "inventory": {
-                "Healing Potion": 3,
-                "Strength Elixir": 1,
-                "Bomb": 1
-            },
-            "equipment": {
-                "weapon": None,
-                "armor": None,
-                "accessory": None
-            },
-            "buff_turns": 0,
-            "special_cooldown": 0,
-            "elemental_charge": 0,
-            "skills": [],
-            "quests": [],
-            "location": "Forest",
-            "element_mastery": {"Solar": 0, "Taufan": 0, "Gempa": 0, "Halilintar": 0}
-        }
-
-        # Enemy setup
-        self.enemy = {
-            "name": "Goblin",
-            "hp": 0,
-            "max_hp": 0,
-            "attack": 0,
-            "defense": 0,
-            "level": 1,
-            "type": "Goblin",
-            "elemen": None,
-            "gold": 0
-        }
-
-        # Game state
-        self.game_state = {
-            "current_turn": "player",
-            "battle_log": [],
-            "game_active": True,
-            "boss_defeated": False,
-            "day": 1,
-            "elemental_events": []
-        }
-        
+        # One Tk root for the whole run; screens are frames swapped by the scene manager
+        self.root = tk.Tk()
+        self.root.title("⚔️ Enhanced RPG with Element System ⚔️")
+        self.root.configure(bg="#2c2f33")
+        self.scenes = SceneManager(self.root, bg="#2c2f33")
+        self.scenes.add("class_select", self.build_class_selection)
+        self.scenes.add("battle", self.build_battle_scene)
+        self.scenes.add("game_over", self.build_game_over)
+
+        # The state dicts are observable models that outlive a single game, so
+        # widgets bound to them are reused by the next one
+        self.player = Model()
+        self.enemy = Model()
+        self.game_state = Model()
+        self.bindings = Bindings(self.root)
+        self.slots = SaveSlots()
+        self.engine = None
+        self.advisor = Advisor(cache_path=ADVISOR_CACHE_FILE)
+        atexit.register(self.advisor.save)
+        self.auto_job = None
+        self.auto_battle = False
+        self.actions = deque()     # (action, item) clicked but not started yet
+        self.step_job = None       # pending run_pipeline call
+        self.fast_forward = False  # finish the current turn without pacing
+        # Opt-in JSONL telemetry (RPG_TELEMETRY=path, see rpg_telemetry.py)
+        self.telemetry = Telemetry.from_env()
+        self.turn_stats = None     # what the turn being played has done so far, when recorded
+
         # GUI references
-        self.root = None
+        self.windows = {}         # name -> Toplevel, kept for the whole run
+        self.window_refresh = {}  # name -> function that updates it in place
+        self.widget_state = {}    # widget path -> last options passed to config
         self.player_hp_label = None
         self.enemy_hp_label = None
+        self.horde_label = None
         self.player_hp_bar = None
         self.enemy_hp_bar = None
         self.attack_button = None
@@ -143,22 +76,58 @@ class RPGGame:
         self.heal_button = None
         self.item_button = None
         self.flee_button = None
+        self.auto_button = None
         self.log_text = None
+        self.log_flush_job = None
         self.gold_label = None
         self.day_label = None
         self.location_label = None
         self.element_label = None
 
-    def calculate_element_advantage(self, attacker_element, defender_element):
-        if not attacker_element or not defender_element:
-            return 1.0
+        # Opt-in memory monitor for soak tests (see diagnostics.py)
+        self.memwatch = MemoryMonitor.from_env(
+            self.root, "rpg",
+            probes={
+                "battle_log": lambda: len(self.engine.battle_log.recent),
+                "log_widget_lines": lambda: int(self.log_text.index("end-1c").split(".")[0]),
+                "inventory_kinds": lambda: len(self.player["inventory"]),
+                "toplevels": lambda: len(self.root.winfo_children()),
+            },
+            classes=("Toplevel", "Label", "Button", "Frame"),
+        )
+        if self.memwatch:
+            self.root.bind("<F6>", lambda e: print(f"Memory dump written to {self.memwatch.dump_top()}"))
+
+        # F5 starts/stops a profiling capture (PROFILE_* settings in diagnostics.py)
+        self.profiler = Profiler.from_env(self.root, "rpg")
+        self.root.bind("<F5>", lambda e: self.profiler.toggle())
+        # Escape drops queued clicks and plays the rest of the turn at once
+        self.root.bind("<Escape>", lambda e: self.skip_ahead())
+        # Tab aims at the next enemy of a group (instead of moving the keyboard focus)
+        self.root.bind("<Tab>", lambda e: self.next_target() or "break")
+        # Ctrl+Z takes back a turn in practice mode (RPG_REWIND=turns, see rpg_history.py)
+        self.root.bind("<Control-z>", lambda e: self.rewind())
+
+        self.initialize_game()
         
-        element_info = element_system[attacker_element]
-        if element_info["strength"] == defender_element:
-            return 1.5  # Advantage
-        elif element_info["weakness"] == defender_element:
-            return 0.5  # Disadvantage
-        return 1.0  # Neutral
+    def initialize_game(self):
+        # Rules and state live in the headless engine; this class only renders it
+        self.player.reset(new_player())
+        self.enemy.reset(new_enemy())
+        self.game_state.reset(new_game_state())
+        self.engine = BattleEngine(player=self.player, enemy=self.enemy, game_state=self.game_state,
+                                   log=BattleLog(archive_path=LOG_ARCHIVE_FILE or None))
+        self.engine.defer()  # turns are played step by step by run_pipeline
+        self.engine.subscribe(self.on_engine_event)
+        self.turn_history = History.from_env(self.engine)  # None unless practice mode is on
+        self.slot = None   # save slot of this game, picked on the first save
+        self.saves = None  # SaveStore for that slot
+        self.turns = 0
+        self.clock = time.time()  # playtime counted up to here
+        self.pending_log = []  # messages waiting for the next widget flush
+
+    def calculate_element_advantage(self, attacker_element, defender_element):
+        return self.engine.calculate_element_advantage(attacker_element, defender_element)
 
     def get_element_color(self, element):
         return element_system.get(element, {}).get("color", "white")
@@ -166,255 +135,351 @@ class RPGGame:
     def get_element_icon(self, element):
         return element_system.get(element, {}).get("icon", "⚡")
 
+    def bind_status(self):
+        # Each widget is redrawn only when one of the fields it shows has changed,
+        # at most once per idle cycle (see rpg_observable.py)
+        player, enemy = self.player, self.enemy
+        watch = self.bindings.watch
+
+        watch(player, ("hp", "max_hp"), lambda: self.player_hp_bar.config(
+            maximum=player["max_hp"], value=player["hp"]))
+        watch(enemy, ("hp", "max_hp"), lambda: self.enemy_hp_bar.config(
+            maximum=enemy["max_hp"], value=enemy["hp"]))
+        watch(player, ("elemen", "name", "class", "level", "hp", "max_hp", "xp", "xp_to_next"),
+              lambda: self.player_hp_label.config(
+                  text=f"{self.get_element_icon(player['elemen'])} {player['name']} ({player['class']}) - Lvl {player['level']} | HP: {player['hp']}/{player['max_hp']} | XP: {player['xp']}/{player['xp_to_next']}"))
+        watch(enemy, ("elemen", "name", "level", "hp", "max_hp"), lambda: self.enemy_hp_label.config(
+            text=f"{self.get_element_icon(enemy['elemen'])} {enemy['name']} (Lvl {enemy['level']}) HP: {enemy['hp']}/{enemy['max_hp']}"))
+        # "horde" is marked on every STATUS: the rest of a group is not a model of its own
+        watch(enemy, ("horde",), self.update_horde)
+        watch(player, ("gold",), lambda: self.gold_label.config(text=f"Gold: {player['gold']}"))
+        watch(self.game_state, ("day",), lambda: self.day_label.config(text=f"Day: {self.game_state['day']}"))
+        watch(player, ("location",), lambda: self.location_label.config(text=f"Location: {player['location']}"))
+        watch(player, ("elemen", "elemental_charge"), lambda: self.element_label.config(
+            text=f"Element: {player['elemen']} | Charge: {player['elemental_charge']}/100"))
+        # one update object for both models, so a turn redraws the odds once
+        update_odds = self.update_odds
+        watch(player, ("hp", "attack", "defense", "speed", "elemen", "elemental_charge", "special_cooldown"), update_odds)
+        watch(enemy, ("hp", "attack", "defense", "elemen"), update_odds)
+
+    def update_odds(self):
+        if not self.engine.can_act():
+            self.odds_label.config(text="")
+            return
+        odds = preview(self.engine)
+        parts = []
+        for action, icon in (("attack", "⚔️"), ("special", "✨"), ("elemental", "🌠")):
+            if action in odds:
+                parts.append(f"{icon} {self.format_damage(odds[action])} KO now {odds[action].kill_chance(1):.0%}, "
+                             f"~{odds[action].median_turns() or '99+'} turns")
+        enemy = odds["enemy"]
+        if len(self.engine.horde) > 1:
+            parts.append(f"👹 target {self.format_damage(enemy)} {len(self.engine.horde)} enemies attacking")
+        else:
+            parts.append(f"👹 {self.format_damage(enemy)} beats you in ~{enemy.median_turns() or '99+'} turns")
+        self.odds_label.config(text="   ".join(parts))
+
+    def update_horde(self):
+        # one line for the whole group, redrawn once per turn however many enemies it has
+        horde = self.engine.horde
+        if len(horde) < 2:
+            self.set_widget(self.horde_label, text="")
+            return
+        groups = ", ".join(f"{name} x{count} ({hp} HP)" if count > 1 else f"{name} ({hp} HP)"
+                           for name, count, hp in horde.groups())
+        self.set_widget(self.horde_label, text=f"👹 {len(horde)} enemies: {groups}   [Tab: next target]")
+
+    def next_target(self):
+        if not self.engine.steps:  # not while a turn is playing out
+            self.engine.next_target()
+
+    def format_damage(self, odds):
+        lo, hi = odds.damage_range()
+        return f"{lo} dmg," if lo == hi else f"{lo}-{hi} dmg,"
+
     def update_status(self):
-        if self.player_hp_bar:
-            self.player_hp_bar["maximum"] = self.player["max_hp"]
-            self.player_hp_bar["value"] = self.player["hp"]
-            self.enemy_hp_bar["maximum"] = self.enemy["max_hp"]
-            self.enemy_hp_bar["value"] = self.enemy["hp"]
-
-            element_icon = self.get_element_icon(self.player["elemen"])
-            self.player_hp_label.config(
-                text=f"{element_icon} {self.player['name']} ({self.player['class']}) - Lvl {self.player['level']} | HP: {self.player['hp']}/{self.player['max_hp']} | XP: {self.player['xp']}/{self.player['xp_to_next']}"
-            )
-            
-            enemy_element_icon = self.get_element_icon(self.enemy["elemen"])
-            self.enemy_hp_label.config(
-                text=f"{enemy_element_icon} {self.enemy['name']} (Lvl {self.enemy['level']}) HP: {self.enemy['hp']}/{self.enemy['max_hp']}"
-            )
-            
-            self.gold_label.config(text=f"Gold: {self.player['gold']}")
-            self.day_label.config(text=f"Day: {self.game_state['day']}")
-            self.location_label.config(text=f"Location: {self.player['location']}")
-            self.element_label.config(text=f"Element: {self.player['elemen']} | Charge: {self.player['elemental_charge']}/100")
+        self.bindings.refresh()
 
     def log_message(self, message):
+        self.engine.log(message)
+
+    def on_engine_event(self, kind, data):
+        if kind == LOG:
+            self.show_log_line(data)
+        elif kind == STATUS:
+            self.player.mark(*NESTED_PLAYER_FIELDS)
+            self.enemy.mark("horde")
+        elif kind == GAME_OVER:
+            self.end_game()
+        elif kind == REVIVED:
+            # back to the fight, as it was left; not start_battle, which would spawn an enemy
+            self.scenes.show("battle", enter=False)
+            self.update_status()
+            self.enable_buttons()
+        elif kind == HIT and self.turn_stats:
+            stats = self.turn_stats
+            stats["dealt" if data["by"] == "player" else "taken"] += data["damage"]
+            stats["crits"] += data["critical"]
+            # an area skill or a group's turn arrives as one batch of hits
+            multipliers = data["multipliers"] if "multipliers" in data else (data["multiplier"],)
+            stats["multipliers"].extend(m for m in multipliers if m != 1.0)
+        elif kind == LEVEL_UP and self.telemetry:
+            self.telemetry.event("level_up", level=data, day=self.game_state["day"])
+
+    def show_log_line(self, message):
+        # Coalesce: everything logged while handling one action lands in a single insert
         if self.log_text:
-            self.log_text.config(state="normal")
-            self.log_text.insert(tk.END, message + "\n")
-            self.log_text.config(state="disabled")
-            self.log_text.see(tk.END)
-            self.game_state["battle_log"].append(message)
+            self.pending_log.append(message)
+            if self.log_flush_job is None:
+                self.log_flush_job = self.root.after_idle(self.flush_log)
+
+    def flush_log(self):
+        self.log_flush_job = None
+        self.engine.battle_log.flush()
+        if not self.pending_log or not self.log_text:
+            return
+        text = "\n".join(self.pending_log[-LOG_WIDGET_LINES:]) + "\n"
+        self.pending_log = []
+        self.log_text.config(state="normal")
+        self.log_text.insert(tk.END, text)
+        excess = int(self.log_text.index("end-1c").split(".")[0]) - LOG_WIDGET_LINES
+        if excess > 0:
+            self.log_text.delete("1.0", f"{excess + 1}.0")
+        self.log_text.config(state="disabled")
+        self.log_text.see(tk.END)
+
+    def open_log_history(self):
+        log = self.engine.battle_log
+        hist_win = tk.Toplevel(self.root)
+        hist_win.title("Battle History")
+        hist_win.geometry("650x500")
+        hist_win.configure(bg="#2c2f33")
+
+        # Only one page is ever in the widget, however long the session has been
+        page_text = tk.Text(hist_win, height=25, width=80, state="disabled", wrap="word",
+                            bg="#1a1a1a", fg="white", font=("Consolas", 9))
+        page_text.pack(fill="both", expand=True, padx=10, pady=10)
+
+        nav_frame = tk.Frame(hist_win, bg="#2c2f33")
+        nav_frame.pack(pady=5)
+        page_label = tk.Label(nav_frame, text="", font=("Arial", 10), bg="#2c2f33", fg="white", width=28)
+        state = {"page": 0}
+
+        def last_page():
+            return max(0, (len(log) - 1) // PAGE_LINES)
+
+        def show_page(page):
+            page = max(0, min(page, last_page()))
+            state["page"] = page
+            lines = log.read(page * PAGE_LINES, PAGE_LINES)
+            first = max(page * PAGE_LINES, log.oldest)
+            page_text.config(state="normal")
+            page_text.delete("1.0", tk.END)
+            page_text.insert(tk.END, "\n".join(lines))
+            page_text.config(state="disabled")
+            page_label.config(text=f"Messages {first + 1}-{first + len(lines)} of {len(log)}")
+
+        for text, target in (("⏮", lambda: 0), ("◀", lambda: state["page"] - 1)):
+            tk.Button(nav_frame, text=text, width=4, command=lambda t=target: show_page(t())).pack(side="left", padx=3)
+        page_label.pack(side="left", padx=5)
+        for text, target in (("▶", lambda: state["page"] + 1), ("⏭", last_page)):
+            tk.Button(nav_frame, text=text, width=4, command=lambda t=target: show_page(t())).pack(side="left", padx=3)
+
+        show_page(last_page())
 
     def calculate_damage(self, attacker, defender, is_special=False, is_elemental=False):
-        base_damage = attacker["attack"]
-        if is_special:
-            base_damage = int(base_damage * 1.5)
-        
-        # Element advantage calculation
-        element_multiplier = 1.0
-        if is_elemental and attacker.get("elemen") and defender.get("elemen"):
-            element_multiplier = self.calculate_element_advantage(attacker["elemen"], defender["elemen"])
-        
-        damage = max(1, int((base_damage - defender["defense"] // 2) * element_multiplier))
-        
-        # Critical hit chance based on speed
-        crit_chance = attacker["speed"] / 100
-        if random.random() < crit_chance:
-            damage = int(damage * 1.5)
-            return damage, True, element_multiplier
-        
-        return damage, False, element_multiplier
+        return self.engine.calculate_damage(attacker, defender, is_special, is_elemental)
 
     def attack(self, is_special=False, is_elemental=False):
-        if not self.game_state["game_active"] or self.player["hp"] <= 0 or self.enemy["hp"] <= 0:
-            return
-
-        if is_special and self.player["special_cooldown"] > 0:
-            self.log_message(f"❌ {classes[self.player['class']]['special_ability']} is on cooldown for {self.player['special_cooldown']} more turns!")
-            return
-
-        if is_elemental and self.player["elemental_charge"] < 30:
-            self.log_message("❌ Not enough elemental charge! Need 30 charge.")
-            return
-
-        damage, is_critical, element_multiplier = self.calculate_damage(self.player, self.enemy, is_special, is_elemental)
-        self.enemy["hp"] = max(0, self.enemy["hp"] - damage)
-        
-        # Element charge generation
-        if not is_elemental:
-            self.player["elemental_charge"] = min(100, self.player["elemental_charge"] + 10)
-        
-        if is_special:
-            ability_name = classes[self.player["class"]]["special_ability"]
-            self.log_message(f"✨ You use {ability_name} on the {self.enemy['name']} for {damage} damage!")
-            self.player["special_cooldown"] = 3
-        elif is_elemental:
-            self.player["elemental_charge"] -= 30
-            skill_name = random.choice(elemental_skills[self.player["elemen"]])
-            element_effect = ""
-            if element_multiplier > 1:
-                element_effect = " 🎯 EFFECTIVE!"
-            elif element_multiplier < 1:
-                element_effect = " 💤 INEFFECTIVE!"
-            self.log_message(f"{self.get_element_icon(self.player['elemen'])} You use {skill_name} for {damage} damage!{element_effect}")
-        else:
-            crit_text = " 💥 CRITICAL!" if is_critical else ""
-            self.log_message(f"⚔️ You strike the {self.enemy['name']} for {damage} damage!{crit_text}")
-
-        # Handle element mastery
-        if is_elemental:
-            self.player["element_mastery"][self.player["elemen"]] += 1
-
-        # Handle buffs
-        if self.player["buff_turns"] > 0:
-            self.player["buff_turns"] -= 1
-            if self.player["buff_turns"] == 0:
-                self.player["attack"] = self.player["base_attack"]
-                self.log_message("💨 Your Strength Elixir effect wore off!")
-
-        # Check if enemy is defeated
-        if self.enemy["hp"] <= 0:
-            gold_earned = self.enemy["gold"]
-            xp_earned = enemy_types[self.enemy["type"]]["xp"] * self.enemy["level"]
-            self.player["gold"] += gold_earned
-            
-            self.log_message(f"🎉 You defeated the {self.enemy['name']}! 🎉")
-            self.log_message(f"💰 You found {gold_earned} gold!")
-            
-            self.gain_xp(xp_earned)
-            self.check_quest_progress(self.enemy["type"])
-            
-            # Chance to find item
-            if random.random() < 0.3:
-                found_item = random.choice(list(shop_items.keys())[:3])
-                self.player["inventory"][found_item] = self.player["inventory"].get(found_item, 0) + 1
-                self.log_message(f"🎁 You found a {found_item}!")
-            
-            # Elemental mastery reward
-            if is_elemental:
-                self.player["element_mastery"][self.player["elemen"]] += 5
-                self.log_message(f"🌟 +5 {self.player['elemen']} Mastery!")
-            
-            self.spawn_enemy()
-        else:
-            self.enemy_turn()
-
-        self.update_status()
+        self.perform("special" if is_special else "elemental" if is_elemental else "attack")
 
     def use_elemental_skill(self):
         self.attack(is_special=False, is_elemental=True)
 
     def heal(self):
-        if not self.game_state["game_active"] or self.player["hp"] <= 0 or self.enemy["hp"] <= 0:
-            return
+        self.perform("heal")
 
-        if self.player["inventory"].get("Healing Potion", 0) > 0:
-            heal_amount = random.randint(15, 25)
-            self.player["hp"] = min(self.player["max_hp"], self.player["hp"] + heal_amount)
-            self.player["inventory"]["Healing Potion"] -= 1
-            self.log_message(f"🧪 You used a Healing Potion and recovered {heal_amount} HP!")
-            
-            if self.player["inventory"]["Healing Potion"] == 0:
-                del self.player["inventory"]["Healing Potion"]
+    def use_item(self, item):
+        self.perform("item", item)
+
+    def perform(self, action, item=None):
+        # Clicks are queued and played by run_pipeline, so they never race a turn in progress
+        if len(self.actions) >= QUEUED_ACTIONS:
+            self.actions[-1] = (action, item)
         else:
-            self.log_message("No Healing Potions left!")
+            self.actions.append((action, item))
+        self.pump()
+
+    def pump(self, delay=0):
+        if self.step_job is None:
+            self.step_job = self.root.after(delay, self.run_pipeline)
+
+    def run_pipeline(self):
+        # One small step per call: the player's move, the enemy's reply, rewards,
+        # a level-up, the next spawn... Tk handles input in between.
+        self.step_job = None
+        engine = self.engine
+        if not engine.steps:
+            if not self.actions:
+                return
+            action, item = self.actions.popleft()
+            if self.turn_history is not None:
+                self.turn_history.capture()
+            engine.steps.append(partial(engine.act, action, item))
+            if self.telemetry and self.telemetry.turn():
+                self.turn_stats = {"action": action, "item": item, "ms": 0.0, "steps": 0,
+                                   "dealt": 0, "taken": 0, "crits": 0, "multipliers": []}
+        if self.turn_stats:
+            started = time.perf_counter()
+            engine.run_step()
+            self.turn_stats["ms"] += (time.perf_counter() - started) * 1000
+            self.turn_stats["steps"] += 1
+        else:
+            engine.run_step()
+        if engine.steps:
+            # pace the turn, unless the player is already clicking ahead
+            fast = self.fast_forward or self.actions or not STEP_DELAY_MS
+            self.pump(0 if fast else STEP_DELAY_MS)
             return
-
-        if self.enemy["hp"] > 0:
-            self.enemy_turn()
-
-        self.update_status()
-
-    def use_item(self, item):
-        if self.player["inventory"].get(item, 0) <= 0:
-            self.log_message(f"❌ You have no {item} left!")
+        self.finish_turn()
+
+    def finish_turn(self):
+        # The turn's last step has run: autosave, telemetry, then the next click or auto move
+        engine = self.engine
+        self.fast_forward = False
+        self.end_turn()
+        if self.turn_stats:
+            stats, self.turn_stats = self.turn_stats, None
+            stats["ms"] = round(stats["ms"], 3)
+            self.telemetry.turn_event("turn", hp=self.player["hp"], enemy=self.enemy["type"],
+                                      level=self.player["level"], day=self.game_state["day"], **stats)
+        if self.actions:
+            self.pump()
+        elif self.auto_battle and engine.can_act():
+            self.auto_job = self.root.after(AUTO_BATTLE_DELAY_MS, self.auto_battle_step)
+
+    def skip_ahead(self):
+        self.actions.clear()
+        if self.engine.steps:
+            self.fast_forward = True
+            if self.step_job:
+                self.root.after_cancel(self.step_job)
+                self.step_job = None
+            self.pump()
+
+    def rewind(self, turns=1):
+        # Only between turns: a snapshot is the state before an action
+        if self.turn_history is None or self.engine.steps:
+            return
+        self.stop_auto_battle()
+        self.actions.clear()
+        was_over = not self.game_state["game_active"]
+        rewound = self.turn_history.rewind(turns)
+        if not rewound:
             return
+        self.log_message(f"⏪ Rewound {rewound} turn{'s' if rewound > 1 else ''}.")
+        if was_over and self.game_state["game_active"]:
+            self.scenes.show("battle", enter=False)  # not start_battle: it would spawn an enemy
+            self.update_status()
+            self.enable_buttons()
+
+    def cancel_turns(self):
+        """Forget queued clicks and unplayed steps, e.g. before loading a save."""
+        self.actions.clear()
+        if self.engine.steps:
+            self.engine.steps.clear()
+        if self.step_job:
+            self.root.after_cancel(self.step_job)
+            self.step_job = None
+        self.fast_forward = False
+        self.turn_stats = None
+
+    def show_hint(self):
+        if not self.engine.can_act():
+            return
+        (action, item), info = self.advisor.suggest(self.engine)
+        how = "opening book" if info["cached"] else f"depth {info['depth']}, {info['ms']:.0f} ms"
+        self.log_message(f"💡 Suggested: {ACTION_NAMES.get((action, item), item)} ({how})")
 
-        if item == "Healing Potion":
-            self.heal()
-        elif item == "Strength Elixir":
-            self.player["attack"] = self.player["base_attack"] + 5
-            self.player["buff_turns"] = 3
-            self.player["inventory"][item] -= 1
-            self.log_message("💪 You used a Strength Elixir! Attack boosted for 3 turns.")
-            if self.enemy["hp"] > 0:
-                self.enemy_turn()
-        elif item == "Bomb":
-            damage = random.randint(15, 25)
-            self.enemy["hp"] = max(0, self.enemy["hp"] - damage)
-            self.player["inventory"][item] -= 1
-            self.log_message(f"💣 You threw a Bomb! {self.enemy['name']} took {damage} damage!")
-            if self.enemy["hp"] > 0:
-                self.enemy_turn()
-            else:
-                gold_earned = self.enemy["gold"]
-                xp_earned = enemy_types[self.enemy["type"]]["xp"] * self.enemy["level"]
-                self.player["gold"] += gold_earned
-                
-                self.log_message(f"🎉 You defeated the {self.enemy['name']}! 🎉")
-                self.log_message(f"💰 You found {gold_earned} gold!")
-                
-                self.gain_xp(xp_earned)
-                self.check_quest_progress(self.enemy["type"])
-                self.spawn_enemy()
-        elif item == "Elemental Crystal":
-            self.player["elemental_charge"] = 100
-            self.player["inventory"][item] -= 1
-            self.log_message(f"💎 Elemental Crystal used! Charge set to 100!")
-        elif item == "Phoenix Down":
-            if self.player["hp"] <= 0:
-                self.player["hp"] = self.player["max_hp"] // 2
-                self.player["inventory"][item] -= 1
-                self.log_message("🕊️ Phoenix Down used! You've been revived!")
-                self.game_state["game_active"] = True
-                self.enable_buttons()
-            else:
-                self.log_message("❌ You can only use Phoenix Down when defeated!")
+    def toggle_auto_battle(self):
+        if self.auto_battle:
+            self.stop_auto_battle()
+        else:
+            self.auto_battle = True
+            self.auto_button.config(text="⏹ Stop")
+            self.auto_job = self.root.after(0, self.auto_battle_step)
+
+    def stop_auto_battle(self):
+        self.auto_battle = False
+        if self.auto_job:
+            self.root.after_cancel(self.auto_job)
+            self.auto_job = None
+        if self.auto_button:
+            self.auto_button.config(text="🤖 Auto")
+
+    def auto_battle_step(self):
+        self.auto_job = None
+        if not self.engine.can_act():
+            self.stop_auto_battle()
+            return
+        (action, item), _ = self.advisor.suggest(self.engine)
+        # the next suggestion is asked for once run_pipeline has played this turn
+        self.perform(action, item)
 
-        # Clean up inventory if item count reaches zero
-        if self.player["inventory"].get(item, 0) == 0:
-            del self.player["inventory"][item]
-            
-        self.update_status()
+    def end_turn(self):
+        # Autosave: a small journal delta every turn, compacted into a snapshot every N turns
+        if not AUTOSAVE_TURNS:
+            return
+        self.turns += 1
+        if self.turns % AUTOSAVE_TURNS == 0:
+            self.save_store().snapshot(self.save_state())
+        else:
+            self.save_store().record(self.save_state())
 
     def enemy_turn(self):
-        if self.enemy["hp"] > 0 and self.game_state["game_active"]:
-            # Enemy has chance to use elemental attack
-            use_elemental = random.random() < 0.3 and self.enemy["elemen"]
-            
-            damage, is_critical, element_multiplier = self.calculate_damage(self.enemy, self.player, is_elemental=use_elemental)
-            self.player["hp"] = max(0, self.player["hp"] - damage)
-            
-            crit_text = " 💥 CRITICAL!" if is_critical else ""
-            if use_elemental:
-                element_effect = ""
-                if element_multiplier > 1:
-                    element_effect = " 🎯 EFFECTIVE!"
-                elif element_multiplier < 1:
-                    element_effect = " 💤 INEFFECTIVE!"
-                self.log_message(f"{self.get_element_icon(self.enemy['elemen'])} {self.enemy['name']} uses elemental attack for {damage} damage!{element_effect}{crit_text}")
-            else:
-                self.log_message(f"The {self.enemy['name']} hits you for {damage} damage!{crit_text}")
-
-            if self.player["hp"] <= 0:
-                self.log_message("💀 You were defeated... Game Over.")
-                self.end_game()
+        self.engine.enemy_turn()
 
     def end_game(self):
         self.game_state["game_active"] = False
         self.disable_buttons()
-        
-        # Show game over screen
-        game_over_win = tk.Toplevel(self.root)
-        game_over_win.title("Game Over")
-        game_over_win.geometry("300x250")
-        game_over_win.configure(bg="#2c2f33")
-        
-        tk.Label(game_over_win, text="GAME OVER", font=("Arial", 18, "bold"), 
-                 fg="red", bg="#2c2f33").pack(pady=20)
-        tk.Label(game_over_win, text=f"You reached Level {self.player['level']}", 
-                 font=("Arial", 12), fg="white", bg="#2c2f33").pack(pady=5)
-        tk.Label(game_over_win, text=f"Defeated {self.game_state['day'] - 1} enemies", 
-                 font=("Arial", 12), fg="white", bg="#2c2f33").pack(pady=5)
+        self.stop_auto_battle()
+        self.actions.clear()
+        if self.telemetry:
+            self.telemetry.event("game_over", level=self.player["level"], day=self.game_state["day"])
+        for win in self.windows.values():
+            win.withdraw()
+        self.scenes.show("game_over")
+
+    def build_game_over(self, frame):
+        tk.Label(frame, text="GAME OVER", font=("Arial", 18, "bold"), 
+                 fg="red", bg="#2c2f33").pack(pady=(120, 20))
+        level_label = tk.Label(frame, font=("Arial", 12), fg="white", bg="#2c2f33")
+        level_label.pack(pady=5)
+        defeated_label = tk.Label(frame, font=("Arial", 12), fg="white", bg="#2c2f33")
+        defeated_label.pack(pady=5)
         
         # Show elemental mastery
-        best_element = max(self.player["element_mastery"], key=self.player["element_mastery"].get)
-        tk.Label(game_over_win, text=f"Best Element: {best_element}", 
-                 font=("Arial", 12), fg="white", bg="#2c2f33").pack(pady=5)
+        element_label = tk.Label(frame, font=("Arial", 12), fg="white", bg="#2c2f33")
+        element_label.pack(pady=5)
         
-        tk.Button(game_over_win, text="New Game", command=self.restart_game,
+        tk.Button(frame, text="New Game", command=self.restart_game,
                   bg="#4caf50", fg="white", font=("Arial", 12)).pack(pady=10)
+        # shown only while the bag holds one; REVIVED takes the player back to the battle
+        revive_button = tk.Button(frame, text="🕊️ Use Phoenix Down",
+                                  command=lambda: self.perform("item", "Phoenix Down"),
+                                  bg="#ff9800", fg="white", font=("Arial", 12))
+
+        def enter():
+            best_element = max(self.player["element_mastery"], key=self.player["element_mastery"].get)
+            level_label.config(text=f"You reached Level {self.player['level']}")
+            defeated_label.config(text=f"Defeated {self.game_state['day'] - 1} enemies")
+            element_label.config(text=f"Best Element: {best_element}")
+            if self.player["inventory"].get("Phoenix Down", 0) > 0:
+                revive_button.pack(pady=5)
+            else:
+                revive_button.pack_forget()
+
+        return enter
 
     def disable_buttons(self):
         buttons = [self.attack_button, self.special_button, self.elemental_button, 
@@ -432,121 +497,66 @@ class RPGGame:
                     btn.config(state="normal")
 
     def restart_game(self):
-        if self.root:
-            self.root.destroy()
+        # Same root, scenes and windows; only the game state is replaced
+        self.stop_auto_battle()
+        self.cancel_turns()
+        self.advisor.save()
+        self.engine.battle_log.close()
+        if self.saves:
+            self.saves.close()
+        if self.log_flush_job:
+            self.root.after_cancel(self.log_flush_job)
+            self.log_flush_job = None
+        if self.log_text:
+            self.log_text.config(state="normal")
+            self.log_text.delete("1.0", tk.END)
+            self.log_text.config(state="disabled")
         self.initialize_game()
         self.show_class_selection()
 
     def gain_xp(self, amount):
-        self.player["xp"] += amount
-        self.log_message(f"⭐ You gained {amount} XP!")
-
-        if self.player["xp"] >= self.player["xp_to_next"]:
-            self.level_up()
+        self.engine.gain_xp(amount)
 
     def level_up(self):
-        self.player["level"] += 1
-        self.player["xp"] = 0
-        self.player["xp_to_next"] = int(self.player["xp_to_next"] * 1.5)
-        
-        # Stat increases
-        hp_increase = random.randint(10, 20)
-        self.player["max_hp"] += hp_increase
-        self.player["hp"] = self.player["max_hp"]
-        
-        self.player["base_attack"] += 2
-        self.player["base_defense"] += 1
-        self.player["attack"] = self.player["base_attack"]
-        self.player["defense"] = self.player["base_defense"]
-        
-        # Add potion on level up
-        self.player["inventory"]["Healing Potion"] = self.player["inventory"].get("Healing Potion", 0) + 1
-        
-        # Chance to learn new elemental skill
-        if self.player["level"] % 3 == 0 and len(self.player["skills"]) < len(elemental_skills[self.player["elemen"]]):
-            available_skills = [s for s in elemental_skills[self.player["elemen"]] if s not in self.player["skills"]]
-            if available_skills:
-                new_skill = random.choice(available_skills)
-                self.player["skills"].append(new_skill)
-                self.log_message(f"🎓 You learned a new skill: {new_skill}!")
-        
-        self.log_message(f"⬆️ Level Up! You are now Level {self.player['level']}!")
-        self.log_message(f"❤️ Max HP increased by {hp_increase}!")
-        self.log_message(f"⚔️ Attack increased to {self.player['attack']}!")
-        self.log_message(f"🛡️ Defense increased to {self.player['defense']}!")
-        self.log_message(f"🧪 You received a Healing Potion!")
+        self.engine.level_up()
 
     def spawn_enemy(self):
-        self.game_state["day"] += 1
-        
-        # Elemental events based on day
-        if self.game_state["day"] % 7 == 0:
-            self.trigger_elemental_event()
-        
-        # Chance to spawn boss every 5 days
-        if self.game_state["day"] % 5 == 0 and not self.game_state["boss_defeated"]:
-            enemy_type = "Dragon"
-            self.game_state["boss_defeated"] = True
-        else:
-            enemy_type = random.choice(list(enemy_types.keys()))
-        
-        enemy_stats = enemy_types[enemy_type]
-        
-        self.enemy["name"] = enemy_type
-        self.enemy["type"] = enemy_type
-        
-        # Set enemy element
-        if enemy_type == "Elemental":
-            self.enemy["elemen"] = random.choice(list(element_system.keys()))
-        else:
-            self.enemy["elemen"] = enemy_stats["elemen"]
-        
-        self.enemy["level"] = max(1, self.player["level"] - 1 + random.randint(0, 2))
-        self.enemy["max_hp"] = random.randint(*enemy_stats["hp_range"]) + (self.enemy["level"] * 5)
-        self.enemy["hp"] = self.enemy["max_hp"]
-        self.enemy["attack"] = random.randint(*enemy_stats["attack_range"]) + (self.enemy["level"] * 2)
-        self.enemy["defense"] = random.randint(*enemy_stats["defense_range"]) + (self.enemy["level"] * 1)
-        self.enemy["gold"] = enemy_stats["gold"] + (self.enemy["level"] * 2)
-
-        self.log_message(f"\n⚔️ Day {self.game_state['day']}: A {self.enemy['name']} (Lvl {self.enemy['level']}) approaches!\n")
-        self.log_message(f"Element: {self.get_element_icon(self.enemy['elemen'])} {self.enemy['elemen']}")
-        
-        # Show element advantage info
-        advantage = self.calculate_element_advantage(self.player["elemen"], self.enemy["elemen"])
-        if advantage > 1:
-            self.log_message(f"🎯 Your element is effective against {self.enemy['elemen']}!")
-        elif advantage < 1:
-            self.log_message(f"💤 Your element is weak against {self.enemy['elemen']}!")
-        
-        # Reset special cooldown
-        self.player["special_cooldown"] = max(0, self.player["special_cooldown"] - 1)
-        
-        self.update_status()
+        self.engine.spawn_enemy()
 
     def trigger_elemental_event(self):
-        event_element = random.choice(list(element_system.keys()))
-        events = {
-            "Solar": "A solar eclipse empowers Solar element!",
-            "Taufan": "A great storm enhances Taufan element!", 
-            "Gempa": "Earth tremors boost Gempa element!",
-            "Halilintar": "Lightning storm strengthens Halilintar element!"
-        }
-        
-        event_msg = events[event_element]
-        self.log_message(f"\n🌠 ELEMENTAL EVENT: {event_msg}")
-        
-        # Bonus for players using matching element
-        if self.player["elemen"] == event_element:
-            self.player["elemental_charge"] = 100
-            self.player["attack"] += 5
-            self.log_message(f"🌟 Your {event_element} powers are enhanced! +5 Attack, Full Charge!")
-            self.game_state["elemental_events"].append(f"Day {self.game_state['day']}: {event_element} Event")
+        self.engine.trigger_elemental_event()
+
+    # --- Side windows: built once, then hidden/shown and updated in place ---
+    def show_window(self, name, build):
+        win = self.windows.get(name)
+        if win is None or not win.winfo_exists():
+            win = tk.Toplevel(self.root)
+            win.configure(bg="#2c2f33")
+            win.protocol("WM_DELETE_WINDOW", win.withdraw)
+            self.windows[name] = win
+            refresh = build(win)
+            self.window_refresh[name] = refresh
+            # Redrawn on the next idle after any field it shows changes, while visible
+            self.bindings.watch(self.player, ("gold", "elemen") + NESTED_PLAYER_FIELDS,
+                                lambda: win.state() != "withdrawn" and refresh())
+        else:
+            win.deiconify()
+            win.lift()
+        self.window_refresh[name]()
+
+    def set_widget(self, widget, **options):
+        # Only talk to Tk when the option values actually changed
+        key = str(widget)
+        if self.widget_state.get(key) != options:
+            self.widget_state[key] = options
+            widget.config(**options)
 
     def open_inventory(self):
-        inv_win = tk.Toplevel(self.root)
+        self.show_window("inventory", self.build_inventory)
+
+    def build_inventory(self, inv_win):
         inv_win.title("Inventory")
         inv_win.geometry("450x500")
-        inv_win.configure(bg="#2c2f33")
 
         # Inventory items
         tk.Label(inv_win, text="Inventory", font=("Arial", 16, "bold"), 
@@ -554,21 +564,22 @@ class RPGGame:
         
         inventory_frame = tk.Frame(inv_win, bg="#2c2f33")
         inventory_frame.pack(fill="both", expand=True, padx=20, pady=10)
-        
-        if not self.player["inventory"]:
-            tk.Label(inventory_frame, text="Your inventory is empty!", 
-                     font=("Arial", 12), bg="#2c2f33", fg="white").pack()
-        else:
-            for item, qty in self.player["inventory"].items():
-                item_frame = tk.Frame(inventory_frame, bg="#2c2f33")
-                item_frame.pack(fill="x", pady=2)
-                
-                tk.Label(item_frame, text=f"{item} x{qty}", font=("Arial", 12), 
-                         bg="#2c2f33", fg="white", width=20, anchor="w").pack(side="left")
-                
-                use_btn = tk.Button(item_frame, text="Use", width=8,
-                                  command=lambda i=item: [self.use_item(i), inv_win.destroy()])
-                use_btn.pack(side="right", padx=5)
+        empty_label = tk.Label(inventory_frame, text="Your inventory is empty!", 
+                               font=("Arial", 12), bg="#2c2f33", fg="white")
+        rows = {}  # item -> (frame, label), made the first time the item is owned
+
+        def use(item):
+            self.use_item(item)
+            inv_win.withdraw()
+
+        def add_row(item):
+            item_frame = tk.Frame(inventory_frame, bg="#2c2f33")
+            label = tk.Label(item_frame, text="", font=("Arial", 12), 
+                             bg="#2c2f33", fg="white", width=20, anchor="w")
+            label.pack(side="left")
+            use_btn = tk.Button(item_frame, text="Use", width=8, command=lambda: use(item))
+            use_btn.pack(side="right", padx=5)
+            rows[item] = (item_frame, label)
         
         # Equipment
         tk.Label(inv_win, text="Equipment", font=("Arial", 14, "bold"), 
@@ -576,12 +587,10 @@ class RPGGame:
         
         equipment_frame = tk.Frame(inv_win, bg="#2c2f33")
         equipment_frame.pack(fill="x", padx=20, pady=10)
-        
-        for slot, item in self.player["equipment"].items():
-            slot_name = slot.capitalize()
-            item_name = item if item else "Empty"
-            tk.Label(equipment_frame, text=f"{slot_name}: {item_name}", 
-                     font=("Arial", 11), bg="#2c2f33", fg="white").pack(anchor="w")
+        slot_labels = {}
+        for slot in self.player["equipment"]:
+            slot_labels[slot] = tk.Label(equipment_frame, text="", font=("Arial", 11), bg="#2c2f33", fg="white")
+            slot_labels[slot].pack(anchor="w")
         
         # Elemental Mastery
         tk.Label(inv_win, text="Elemental Mastery", font=("Arial", 14, "bold"), 
@@ -589,54 +598,97 @@ class RPGGame:
         
         mastery_frame = tk.Frame(inv_win, bg="#2c2f33")
         mastery_frame.pack(fill="x", padx=20, pady=10)
-        
-        for element, mastery in self.player["element_mastery"].items():
-            color = self.get_element_color(element)
-            icon = self.get_element_icon(element)
-            tk.Label(mastery_frame, text=f"{icon} {element}: {mastery}", 
-                     font=("Arial", 10), bg="#2c2f33", fg=color).pack(anchor="w")
+        mastery_labels = {}
+        for element in self.player["element_mastery"]:
+            mastery_labels[element] = tk.Label(mastery_frame, text="", font=("Arial", 10), bg="#2c2f33",
+                                               fg=self.get_element_color(element))
+            mastery_labels[element].pack(anchor="w")
+
+        shown = []  # items whose rows are packed, in display order
+
+        def refresh():
+            owned = [item for item, qty in self.player["inventory"].items() if qty > 0]
+            if owned != shown:
+                for item in shown:
+                    rows[item][0].pack_forget()
+                for item in owned:
+                    if item not in rows:
+                        add_row(item)
+                    rows[item][0].pack(fill="x", pady=2)
+                if owned and not shown:
+                    empty_label.pack_forget()
+                elif not owned:
+                    empty_label.pack()
+                shown[:] = owned
+            for item in owned:
+                self.set_widget(rows[item][1], text=f"{item} x{self.player['inventory'][item]}")
+            for slot, label in slot_labels.items():
+                self.set_widget(label, text=f"{slot.capitalize()}: {self.player['equipment'][slot] or 'Empty'}")
+            for element, label in mastery_labels.items():
+                self.set_widget(label, text=f"{self.get_element_icon(element)} {element}: "
+                                            f"{self.player['element_mastery'].get(element, 0)}")
+
+        empty_label.pack()
+        return refresh
 
     def open_skills_window(self):
-        skills_win = tk.Toplevel(self.root)
+        self.show_window("skills", self.build_skills_window)
+
+    def build_skills_window(self, skills_win):
         skills_win.title("Elemental Skills")
         skills_win.geometry("300x400")
-        skills_win.configure(bg="#2c2f33")
 
         tk.Label(skills_win, text="Elemental Skills", font=("Arial", 16, "bold"), 
                  bg="#2c2f33", fg="white").pack(pady=10)
         
         # Current element skills
-        current_element = self.player["elemen"]
-        element_color = self.get_element_color(current_element)
-        
-        tk.Label(skills_win, text=f"Current Element: {current_element}", 
-                 font=("Arial", 12, "bold"), bg="#2c2f33", fg=element_color).pack(pady=5)
+        element_title = tk.Label(skills_win, text="", font=("Arial", 12, "bold"), bg="#2c2f33")
+        element_title.pack(pady=5)
         
         skills_frame = tk.Frame(skills_win, bg="#2c2f33")
         skills_frame.pack(fill="both", expand=True, padx=20, pady=10)
         
-        for skill in elemental_skills[current_element]:
-            learned = skill in self.player["skills"]
-            status = "✅ Learned" if learned else "❌ Not Learned"
-            color = "lightgreen" if learned else "gray"
-            tk.Label(skills_frame, text=f"{skill} - {status}", 
-                     font=("Arial", 10), bg="#2c2f33", fg=color).pack(anchor="w", pady=2)
-        
         tk.Label(skills_win, text="Use Elemental Skill in battle (Cost: 30 charge)", 
                  font=("Arial", 9), bg="#2c2f33", fg="lightblue").pack(pady=10)
 
+        skill_labels = {}
+        built_for = []  # element the skill labels were made for
+
+        def refresh():
+            current_element = self.player["elemen"]
+            if built_for != [current_element]:
+                # Only a new game with another class changes the element
+                for label in skill_labels.values():
+                    self.widget_state.pop(str(label), None)
+                    label.destroy()
+                skill_labels.clear()
+                for skill in elemental_skills.get(current_element, ()):
+                    skill_labels[skill] = tk.Label(skills_frame, text="", font=("Arial", 10), bg="#2c2f33")
+                    skill_labels[skill].pack(anchor="w", pady=2)
+                element_title.config(text=f"Current Element: {current_element}",
+                                     fg=self.get_element_color(current_element))
+                built_for[:] = [current_element]
+            for skill, label in skill_labels.items():
+                learned = skill in self.player["skills"]
+                status = "✅ Learned" if learned else "❌ Not Learned"
+                self.set_widget(label, text=f"{skill} - {status}", fg="lightgreen" if learned else "gray")
+
+        return refresh
+
     def open_shop(self):
-        shop_win = tk.Toplevel(self.root)
+        self.show_window("shop", self.build_shop)
+
+    def build_shop(self, shop_win):
         shop_win.title("Shop")
         shop_win.geometry("400x500")
-        shop_win.configure(bg="#2c2f33")
 
         tk.Label(shop_win, text="Shop", font=("Arial", 16, "bold"), 
                  bg="#2c2f33", fg="gold").pack(pady=10)
         
-        tk.Label(shop_win, text=f"Your Gold: {self.player['gold']}", font=("Arial", 12), 
-                 bg="#2c2f33", fg="white").pack(pady=5)
+        gold_label = tk.Label(shop_win, text="", font=("Arial", 12), bg="#2c2f33", fg="white")
+        gold_label.pack(pady=5)
 
+        buy_buttons = {}
         for item, details in shop_items.items():
             item_frame = tk.Frame(shop_win, bg="#2c2f33")
             item_frame.pack(fill="x", padx=20, pady=5)
@@ -652,87 +704,155 @@ class RPGGame:
             tk.Label(item_frame, text=item_text, font=("Arial", 11), 
                      bg="#2c2f33", fg="white", width=30, anchor="w").pack(side="left")
             
-            buy_btn = tk.Button(item_frame, text="Buy", width=8,
-                              command=lambda i=item, d=details: self.buy_item(i, d, shop_win))
-            buy_btn.pack(side="right")
+            buy_buttons[item] = tk.Button(item_frame, text="Buy", width=8,
+                                          command=lambda i=item: self.buy_item(i))
+            buy_buttons[item].pack(side="right")
 
-    def buy_item(self, item, details, shop_window):
-        if self.player["gold"] >= details["price"]:
-            self.player["gold"] -= details["price"]
-            
-            if details["type"] == "consumable" or details["type"] == "special":
-                self.player["inventory"][item] = self.player["inventory"].get(item, 0) + 1
-                self.log_message(f"🛒 You bought a {item}!")
-            else:
-                slot = "weapon" if details["type"] == "weapon" else "armor" if details["type"] == "armor" else "accessory"
-                self.player["equipment"][slot] = item
-                
-                if "attack_bonus" in details:
-                    self.player["base_attack"] += details["attack_bonus"]
-                if "defense_bonus" in details:
-                    self.player["base_defense"] += details["defense_bonus"]
-                if "hp_bonus" in details:
-                    self.player["max_hp"] += details["hp_bonus"]
-                
-                self.player["attack"] = self.player["base_attack"]
-                self.player["defense"] = self.player["base_defense"]
-                self.log_message(f"🛒 You bought and equipped {item}!")
-            
-            self.update_status()
-            shop_window.destroy()
-            self.open_shop()
-        else:
+        def refresh():
+            gold = self.player["gold"]
+            self.set_widget(gold_label, text=f"Your Gold: {gold}")
+            for item, button in buy_buttons.items():
+                self.set_widget(button, state="normal" if gold >= shop_items[item]["price"] else "disabled")
+
+        return refresh
+
+    def buy_item(self, item):
+        # The shop redraws itself from the gold/inventory change
+        if not self.engine.buy_item(item):
             messagebox.showwarning("Not Enough Gold", "You don't have enough gold to buy this item!")
+        elif self.telemetry:
+            self.telemetry.event("purchase", item=item, price=shop_items[item]["price"], gold=self.player["gold"])
 
     def flee(self):
-        if random.random() < 0.7:
-            self.log_message("🏃‍♂️ You successfully fled from battle!")
-            self.spawn_enemy()
-        else:
-            self.log_message("❌ You failed to flee!")
-            self.enemy_turn()
-        self.update_status()
+        self.perform("flee")
 
     def check_quest_progress(self, enemy_type):
-        if enemy_type == "Dragon":
-            self.log_message("🏆 QUEST COMPLETE: Dragon Slayer! You've defeated the mighty dragon!")
-            self.player["gold"] += 100
-            self.log_message("💰 You received 100 gold as reward!")
+        self.engine.check_quest_progress(enemy_type)
+
+    def save_store(self):
+        if self.saves is None:
+            self.slot = self.slots.new_slot()
+            self.saves = self.slots.open(self.slot)
+        return self.saves
+
+    def save_state(self):
+        now = time.time()
+        elapsed = int(now - self.clock)
+        self.game_state["playtime"] = self.game_state.get("playtime", 0) + elapsed
+        self.clock += elapsed
+        return {"player": self.player, "game_state": self.game_state}
 
     def save_game(self):
-        save_data = {
-            "player": self.player,
-            "game_state": self.game_state,
-            "timestamp": datetime.now().isoformat()
-        }
-        
-        with open("rpg_save.json", "w") as f:
-            json.dump(save_data, f)
-        
-        self.log_message("💾 Game saved successfully!")
+        # Encoded here, written (fsync + rename) by the save thread; a turn in
+        # progress is finished first so the save never holds half a turn
+        if self.engine.steps:
+            if self.step_job:
+                self.root.after_cancel(self.step_job)
+                self.step_job = None
+            self.engine.run_steps()
+            self.finish_turn()
+        started = time.perf_counter()
+        saves = self.save_store()
+        if saves.error:
+            self.log_message(f"⚠️ An earlier save failed: {saves.error}")
+            saves.error = None
+        saves.snapshot(self.save_state())
+        if self.telemetry:
+            self.telemetry.event("save", slot=self.slot, ms=round((time.perf_counter() - started) * 1000, 3))
+        self.log_message(f"💾 Game saved to {self.slot}!")
 
     def load_game(self):
-        if os.path.exists("rpg_save.json"):
-            with open("rpg_save.json", "r") as f:
-                save_data = json.load(f)
-            
-            self.player.update(save_data["player"])
-            self.game_state.update(save_data["game_state"])
-            
-            self.log_message("📂 Game loaded successfully!")
-            self.update_status()
-            self.spawn_enemy()
-        else:
+        # The list comes from the slot index; a save file is only read once it is picked
+        entries = self.slots.list()
+        if not entries:
             messagebox.showinfo("No Save File", "No saved game found!")
+            return
 
-    def game_window(self):
-        self.root = tk.Tk()
-        self.root.title("⚔️ Enhanced RPG with Element System ⚔️")
-        self.root.geometry("750x750")
-        self.root.configure(bg="#2c2f33")
+        load_win = tk.Toplevel(self.root)
+        load_win.title("Load Game")
+        load_win.geometry("560x400")
+        load_win.configure(bg="#2c2f33")
 
+        tk.Label(load_win, text="Saved Games", font=("Arial", 16, "bold"),
+                 bg="#2c2f33", fg="white").pack(pady=10)
+
+        list_frame = tk.Frame(load_win)
+        list_frame.pack(fill="both", expand=True, padx=20, pady=5)
+        slot_list = tk.Listbox(list_frame, bg="#1a1a1a", fg="white", font=("Consolas", 10),
+                               selectbackground="#2196f3", activestyle="none")
+        scrollbar = tk.Scrollbar(list_frame, orient="vertical", command=slot_list.yview)
+        slot_list.configure(yscrollcommand=scrollbar.set)
+        slot_list.pack(side="left", fill="both", expand=True)
+        scrollbar.pack(side="right", fill="y")
+
+        for entry in entries:
+            saved = (entry["timestamp"] or "")[:16].replace("T", " ")
+            slot_list.insert(tk.END, f"{entry['slot']:<10} {entry['class'] or '?':<8} Lvl {entry['level']:<3} "
+                                     f"Day {entry['day']:<4} {entry['gold']:>6}g  "
+                                     f"{format_playtime(entry['playtime']):>7}  {saved}")
+        slot_list.selection_set(0)
+
+        def selected_slot():
+            picked = slot_list.curselection()
+            return entries[picked[0]]["slot"] if picked else None
+
+        def load_selected():
+            slot = selected_slot()
+            if slot:
+                load_win.destroy()
+                self.load_slot(slot)
+
+        def delete_selected():
+            slot = selected_slot()
+            if slot and messagebox.askyesno("Delete Save", f"Delete {slot}?", parent=load_win):
+                if slot == self.slot:
+                    self.saves.close()
+                    self.slot, self.saves = None, None
+                self.slots.delete(slot)
+                index = slot_list.curselection()[0]
+                slot_list.delete(index)
+                del entries[index]
+
+        slot_list.bind("<Double-Button-1>", lambda e: load_selected())
+        button_frame = tk.Frame(load_win, bg="#2c2f33")
+        button_frame.pack(pady=10)
+        tk.Button(button_frame, text="📂 Load", width=10, bg="#2196f3", fg="white",
+                  font=("Arial", 10), command=load_selected).pack(side="left", padx=5)
+        tk.Button(button_frame, text="🗑 Delete", width=10, bg="#ff4c4c", fg="white",
+                  font=("Arial", 10), command=delete_selected).pack(side="left", padx=5)
+
+    def load_slot(self, slot):
+        started = time.perf_counter()
+        saves = self.saves if slot == self.slot else self.slots.open(slot)
+        save_data = saves.load()
+        if not save_data:
+            if saves is not self.saves:
+                saves.close()
+            messagebox.showwarning("Load Failed", f"{slot} could not be read.")
+            return
+        if saves is not self.saves:
+            if self.saves:
+                self.saves.close()
+            self.slot, self.saves = slot, saves
+
+        # older saves come back migrated (rpg_state.MIGRATIONS) and checked
+        self.cancel_turns()
+        self.player.update(save_data["player"])
+        self.game_state.update(save_data["game_state"])
+        self.clock = time.time()
+        if self.turn_history is not None:
+            self.turn_history.clear()  # turns of the game played before the load
+
+        self.log_message(f"📂 {slot} loaded successfully! ({save_data['replayed']} autosaved turns replayed)"
+                         if save_data["replayed"] else f"📂 {slot} loaded successfully!")
+        self.spawn_enemy()
+        if self.telemetry:
+            self.telemetry.event("load", slot=slot, replayed=save_data["replayed"],
+                                 ms=round((time.perf_counter() - started) * 1000, 3))
+
+    def build_battle_scene(self, frame):
         # Header with game info
-        header_frame = tk.Frame(self.root, bg="#2c2f33")
+        header_frame = tk.Frame(frame, bg="#2c2f33")
         header_frame.pack(pady=10)
         
         self.gold_label = tk.Label(header_frame, text="", font=("Arial", 10), fg="gold", bg="#2c2f33")
@@ -748,23 +868,30 @@ class RPGGame:
         self.element_label.pack(side="left", padx=10)
 
         # Enemy
-        enemy_frame = tk.Frame(self.root, bg="#2c2f33")
+        enemy_frame = tk.Frame(frame, bg="#2c2f33")
         enemy_frame.pack(pady=10)
         self.enemy_hp_label = tk.Label(enemy_frame, text="", font=("Arial", 12, "bold"), fg="red", bg="#2c2f33")
         self.enemy_hp_label.pack()
         self.enemy_hp_bar = ttk.Progressbar(enemy_frame, length=300, maximum=100)
         self.enemy_hp_bar.pack(pady=5)
+        self.horde_label = tk.Label(enemy_frame, text="", font=("Arial", 9), fg="#ff8a80", bg="#2c2f33",
+                                    wraplength=600)
+        self.horde_label.pack()
 
         # Player
-        player_frame = tk.Frame(self.root, bg="#2c2f33")
+        player_frame = tk.Frame(frame, bg="#2c2f33")
         player_frame.pack(pady=10)
         self.player_hp_label = tk.Label(player_frame, text="", font=("Arial", 12, "bold"), fg="lightgreen", bg="#2c2f33")
         self.player_hp_label.pack()
         self.player_hp_bar = ttk.Progressbar(player_frame, length=300, maximum=100)
         self.player_hp_bar.pack(pady=5)
 
+        # Odds of the next move (exact, see rpg_odds.py)
+        self.odds_label = tk.Label(frame, text="", font=("Arial", 9), fg="#b0bec5", bg="#2c2f33")
+        self.odds_label.pack()
+
         # Action Buttons
-        button_frame = tk.Frame(self.root, bg="#2c2f33")
+        button_frame = tk.Frame(frame, bg="#2c2f33")
         button_frame.pack(pady=15)
         
         self.attack_button = tk.Button(button_frame, text="⚔️ Attack", width=12, height=2,
@@ -795,7 +922,7 @@ class RPGGame:
         self.flee_button.grid(row=1, column=2, padx=5, pady=5)
 
         # Additional Buttons
-        extra_button_frame = tk.Frame(self.root, bg="#2c2f33")
+        extra_button_frame = tk.Frame(frame, bg="#2c2f33")
         extra_button_frame.pack(pady=10)
         
         skills_button = tk.Button(extra_button_frame, text="📚 Skills", width=12, height=1,
@@ -806,8 +933,16 @@ class RPGGame:
                                bg="#ffd700", fg="black", font=("Arial", 10), command=self.open_shop)
         shop_button.pack(side="left", padx=5)
 
+        hint_button = tk.Button(extra_button_frame, text="💡 Hint", width=12, height=1,
+                                bg="#607d8b", fg="white", font=("Arial", 10), command=self.show_hint)
+        hint_button.pack(side="left", padx=5)
+
+        self.auto_button = tk.Button(extra_button_frame, text="🤖 Auto", width=12, height=1,
+                                     bg="#9c27b0", fg="white", font=("Arial", 10), command=self.toggle_auto_battle)
+        self.auto_button.pack(side="left", padx=5)
+
         # Game Menu
-        menu_frame = tk.Frame(self.root, bg="#2c2f33")
+        menu_frame = tk.Frame(frame, bg="#2c2f33")
         menu_frame.pack(pady=10)
         
         save_button = tk.Button(menu_frame, text="💾 Save", width=10,
@@ -818,8 +953,12 @@ class RPGGame:
                                bg="#2196f3", fg="white", font=("Arial", 10), command=self.load_game)
         load_button.pack(side="left", padx=5)
 
+        history_button = tk.Button(menu_frame, text="📜 History", width=10,
+                                  bg="#2196f3", fg="white", font=("Arial", 10), command=self.open_log_history)
+        history_button.pack(side="left", padx=5)
+
         # Log
-        log_frame = tk.Frame(self.root)
+        log_frame = tk.Frame(frame)
         log_frame.pack(pady=10, fill="both", expand=True, padx=20)
         
         self.log_text = tk.Text(log_frame, height=15, width=80, state="disabled", wrap="word",
@@ -831,6 +970,13 @@ class RPGGame:
         self.log_text.pack(side="left", fill="both", expand=True)
         scrollbar.pack(side="right", fill="y")
 
+        self.bind_status()
+        return self.start_battle
+
+    def start_battle(self):
+        self.root.title("⚔️ Enhanced RPG with Element System ⚔️")
+        self.root.geometry("750x750")
+
         # Initialize game
         self.log_message("⚔️ Welcome to the Enhanced RPG with Element System! ⚔️")
         self.log_message(f"You chose {self.player['class']} class!")
@@ -840,15 +986,14 @@ class RPGGame:
         
         self.spawn_enemy()
         self.update_status()
-
-        self.root.mainloop()
+        self.enable_buttons()
+        if self.telemetry:
+            self.telemetry.event("game_start", player_class=self.player["class"], element=self.player["elemen"])
 
     def show_class_selection(self):
-        class_window = tk.Tk()
-        class_window.title("Choose Your Class")
-        class_window.geometry("550x500")
-        class_window.configure(bg="#2c2f33")
+        self.scenes.show("class_select")
 
+    def build_class_selection(self, class_window):
         title_label = tk.Label(class_window, text="Choose Your Class", font=("Arial", 18, "bold"),
                                fg="white", bg="#2c2f33")
         title_label.pack(pady=20)
@@ -861,22 +1006,8 @@ class RPGGame:
         class_description.pack()
 
         def start_game(chosen_class):
-            stats = classes[chosen_class]
-            self.player["class"] = chosen_class
-            self.player["elemen"] = stats["elemen"]
-            self.player["hp"] = stats["hp"]
-            self.player["max_hp"] = stats["hp"]
-            self.player["attack"] = stats["attack"]
-            self.player["base_attack"] = stats["attack"]
-            self.player["defense"] = stats["defense"]
-            self.player["base_defense"] = stats["defense"]
-            self.player["speed"] = stats["speed"]
-            
-            # Initialize elemental skills
-            self.player["skills"] = [elemental_skills[stats["elemen"]][0]]  # Start with first skill
-
-            class_window.destroy()
-            self.game_window()
+            self.engine.choose_class(chosen_class)
+            self.scenes.show("battle")
 
         for cls in classes.keys():
             stats = classes[cls]
@@ -904,9 +1035,15 @@ class RPGGame:
             btn.bind("<Enter>", on_enter)
             btn.bind("<Leave>", on_leave)
 
-        class_window.mainloop()
+        def enter():
+            self.root.title("Choose Your Class")
+            self.root.geometry("550x500")
+            class_description.config(text="Hover over a class to see details")
+
+        return enter
 
 # --- Start the game ---
 if __name__ == "__main__":
     game = RPGGame()
     game.show_class_selection()
+    game.root.mainloop()
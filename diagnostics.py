@@ -0,0 +1,311 @@
+"""
+Runtime diagnostics shared by the shooter (gpt.py) and the RPG (Test.py).
+
+MemoryMonitor periodically samples tracemalloc, live object counts by class
+and any game specific probes (canvas item counts, list sizes, log length),
+flags series that keep growing across a session and dumps the top
+allocation sites to a file on demand. It is opt-in through the environment
+so normal play pays nothing:
+
+    MEMWATCH_INTERVAL=5 python gpt.py          # sample every 5 seconds
+    MEMWATCH_LOG=soak.jsonl                    # where samples are appended
+    MEMWATCH_DUMP=memtop.txt                   # F6 writes top allocations here
+
+Profiler captures what the game is doing between two presses of F5. By
+default a background thread samples the main thread's stack; PROFILE_MODE
+switches to deterministic cProfile. Every capture writes a collapsed-stack
+file (flamegraph.pl / speedscope input) and a pstats file:
+
+    PROFILE_MODE=cprofile                      # sample (default) or cprofile
+    PROFILE_INTERVAL=0.005                     # seconds between stack samples
+    PROFILE_DIR=profiles                       # where captures are written
+    PROFILE_AT_START=30                        # capture from launch for 30 s
+                                               # (0 = until F5 is pressed)
+"""
+
+import atexit
+import cProfile
+import gc
+import json
+import marshal
+import os
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter, defaultdict, deque
+
+# ----------------------------- Memory Monitor -----------------------------
+GROWTH_WINDOW = 12        # samples that must be non-decreasing to count as growth
+GROWTH_MIN_RATIO = 0.10   # ... and the series must have grown at least 10%
+TOP_CLASSES = 15          # most common classes kept in every sample
+
+
+def is_growing(values, min_ratio=GROWTH_MIN_RATIO):
+    """True when values never decrease and the last is meaningfully above the first."""
+    if len(values) < 2:
+        return False
+    for prev, cur in zip(values, values[1:]):
+        if cur < prev:
+            return False
+    first, last = values[0], values[-1]
+    return last > first and (last - first) >= max(1, first * min_ratio)
+
+
+class MemoryMonitor:
+    def __init__(self, root, name, probes=None, info=None, classes=(), interval_ms=5000,
+                 log_path=None, dump_path=None, window=GROWTH_WINDOW, frames=10):
+        self.root = root
+        self.name = name
+        self.probes = dict(probes or {})   # watched for growth
+        self.info = dict(info or {})       # recorded only (e.g. ever-increasing ids)
+        self.classes = tuple(classes)      # class names whose live count is watched
+        self.interval_ms = interval_ms
+        self.log_path = log_path
+        self.dump_path = dump_path or f'{name}_memtop.txt'
+        self.window = window
+        self.series = {}                   # name -> deque of recent values
+        self.flagged = set()
+        self.samples = 0
+        self.job = None
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(frames)
+        self.baseline = tracemalloc.take_snapshot()
+        self.started = time.time()
+
+    @classmethod
+    def from_env(cls, root, name, **kwargs):
+        interval = os.environ.get('MEMWATCH_INTERVAL')
+        if not interval:
+            return None
+        kwargs.setdefault('interval_ms', int(float(interval) * 1000))
+        kwargs.setdefault('log_path', os.environ.get('MEMWATCH_LOG', f'{name}_memwatch.jsonl'))
+        kwargs.setdefault('dump_path', os.environ.get('MEMWATCH_DUMP'))
+        monitor = cls(root, name, **kwargs)
+        monitor.start()
+        return monitor
+
+    def start(self):
+        self.job = self.root.after(self.interval_ms, self._tick)
+
+    def stop(self):
+        if self.job:
+            try:
+                self.root.after_cancel(self.job)
+            except Exception:
+                pass
+            self.job = None
+
+    def _tick(self):
+        self.sample()
+        self.job = self.root.after(self.interval_ms, self._tick)
+
+    def sample(self):
+        current, peak = tracemalloc.get_traced_memory()
+        counts = Counter(type(o).__name__ for o in gc.get_objects())
+        record = {
+            't': round(time.time() - self.started, 1),
+            'traced_bytes': current,
+            'traced_peak': peak,
+            'top_classes': dict(counts.most_common(TOP_CLASSES)),
+        }
+        watched = {'traced_bytes': current}
+        for cls_name in self.classes:
+            watched[f'objects.{cls_name}'] = counts.get(cls_name, 0)
+        for key, probe in self.probes.items():
+            watched[key] = self._read(probe)
+        record['watched'] = watched
+        record['info'] = {key: self._read(probe) for key, probe in self.info.items()}
+
+        for key, value in watched.items():
+            if value is None:
+                continue
+            history = self.series.setdefault(key, deque(maxlen=self.window))
+            history.append(value)
+            growing = len(history) == self.window and is_growing(list(history))
+            if growing and key not in self.flagged:
+                self.flagged.add(key)
+                print(f'[memwatch:{self.name}] {key} grew monotonically over {self.window} samples: '
+                      f'{history[0]} -> {history[-1]}')
+            elif not growing:
+                self.flagged.discard(key)
+        record['growing'] = sorted(self.flagged)
+        self.samples += 1
+
+        if self.log_path:
+            try:
+                with open(self.log_path, 'a') as f:
+                    f.write(json.dumps(record) + '\n')
+            except OSError:
+                pass
+        return record
+
+    @staticmethod
+    def _read(probe):
+        try:
+            return probe()
+        except Exception:
+            return None
+
+    def dump_top(self, path=None, limit=25):
+        """Write the largest allocation sites and the growth since start-up."""
+        path = path or self.dump_path
+        snapshot = tracemalloc.take_snapshot().filter_traces((
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, '<frozen importlib._bootstrap>'),
+        ))
+        with open(path, 'w') as f:
+            f.write(f'# {self.name} memory dump at +{time.time() - self.started:.0f}s, '
+                    f'{self.samples} samples, growing: {", ".join(sorted(self.flagged)) or "none"}\n\n')
+            f.write(f'## Top {limit} allocation sites\n')
+            for stat in snapshot.statistics('lineno')[:limit]:
+                f.write(f'{stat}\n')
+            f.write(f'\n## Top {limit} growth since start\n')
+            for stat in snapshot.compare_to(self.baseline, 'lineno')[:limit]:
+                f.write(f'{stat}\n')
+            f.write('\n## Largest traceback\n')
+            top = snapshot.statistics('traceback')[:1]
+            if top:
+                f.write('\n'.join(top[0].traceback.format()) + '\n')
+        return path
+
+
+# ----------------------------- Profiler -----------------------------
+class StackSampler(threading.Thread):
+    """Samples one thread's Python stack at a fixed interval."""
+
+    def __init__(self, thread_id, interval):
+        super().__init__(name='stack-sampler', daemon=True)
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks = Counter()  # tuple of (file, line, func) root -> leaf
+        self.halt = threading.Event()
+
+    def run(self):
+        while not self.halt.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append((code.co_filename, code.co_firstlineno, code.co_name))
+                frame = frame.f_back
+            if stack:
+                self.stacks[tuple(reversed(stack))] += 1
+
+    def stop(self):
+        self.halt.set()
+        self.join()
+
+
+def write_collapsed(stacks, path):
+    with open(path, 'w') as f:
+        for stack, count in stacks.most_common():
+            names = ';'.join(f'{func} ({os.path.basename(file)}:{line})' for file, line, func in stack)
+            f.write(f'{names} {count}\n')
+
+
+def write_sampled_pstats(stacks, interval, path):
+    """Build a pstats-compatible file from stack samples (times are estimates)."""
+    stats = {}
+    callers = defaultdict(Counter)
+    for stack, count in stacks.items():
+        seen = set()
+        for depth, key in enumerate(stack):
+            entry = stats.setdefault(key, [0, 0, 0.0, 0.0])
+            if key not in seen:  # recursion counts once toward inclusive time
+                seen.add(key)
+                entry[0] += count
+                entry[1] += count
+                entry[3] += count * interval
+            if depth:
+                callers[key][stack[depth - 1]] += count
+        stats[stack[-1]][2] += count * interval
+    out = {}
+    for key, (cc, nc, tt, ct) in stats.items():
+        out[key] = (cc, nc, tt, ct, {caller: (n, n, 0.0, n * interval) for caller, n in callers[key].items()})
+    with open(path, 'wb') as f:
+        marshal.dump(out, f)
+
+
+class Profiler:
+    def __init__(self, root, name, mode='sample', interval=0.005, out_dir='.'):
+        self.root = root
+        self.name = name
+        self.mode = mode
+        self.interval = interval
+        self.out_dir = out_dir
+        self.sampler = None
+        self.cprofile = None
+        self.started = None
+        self.stop_job = None
+        self.captures = 0
+        atexit.register(self.stop)
+
+    @classmethod
+    def from_env(cls, root, name):
+        profiler = cls(root, name,
+                       mode=os.environ.get('PROFILE_MODE', 'sample'),
+                       interval=float(os.environ.get('PROFILE_INTERVAL', 0.005)),
+                       out_dir=os.environ.get('PROFILE_DIR', '.'))
+        at_start = os.environ.get('PROFILE_AT_START')
+        if at_start is not None:
+            profiler.start(seconds=float(at_start))
+        return profiler
+
+    @property
+    def active(self):
+        return self.started is not None
+
+    def toggle(self):
+        if self.active:
+            self.stop()
+        else:
+            self.start()
+
+    def start(self, seconds=0):
+        if self.active:
+            return
+        self.started = time.time()
+        self.sampler = StackSampler(threading.get_ident(), self.interval)
+        self.sampler.start()
+        if self.mode == 'cprofile':
+            self.cprofile = cProfile.Profile()
+            self.cprofile.enable()
+        if seconds:
+            self.stop_job = self.root.after(int(seconds * 1000), self.stop)
+        print(f'[profile:{self.name}] {self.mode} capture started')
+
+    def stop(self):
+        """Finish the capture and return (collapsed_path, pstats_path)."""
+        if not self.active:
+            return None
+        if self.cprofile:
+            self.cprofile.disable()
+        self.sampler.stop()
+        if self.stop_job:
+            try:
+                self.root.after_cancel(self.stop_job)
+            except Exception:
+                pass
+            self.stop_job = None
+
+        elapsed = time.time() - self.started
+        samples = sum(self.sampler.stacks.values())
+        self.captures += 1
+        os.makedirs(self.out_dir, exist_ok=True)
+        stamp = time.strftime('%Y%m%d-%H%M%S', time.localtime(self.started))
+        base = os.path.join(self.out_dir, f'{self.name}_profile_{stamp}_{self.captures}')
+        collapsed, pstats_path = base + '.collapsed', base + '.pstats'
+        write_collapsed(self.sampler.stacks, collapsed)
+        if self.cprofile:
+            self.cprofile.dump_stats(pstats_path)
+        else:
+            # the sampler waits on the GIL, so the real period is longer than asked for
+            period = elapsed / samples if samples else self.interval
+            write_sampled_pstats(self.sampler.stacks, period, pstats_path)
+        print(f'[profile:{self.name}] {elapsed:.1f}s, {samples} samples -> '
+              f'{collapsed}, {pstats_path}')
+        self.sampler = None
+        self.cprofile = None
+        self.started = None
+        return collapsed, pstats_path
@@ -9,9 +9,13 @@ Features:
 - Shoot with Space or mouse click
 - Multiple enemy types with simple AI
 - Power-ups (health, rapid fire, shield)
+- Boss waves firing data-driven bullet patterns (rings, spirals, aimed fans)
 - Score, levels, and wave system
 - Pause, Start menu, Game Over screen
 - High score saved to `highscore.txt`
+- Input-to-frame latency overlay (F3) and Chrome/Perfetto trace export (F4)
+- Optional memory monitor for soak tests (MEMWATCH_INTERVAL, F6 dumps allocations)
+- Runtime profiling captures with F5 (sampling or cProfile, see diagnostics.py)
 - Clean, readable code with comments so you can extend it
 
 Enjoy! If you'd like a different genre (platformer, puzzle, RPG) or
@@ -24,6 +28,10 @@ import time
 import math
 import json
 import os
+import heapq
+from collections import deque
+
+from diagnostics import MemoryMonitor, Profiler
 
 # ----------------------------- Configuration -----------------------------
 WIDTH, HEIGHT = 800, 600
@@ -34,11 +42,35 @@ ENEMY_BASE_SPEED = 2.0
 SPAWN_INTERVAL = 1200  # milliseconds
 POWERUP_CHANCE = 0.12
 FIRE_COOLDOWN = 220  # milliseconds
+BOSS_WAVE_INTERVAL = 4  # every Nth wave brings a boss
+BOSS_BULLET_RADIUS = 5
+BOSS_BULLET_DAMAGE = 4
 
 HIGH_SCORE_FILE = "highscore.txt"
+LATENCY_TRACE_FILE = os.environ.get('SHOOTER_TRACE_FILE', 'latency_trace.json')
 
 # ----------------------------- Utility Functions -----------------------------
-# ... keep all your existing imports and classes ...
+def clamp(v, a, b):
+    return max(a, min(b, v))
+
+
+def distance(a, b):
+    return math.hypot(a[0] - b[0], a[1] - b[1])
+
+
+# ----------------------------- Game Objects -----------------------------
+class GameObject:
+    def __init__(self, x, y):
+        self.x = x
+        self.y = y
+        self.dead = False
+
+    def update(self, dt):
+        pass
+
+    def draw(self, canvas):
+        pass
+
 
 class Kamehameha(GameObject):
     def __init__(self, x, y, direction=(0, -1)):
@@ -54,7 +86,7 @@ class Kamehameha(GameObject):
             self.dead = True
 
     def draw(self, canvas):
-        # Draw vertical beam
+        # vertical beam
         if self.dir[1] < 0:  # upwards
             canvas.create_rectangle(self.x - self.width//2, 0,
                                     self.x + self.width//2, self.y,
@@ -64,143 +96,6 @@ class Kamehameha(GameObject):
                                     self.x + self.width//2, HEIGHT,
                                     fill=self.color, stipple="gray25")
 
-class Player(GameObject):
-    def __init__(self, x, y):
-        super().__init__(x, y)
-        self.size = PLAYER_SIZE
-        self.color = "#2ECC71"
-        self.speed = PLAYER_SPEED
-        self.vx = 0
-        self.vy = 0
-        self.health = 100
-        self.max_health = 100
-        self.last_shot = 0
-        self.fire_rate = FIRE_COOLDOWN
-        self.shield_time = 0
-        self.rapid_time = 0
-        self.score = 0
-        self.kamehameha_cd = 0  # <<< NEW
-
-    def move(self, dx, dy):
-        self.vx = dx * self.speed
-        self.vy = dy * self.speed
-
-    def shoot(self, target_x, target_y, now):
-        if now - self.last_shot < self.fire_rate:
-            return None
-        self.last_shot = now
-        dx = target_x - self.x
-        dy = target_y - self.y
-        dist = math.hypot(dx, dy) or 1
-        nx = dx / dist
-        ny = dy / dist
-        speed = BULLET_SPEED * (1.6 if self.rapid_time > 0 else 1.0)
-        return Bullet(self.x, self.y, nx * speed, ny * speed, owner='player')
-
-    def take_damage(self, amt):
-        if self.shield_time > 0:
-            return
-        self.health -= amt
-        if self.health <= 0:
-            self.dead = True
-
-    def update(self, dt):
-        if self.shield_time > 0:
-            self.shield_time -= dt
-        if self.rapid_time > 0:
-            self.rapid_time -= dt
-        if self.kamehameha_cd > 0:           # <<< NEW
-            self.kamehameha_cd -= dt
-        self.x += self.vx
-        self.y += self.vy
-        self.x = clamp(self.x, 20, WIDTH - 20)
-        self.y = clamp(self.y, 20, HEIGHT - 20)
-
-    def draw(self, canvas):
-        s = self.size
-        points = [self.x, self.y - s // 2, self.x - s // 2, self.y + s // 2, self.x + s // 2, self.y + s // 2]
-        canvas.create_polygon(points, fill=self.color, outline='black', width=1)
-        bar_w = 80
-        hx = self.x - bar_w / 2
-        hy = self.y + s
-        canvas.create_rectangle(hx, hy, hx + bar_w, hy + 8, fill='#333')
-        hp_w = (self.health / self.max_health) * bar_w
-        canvas.create_rectangle(hx + 1, hy + 1, hx + 1 + hp_w - 2, hy + 7, fill='#E74C3C')
-        if self.shield_time > 0:
-            canvas.create_oval(self.x - s, self.y - s, self.x + s, self.y + s, outline='cyan', width=3)
-
-
-class Game:
-    # ... keep existing __init__ ...
-
-    def setup_bindings(self):
-        self.root.bind('<KeyPress>', self.on_key)
-        self.root.bind('<KeyRelease>', self.on_key_release)
-        self.root.bind('<Button-1>', self.on_click)
-        self.root.bind('<Motion>', self.on_mouse_move)
-        self.root.bind('<space>', lambda e: None)
-
-    def on_key(self, event):
-        self.keys.add(event.keysym)
-        if event.keysym == 'Escape':
-            if self.game_state == 'playing':
-                self.toggle_pause()
-        if self.game_state == 'menu' and event.keysym == 'Return':
-            self.start_game()
-        if self.game_state == 'gameover' and event.keysym == 'Return':
-            self.start_game()
-
-        # <<< NEW: Press E for Kamehameha
-        if event.keysym.lower() == 'e' and self.game_state == 'playing':
-            if self.player.kamehameha_cd <= 0:
-                beam = Kamehameha(self.player.x, self.player.y, (0, -1))
-                self.bullets.append(beam)
-                self.player.kamehameha_cd = 8000  # 8 seconds cooldown
-
-    # ... keep rest unchanged ...
-
-    def update(self, dt_ms):
-        dt = dt_ms / 1000.0
-        # (player movement & shooting unchanged)
-
-        self.player.update(dt_ms)
-
-        for b in self.bullets:
-            b.update(dt)
-        self.bullets = [b for b in self.bullets if not b.dead]
-
-        # damage from Kamehameha <<< NEW
-        for b in [bb for bb in self.bullets if isinstance(bb, Kamehameha)]:
-            for e in list(self.enemies):
-                if abs(e.x - b.x) < b.width and e.y < b.y:
-                    e.health -= 50
-                    if e.health <= 0:
-                        e.dead = True
-                        self.player.score += int(20 * (1 + e.level/2))
-
-        # (rest of collision/update code unchanged)
-
-def clamp(v, a, b):
-    return max(a, min(b, v))
-
-
-def distance(a, b):
-    return math.hypot(a[0] - b[0], a[1] - b[1])
-
-
-# ----------------------------- Game Objects -----------------------------
-class GameObject:
-    def __init__(self, x, y):
-        self.x = x
-        self.y = y
-        self.dead = False
-
-    def update(self, dt):
-        pass
-
-    def draw(self, canvas):
-        pass
-
 
 class Player(GameObject):
     def __init__(self, x, y):
@@ -291,6 +186,8 @@ class Bullet(GameObject):
 
 
 class Enemy(GameObject):
+    is_boss = False
+
     def __init__(self, x, y, type_id=0, level=1):
         super().__init__(x, y)
         self.type_id = type_id
@@ -375,6 +272,333 @@ class Powerup(GameObject):
             canvas.create_text(self.x, self.y, text='★', fill='white')
 
 
+# ----------------------------- Bullet Patterns -----------------------------
+# Patterns are plain data. Each one is compiled once into a timing table and
+# a table of unit direction vectors per volley, so firing is just indexing.
+#   kind:     'ring' spreads `count` bullets over 360 degrees,
+#             'fan' spreads them over `spread` degrees
+#   interval: milliseconds between volleys
+#   volleys:  volleys per cycle before the pattern repeats
+#   spin:     degrees added to the base angle on every volley
+#   aimed:    rotate each volley towards the player when it is fired
+BULLET_PATTERNS = {
+    'ring': {'kind': 'ring', 'count': 24, 'speed': 3.2, 'interval': 420, 'volleys': 2, 'spin': 7.5},
+    'spiral': {'kind': 'ring', 'count': 6, 'speed': 3.6, 'interval': 40, 'volleys': 36, 'spin': 10},
+    'fan': {'kind': 'fan', 'count': 9, 'spread': 70, 'speed': 5.0, 'interval': 300, 'aimed': True},
+    'flower': {'kind': 'ring', 'count': 12, 'speed': 2.6, 'interval': 90, 'volleys': 24, 'spin': -15},
+}
+
+BOSS_SPEC = {
+    'color': '#C0392B',
+    'radius': 44,
+    'health': 400,
+    'health_per_level': 60,
+    'speed': 1.2,
+    'hover_y': 130,
+    'patterns': ('spiral', 'fan', 'ring'),
+    'pattern_time': 6000,  # ms spent on each pattern before switching
+}
+
+
+class CompiledPattern:
+    def __init__(self, name, spec):
+        self.name = name
+        self.speed = spec['speed']
+        self.aimed = spec.get('aimed', False)
+        interval = spec['interval']
+        volleys = spec.get('volleys', 1)
+        count = spec['count']
+        spin = spec.get('spin', 0)
+        if spec['kind'] == 'ring':
+            offsets = [360.0 * i / count for i in range(count)]
+        elif spec['kind'] == 'fan':
+            spread = spec['spread']
+            step = spread / (count - 1) if count > 1 else 0
+            offsets = [-spread / 2 + step * i for i in range(count)]
+        else:
+            raise ValueError(f'unknown pattern kind {spec["kind"]!r} in {name!r}')
+
+        self.times = [interval * v for v in range(volleys)]
+        self.period = interval * volleys
+        self.dxs = []
+        self.dys = []
+        for v in range(volleys):
+            angles = [math.radians(spin * v + o) for o in offsets]
+            self.dxs.append(tuple(math.cos(a) for a in angles))
+            self.dys.append(tuple(math.sin(a) for a in angles))
+
+
+def compile_patterns(patterns):
+    return {name: CompiledPattern(name, spec) for name, spec in patterns.items()}
+
+
+COMPILED_PATTERNS = compile_patterns(BULLET_PATTERNS)
+
+
+class PatternEmitter:
+    """Walks a compiled pattern's timing table and fires due volleys."""
+
+    def __init__(self, pattern):
+        self.pattern = pattern
+        self.clock = 0
+        self.index = 0
+
+    def update(self, dt_ms, x, y, target, store):
+        p = self.pattern
+        self.clock += dt_ms
+        while self.clock >= p.times[self.index]:
+            dxs = p.dxs[self.index]
+            dys = p.dys[self.index]
+            if p.aimed:
+                aim = math.atan2(target[1] - y, target[0] - x)
+                c, s = math.cos(aim), math.sin(aim)
+                dxs, dys = ([dx * c - dy * s for dx, dy in zip(dxs, dys)],
+                            [dx * s + dy * c for dx, dy in zip(dxs, dys)])
+            store.add_batch(x, y, dxs, dys, p.speed)
+            self.index += 1
+            if self.index == len(p.times):
+                self.index = 0
+                self.clock -= p.period
+
+
+class ProjectileStore:
+    """Enemy pattern bullets kept as parallel coordinate lists.
+
+    Volleys are appended in one batch instead of one Bullet object each, and
+    drawing reuses a pool of canvas items that are only moved every frame.
+    """
+
+    def __init__(self, radius=BOSS_BULLET_RADIUS, color='#FF6F91'):
+        self.radius = radius
+        self.color = color
+        self.xs = []
+        self.ys = []
+        self.vxs = []
+        self.vys = []
+        self.items = []  # pooled canvas item ids
+        self.shown = 0
+
+    def __len__(self):
+        return len(self.xs)
+
+    def add_batch(self, x, y, dxs, dys, speed):
+        n = len(dxs)
+        self.xs.extend([x] * n)
+        self.ys.extend([y] * n)
+        self.vxs.extend([dx * speed for dx in dxs])
+        self.vys.extend([dy * speed for dy in dys])
+
+    def update(self):
+        lo_x, hi_x, lo_y, hi_y = -20, WIDTH + 20, -20, HEIGHT + 20
+        xs = [x + vx for x, vx in zip(self.xs, self.vxs)]
+        ys = [y + vy for y, vy in zip(self.ys, self.vys)]
+        keep = [i for i, (x, y) in enumerate(zip(xs, ys)) if lo_x < x < hi_x and lo_y < y < hi_y]
+        if len(keep) == len(xs):
+            self.xs, self.ys = xs, ys
+        else:
+            self._compact(keep, xs, ys)
+
+    def collide(self, cx, cy, r):
+        """Remove bullets touching the circle (cx, cy, r); return the hit count."""
+        reach = (r + self.radius) ** 2
+        keep = [i for i, (x, y) in enumerate(zip(self.xs, self.ys))
+                if (x - cx) * (x - cx) + (y - cy) * (y - cy) >= reach]
+        hits = len(self.xs) - len(keep)
+        if hits:
+            self._compact(keep, self.xs, self.ys)
+        return hits
+
+    def clear(self):
+        self.xs, self.ys, self.vxs, self.vys = [], [], [], []
+
+    def _compact(self, keep, xs, ys):
+        self.xs = [xs[i] for i in keep]
+        self.ys = [ys[i] for i in keep]
+        self.vxs = [self.vxs[i] for i in keep]
+        self.vys = [self.vys[i] for i in keep]
+
+    def draw(self, canvas):
+        r = self.radius
+        n = len(self.xs)
+        while len(self.items) < n:
+            self.items.append(canvas.create_oval(-r * 2, -r * 2, 0, 0, fill=self.color,
+                                                 outline='', tags='pattern_bullet'))
+        coords = canvas.coords
+        for item, x, y in zip(self.items, self.xs, self.ys):
+            coords(item, x - r, y - r, x + r, y + r)
+        # park items that are no longer needed off-screen instead of deleting them
+        for item in self.items[n:self.shown]:
+            coords(item, -r * 2, -r * 2, 0, 0)
+        self.shown = n
+        canvas.tag_raise('pattern_bullet')
+
+    def forget_items(self):
+        # the canvas was wiped with delete('all'); the pooled ids are gone
+        self.items = []
+        self.shown = 0
+
+
+class Boss(Enemy):
+    is_boss = True
+
+    def __init__(self, x, y, level=1, spec=BOSS_SPEC):
+        super().__init__(x, y, type_id=2, level=level)
+        self.spec = spec
+        self.color = spec['color']
+        self.radius = spec['radius']
+        self.health = spec['health'] + spec['health_per_level'] * level
+        self.max_health = self.health
+        self.speed = spec['speed']
+        self.shoot_prob = 0
+        self.pattern_clock = 0
+        self.pattern_index = 0
+        self.emitter = PatternEmitter(COMPILED_PATTERNS[spec['patterns'][0]])
+
+    def update(self, dt, player=None):
+        # drop in from the top, then drift side to side while firing
+        if self.y < self.spec['hover_y']:
+            self.y += self.speed
+        else:
+            self.x = WIDTH / 2 + math.sin(time.time() * 0.6) * (WIDTH / 3)
+
+    def fire(self, dt_ms, player, store):
+        self.pattern_clock += dt_ms
+        if self.pattern_clock >= self.spec['pattern_time']:
+            self.pattern_clock = 0
+            self.pattern_index = (self.pattern_index + 1) % len(self.spec['patterns'])
+            self.emitter = PatternEmitter(COMPILED_PATTERNS[self.spec['patterns'][self.pattern_index]])
+        self.emitter.update(dt_ms, self.x, self.y, (player.x, player.y), store)
+
+    def draw(self, canvas):
+        r = self.radius
+        canvas.create_oval(self.x - r, self.y - r, self.x + r, self.y + r, fill=self.color, outline='white', width=2)
+        hp_w = max(0, self.health / self.max_health) * (r * 2)
+        canvas.create_rectangle(self.x - r, self.y - r - 12, self.x - r + hp_w, self.y - r - 6, fill='red')
+
+
+# ----------------------------- Latency Tracing -----------------------------
+class LatencyTracer:
+    """Follows each input event through the tick that consumes it.
+
+    Inputs are timestamped when Tk delivers them, claimed by the next
+    game_loop tick, and closed when Tk goes idle after that tick's render,
+    i.e. once the canvas has been redrawn. F3 toggles the overlay and F4
+    writes a Chrome/Perfetto trace to LATENCY_TRACE_FILE.
+    """
+
+    def __init__(self, history=2000, trace_frames=3000, worst_kept=10):
+        self.t0 = time.perf_counter()
+        self.pending = []  # [seq, kind, detail, t] not yet claimed by a tick
+        self.seq = 0
+        self.samples = deque(maxlen=history)  # input -> frame latency in ms
+        self.worst = []  # min-heap of (latency_ms, seq, kind, detail)
+        self.worst_kept = worst_kept
+        self.frames = deque(maxlen=trace_frames)
+        self.frame_id = 0
+        self.frame = None
+        self.overlay = False
+
+    def record_input(self, kind, detail=''):
+        now = time.perf_counter()
+        # motion arrives far faster than ticks; keep only the oldest unclaimed one
+        if kind == 'motion' and self.pending and self.pending[-1][1] == 'motion':
+            return
+        self.seq += 1
+        self.pending.append((self.seq, kind, detail, now))
+
+    def discard(self):
+        # inputs no tick will answer (menu, pause, game over); the next
+        # frame would otherwise be blamed for the whole wait
+        self.pending = []
+
+    def begin_tick(self):
+        self.frame_id += 1
+        self.frame = {'id': self.frame_id, 'start': time.perf_counter(), 'inputs': self.pending,
+                      'update_end': None, 'render_end': None, 'present': None}
+        self.pending = []
+
+    def end_update(self):
+        self.frame['update_end'] = time.perf_counter()
+
+    def end_render(self):
+        self.frame['render_end'] = time.perf_counter()
+        return self.frame
+
+    def presented(self, frame):
+        now = time.perf_counter()
+        frame['present'] = now
+        for seq, kind, detail, t in frame['inputs']:
+            ms = (now - t) * 1000.0
+            self.samples.append(ms)
+            entry = (ms, seq, kind, detail)
+            if len(self.worst) < self.worst_kept:
+                heapq.heappush(self.worst, entry)
+            elif ms > self.worst[0][0]:
+                heapq.heapreplace(self.worst, entry)
+        self.frames.append(frame)
+
+    def percentiles(self, points=(50, 90, 95, 99)):
+        data = sorted(self.samples)
+        if not data:
+            return {}
+        out = {f'p{p}': data[min(len(data) - 1, int(len(data) * p / 100))] for p in points}
+        out['max'] = data[-1]
+        out['count'] = len(data)
+        return out
+
+    def report(self):
+        return {
+            'percentiles_ms': self.percentiles(),
+            'worst': [{'latency_ms': round(ms, 3), 'input': kind, 'detail': detail}
+                      for ms, _, kind, detail in sorted(self.worst, reverse=True)],
+        }
+
+    def draw_overlay(self, canvas):
+        if not self.overlay:
+            return
+        pct = self.percentiles()
+        if pct:
+            text = (f"input->frame  p50 {pct['p50']:.1f}  p95 {pct['p95']:.1f}  "
+                    f"p99 {pct['p99']:.1f}  max {pct['max']:.1f} ms  (n={pct['count']})")
+        else:
+            text = 'input->frame  no samples yet'
+        canvas.create_text(12, HEIGHT - 12, anchor='sw', text=text, fill='#7CFC00', font=('Consolas', 10))
+        if self.worst:
+            ms, _, kind, detail = max(self.worst)
+            canvas.create_text(12, HEIGHT - 28, anchor='sw', fill='#AAAAAA', font=('Consolas', 9),
+                               text=f'worst: {kind} {detail} {ms:.1f} ms')
+
+    def export(self, path):
+        def us(t):
+            return round((t - self.t0) * 1e6, 1)
+
+        events = [
+            {'name': 'thread_name', 'ph': 'M', 'pid': 1, 'tid': 1, 'args': {'name': 'game_loop'}},
+            {'name': 'thread_name', 'ph': 'M', 'pid': 1, 'tid': 2, 'args': {'name': 'input'}},
+        ]
+        for f in self.frames:
+            if f['update_end'] is None or f['render_end'] is None:
+                continue
+            events.append({'name': 'update', 'cat': 'tick', 'ph': 'X', 'pid': 1, 'tid': 1,
+                           'ts': us(f['start']), 'dur': us(f['update_end']) - us(f['start']),
+                           'args': {'frame': f['id'], 'inputs': len(f['inputs'])}})
+            events.append({'name': 'render', 'cat': 'tick', 'ph': 'X', 'pid': 1, 'tid': 1,
+                           'ts': us(f['update_end']), 'dur': us(f['render_end']) - us(f['update_end']),
+                           'args': {'frame': f['id']}})
+            events.append({'name': 'present', 'cat': 'tick', 'ph': 'X', 'pid': 1, 'tid': 1,
+                           'ts': us(f['render_end']), 'dur': us(f['present']) - us(f['render_end']),
+                           'args': {'frame': f['id']}})
+            for seq, kind, detail, t in f['inputs']:
+                name = f'{kind} {detail}'.strip()
+                events.append({'name': name, 'cat': 'input', 'ph': 'b', 'id': seq, 'pid': 1, 'tid': 2,
+                               'ts': us(t), 'args': {'frame': f['id']}})
+                events.append({'name': name, 'cat': 'input', 'ph': 'e', 'id': seq, 'pid': 1, 'tid': 2,
+                               'ts': us(f['present'])})
+        with open(path, 'w') as fh:
+            json.dump({'traceEvents': events, 'displayTimeUnit': 'ms', 'otherData': self.report()}, fh)
+        return path
+
+
 # ----------------------------- Game Controller -----------------------------
 class Game:
     def __init__(self, root):
@@ -389,12 +613,28 @@ class Game:
         self.enemies = []
         self.bullets = []
         self.powerups = []
+        self.enemy_shots = ProjectileStore()  # boss pattern bullets
+        self.boss_wave = 0
         self.keys = set()
         self.level = 1
         self.wave = 1
         self.spawn_job = None
         self.game_state = 'menu'  # menu, playing, gameover
         self.high_score = self.load_high_score()
+        self.tracer = LatencyTracer()
+        self.memwatch = MemoryMonitor.from_env(
+            root, 'shooter',
+            probes={
+                'canvas_items': lambda: len(self.canvas.find_all()),
+                'bullets': lambda: len(self.bullets),
+                'enemies': lambda: len(self.enemies),
+                'powerups': lambda: len(self.powerups),
+                'pattern_bullets': lambda: len(self.enemy_shots),
+            },
+            # Tk never reuses item ids, so this only shows how fast they are burned
+            info={'canvas_last_id': lambda: max(self.canvas.find_all(), default=0)},
+            classes=('Bullet', 'Enemy', 'Powerup'),
+        )
         self.setup_bindings()
         self.draw_menu()
 
@@ -407,6 +647,7 @@ class Game:
         self.root.bind('<space>', lambda e: None)
 
     def on_key(self, event):
+        self.tracer.record_input('key', event.keysym)
         self.keys.add(event.keysym)
         if event.keysym == 'Escape':
             if self.game_state == 'playing':
@@ -415,12 +656,21 @@ class Game:
             self.start_game()
         if self.game_state == 'gameover' and event.keysym == 'Return':
             self.start_game()
+        # latency tools
+        if event.keysym == 'F3':
+            self.tracer.overlay = not self.tracer.overlay
+        if event.keysym == 'F4':
+            path = self.tracer.export(LATENCY_TRACE_FILE)
+            print(f'latency trace written to {path}: {self.tracer.report()["percentiles_ms"]}')
+        if event.keysym == 'F6' and self.memwatch:
+            print(f'memory dump written to {self.memwatch.dump_top()}')
 
     def on_key_release(self, event):
         if event.keysym in self.keys:
             self.keys.remove(event.keysym)
 
     def on_click(self, event):
+        self.tracer.record_input('click', f'{event.x},{event.y}')
         if self.game_state == 'menu':
             self.start_game()
         elif self.game_state == 'playing':
@@ -432,7 +682,7 @@ class Game:
 
     def on_mouse_move(self, event):
         # optional: aim with mouse; not used for movement
-        pass
+        self.tracer.record_input('motion')
 
     def draw_menu(self):
         self.canvas.delete('all')
@@ -448,10 +698,14 @@ class Game:
         self.enemies = []
         self.bullets = []
         self.powerups = []
+        self.enemy_shots.clear()
+        self.enemy_shots.forget_items()
+        self.boss_wave = 0
         self.level = 1
         self.wave = 1
         self.game_state = 'playing'
         self.last_time = time.time()
+        self.tracer.discard()
         self.schedule_spawn()
         self.game_loop()
 
@@ -462,7 +716,9 @@ class Game:
 
     def spawn_wave(self):
         # spawn a handful of enemies with increasing difficulty
-        count = min(12, 4 + self.level + random.randint(0, self.level))
+        # level grows by half steps; whole levels drive the wave size
+        level = int(self.level)
+        count = min(12, 4 + level + random.randint(0, level))
         for _ in range(count):
             side = random.choice(['left', 'right', 'top'])
             if side == 'left':
@@ -477,6 +733,10 @@ class Game:
             t = random.choices([0,1,2], weights=[60,30,10])[0]
             enemy = Enemy(x, y, type_id=t, level=self.level)
             self.enemies.append(enemy)
+        # boss every few waves, only one at a time
+        if self.wave % BOSS_WAVE_INTERVAL == 0 and self.boss_wave != self.wave:
+            self.boss_wave = self.wave
+            self.enemies.append(Boss(WIDTH // 2, -60, level=int(self.level)))
         # maybe drop powerups
         if random.random() < POWERUP_CHANCE:
             px = random.randint(60, WIDTH - 60)
@@ -490,6 +750,7 @@ class Game:
         if self.game_state != 'playing':
             return
         self.paused = not self.paused
+        self.tracer.discard()
         if not self.paused:
             self.last_time = time.time()
             self.game_loop()
@@ -503,8 +764,12 @@ class Game:
         dt = now - self.last_time
         self.last_time = now
         if not self.paused:
+            self.tracer.begin_tick()
             self.update(int(dt * 1000))
+            self.tracer.end_update()
             self.render()
+            # Tk repaints the canvas on idle; close the frame once that has happened
+            self.root.after_idle(self.tracer.presented, self.tracer.end_render())
         # continue
         self.root.after(16, self.game_loop)
 
@@ -541,6 +806,9 @@ class Game:
         # update enemies
         for e in self.enemies:
             e.update(dt, player=self.player)
+            if e.is_boss:
+                e.fire(dt_ms, self.player, self.enemy_shots)
+                continue
             # enemy can shoot occasionally
             if random.random() < e.shoot_prob:
                 dx = self.player.x - e.x
@@ -551,6 +819,12 @@ class Game:
                 self.bullets.append(Bullet(e.x, e.y, nx * speed, ny * speed, owner='enemy'))
         self.enemies = [e for e in self.enemies if not e.dead]
 
+        # pattern bullets move and collide as one batch
+        self.enemy_shots.update()
+        hits = self.enemy_shots.collide(self.player.x, self.player.y, self.player.size / 2)
+        for _ in range(hits):
+            self.player.take_damage(BOSS_BULLET_DAMAGE)
+
         # update powerups
         for p in self.powerups:
             p.update(dt)
@@ -579,7 +853,8 @@ class Game:
         for e in list(self.enemies):
             if distance((e.x, e.y), (self.player.x, self.player.y)) < e.radius + (self.player.size / 2):
                 self.player.take_damage(16)
-                e.dead = True
+                if not e.is_boss:
+                    e.dead = True
 
         # player pickups
         for p in list(self.powerups):
@@ -610,7 +885,8 @@ class Game:
             self.player.score += 80
 
     def render(self):
-        self.canvas.delete('all')
+        # keep the pooled pattern bullets, everything else is redrawn
+        self.canvas.delete('!pattern_bullet')
         # background grid
         for gx in range(0, WIDTH, 80):
             self.canvas.create_line(gx, 0, gx, HEIGHT, fill='#071019')
@@ -626,6 +902,7 @@ class Game:
         # draw bullets
         for b in self.bullets:
             b.draw(self.canvas)
+        self.enemy_shots.draw(self.canvas)
         # draw player
         self.player.draw(self.canvas)
 
@@ -646,10 +923,14 @@ class Game:
         if statuses:
             self.canvas.create_text(sx, sy, text=' | '.join(statuses), fill='white')
 
+        self.tracer.draw_overlay(self.canvas)
+
     def end_game(self):
         self.game_state = 'gameover'
+        self.tracer.discard()
         self.save_high_score(self.player.score)
         self.canvas.delete('all')
+        self.enemy_shots.forget_items()
         self.canvas.create_text(WIDTH/2, HEIGHT/2 - 40, text='GAME OVER', font=('Helvetica', 36, 'bold'), fill='white')
         self.canvas.create_text(WIDTH/2, HEIGHT/2, text=f'Score: {self.player.score}', font=('Helvetica', 18), fill='#FFDD57')
         self.canvas.create_text(WIDTH/2, HEIGHT/2 + 30, text=f'High Score: {self.high_score}', font=('Helvetica', 14), fill='yellow')
@@ -690,6 +971,9 @@ def main():
     root.geometry(f'{WIDTH}x{HEIGHT}+{x}+{y}')
     root.resizable(False, False)
     game = Game(root)
+    # F5 starts/stops a profiling capture (see diagnostics.py for PROFILE_* settings)
+    profiler = Profiler.from_env(root, 'shooter')
+    root.bind('<F5>', lambda e: profiler.toggle())
     root.mainloop()
 
 
@@ -0,0 +1,363 @@
+"""
+Expectimax battle advisor for the RPG.
+
+Searches the player's options (attack, special, elemental skill, heal, the
+usable items and flee) against chance nodes for everything random in the
+engine's rules: crits, heal and bomb rolls, the flee roll and the enemy's
+30% elemental attack. The rules mirror BattleEngine.attack/heal/use_item/
+flee/enemy_turn; only state that matters for the current battle is kept,
+packed into a tuple:
+
+    (hp, enemy_hp, charge, cooldown, buff_turns, attack, potions, elixirs, bombs, crystals,
+     rest_hp, rest_hit)
+
+The rest of a group (rpg_horde) is one pool: rest_hp is what its members
+have left and rest_hit what they deal per turn at expected rates, on top
+of the target's hit. Once the target is down the player's hits go into the
+pool and its hit shrinks with it; the battle is only won when both are at 0.
+
+Search is iterative deepening under a time budget (50 ms by default): the
+answer is the best action of the deepest completed depth. Values are kept
+in a transposition table keyed on (state, depth), which lives for the
+whole battle, so later moves mostly hit entries from earlier searches. The
+first move of each battle is looked up in a persisted opening cache first.
+
+    advisor = Advisor(cache_path="advisor_cache.json")
+    (action, item), info = advisor.suggest(engine)
+    engine.fight(advisor.policy)
+"""
+
+import json
+import math
+import os
+import time
+
+from rpg_engine import ELIXIR_BONUS, ELIXIR_TURNS, SPECIAL_COOLDOWN_TURNS, calculate_element_advantage
+
+BUDGET = 0.05          # seconds per suggestion
+MAX_DEPTH = 12         # player moves; iterative deepening stops here at the latest
+TT_LIMIT = 400000      # entries before the transposition table is cleared
+OPENING_LIMIT = 20000  # entries kept in the persisted opening cache
+CHECK_EVERY = 64       # nodes between deadline checks
+NEXT_DEPTH_COST = 3.0  # a depth is skipped unless this many times the last one still fits
+DEADLINE_SHARE = 0.9   # of the budget given to the search; the rest is slack for the last check
+
+ENEMY_ELEMENTAL_CHANCE = 0.3
+FLEE_CHANCE = 0.7
+HEAL_ROLLS = range(15, 26)   # rng.randint(15, 25)
+BOMB_ROLLS = range(15, 26)
+
+# (action, item) pairs the advisor can return, in tie-break order
+ATTACK = ("attack", None)
+SPECIAL = ("special", None)
+ELEMENTAL = ("elemental", None)
+HEAL = ("heal", None)
+ELIXIR = ("item", "Strength Elixir")
+BOMB = ("item", "Bomb")
+CRYSTAL = ("item", "Elemental Crystal")
+FLEE = ("flee", None)
+
+HP, EHP, CHARGE, COOLDOWN, BUFF, ATK, POTIONS, ELIXIRS, BOMBS, CRYSTALS, REST, REST_HIT = range(12)
+
+# Terminal values: winning is worth more than escaping, both more with HP to spare
+WIN_VALUE = 1.0
+FLED_VALUE = 0.4
+HP_WEIGHT = 0.5
+ITEM_WEIGHTS = (0.04, 0.02, 0.02, 0.02)  # potion, elixir, bomb, crystal still in the bag
+
+
+class _Timeout(Exception):
+    pass
+
+
+class Battle:
+    """Rules of one battle, fixed for as long as the same enemy is alive."""
+
+    def __init__(self, engine):
+        player, enemy = engine.player, engine.enemy
+        self.max_hp = player["max_hp"]
+        self.base_attack = player["base_attack"]
+        self.crit = player["speed"] / 100
+        self.player_mult = calculate_element_advantage(player["elemen"], enemy["elemen"])
+        self.enemy_def_half = enemy["defense"] // 2
+        self.enemy_hit, self.enemy_elemental_hit, self.enemy_elemental = self.hits(enemy, player)
+        self.key = (self.max_hp, self.base_attack, player["speed"], player["defense"], player["elemen"],
+                    enemy["type"], enemy["attack"], enemy["defense"], enemy["elemen"])
+        self.damage_cache = {}
+
+    def hits(self, enemy, player):
+        """(hit, elemental hit, elemental chance) of ``enemy`` against ``player``."""
+        reach = enemy["attack"] - player["defense"] // 2
+        elemental_hit = max(1, int(reach * calculate_element_advantage(enemy["elemen"], player["elemen"])))
+        return max(1, int(reach)), elemental_hit, ENEMY_ELEMENTAL_CHANCE if enemy["elemen"] else 0.0
+
+    def state(self, engine):
+        player, inventory = engine.player, engine.player["inventory"]
+        rest_hp = rest_hit = 0
+        for enemy in engine.horde.others():
+            hit, elemental_hit, elemental = self.hits(enemy, player)
+            rest_hp += enemy["hp"]
+            rest_hit += (1.0 - elemental) * hit + elemental * elemental_hit
+        return (player["hp"], engine.enemy["hp"], player["elemental_charge"], player["special_cooldown"],
+                player["buff_turns"], player["attack"], inventory.get("Healing Potion", 0),
+                inventory.get("Strength Elixir", 0), inventory.get("Bomb", 0),
+                inventory.get("Elemental Crystal", 0), rest_hp, math.ceil(rest_hit))
+
+    def damage(self, attack, special, elemental):
+        """[(probability, damage)] for one player hit, crit included."""
+        key = (attack, special, elemental)
+        hits = self.damage_cache.get(key)
+        if hits is None:
+            base = int(attack * 1.5) if special else attack
+            damage = max(1, int((base - self.enemy_def_half) * (self.player_mult if elemental else 1.0)))
+            crit = int(damage * 1.5)
+            if self.crit <= 0 or crit == damage:
+                hits = ((1.0, damage),)
+            else:
+                hits = ((1.0 - self.crit, damage), (self.crit, crit))
+            self.damage_cache[key] = hits
+        return hits
+
+    def actions(self, s):
+        actions = [ATTACK]
+        if s[COOLDOWN] == 0:
+            actions.append(SPECIAL)
+        if s[CHARGE] >= 30:
+            actions.append(ELEMENTAL)
+        if s[POTIONS] and s[HP] < self.max_hp:
+            actions.append(HEAL)
+        if s[ELIXIRS]:
+            actions.append(ELIXIR)
+        if s[BOMBS]:
+            actions.append(BOMB)
+        if s[CRYSTALS] and s[CHARGE] < 100:
+            actions.append(CRYSTAL)
+        actions.append(FLEE)
+        return actions
+
+    # --- Transitions: lists of (probability, kind, state) ---
+    def hurt(self, s, s2, damage):
+        """Take ``damage`` off the target in list ``s2``, or off the rest once it is down."""
+        if s[EHP] > 0:
+            s2[EHP] = max(0, s[EHP] - damage)
+        elif s[REST] > 0:
+            # the pool stands in for whoever is targeted next, at the first target's defense
+            s2[REST] = max(0, s[REST] - damage)
+            s2[REST_HIT] = math.ceil(s[REST_HIT] * s2[REST] / s[REST])
+
+    def after_hit(self, s2, p):
+        s2 = tuple(s2)
+        if s2[EHP] <= 0 and s2[REST] <= 0:
+            return [(p, "won", s2)]
+        return self.enemy_turn(s2, p)
+
+    def tick(self, s):
+        """Return ``s`` as a list after the end-of-turn tick (rpg_effects.tick).
+
+        Only the elixir and the special cooldown are followed; an elemental
+        event bonus stays in the attack until the next search.
+        """
+        s = list(s)
+        if s[COOLDOWN]:
+            s[COOLDOWN] -= 1
+        if s[BUFF]:
+            s[BUFF] -= 1
+            if s[BUFF] == 0:
+                s[ATK] -= ELIXIR_BONUS
+        return s
+
+    def outcomes(self, s, action):
+        """Everything ``action`` can lead to, up to the player's next move."""
+        if action == FLEE:
+            return [(FLEE_CHANCE, "fled", s)] + self.enemy_turn(tuple(self.tick(s)), 1.0 - FLEE_CHANCE)
+        if action == CRYSTAL:
+            # no enemy turn after a crystal
+            s = self.tick(s)
+            s[CHARGE], s[CRYSTALS] = 100, s[CRYSTALS] - 1
+            return [(1.0, "move", tuple(s))]
+
+        results = []
+        if action == HEAL:
+            merged = {}
+            for roll in HEAL_ROLLS:
+                hp = min(self.max_hp, s[HP] + roll)
+                merged[hp] = merged.get(hp, 0) + 1 / len(HEAL_ROLLS)
+            for hp, p in merged.items():
+                s2 = self.tick(s)
+                s2[HP], s2[POTIONS] = hp, s[POTIONS] - 1
+                results += self.enemy_turn(tuple(s2), p)
+            return results
+        if action == ELIXIR:
+            # a second elixir only refreshes the turns
+            s2 = self.tick(s)
+            if not s2[BUFF]:
+                s2[ATK] += ELIXIR_BONUS
+            s2[BUFF], s2[ELIXIRS] = ELIXIR_TURNS, s[ELIXIRS] - 1
+            return self.enemy_turn(tuple(s2), 1.0)
+        if action == BOMB:
+            merged = {}
+            for roll in BOMB_ROLLS:
+                s2 = self.tick(s)
+                s2[BOMBS] = s[BOMBS] - 1
+                self.hurt(s, s2, roll)
+                s2 = tuple(s2)
+                merged[s2] = merged.get(s2, 0) + 1 / len(BOMB_ROLLS)
+            for s2, p in merged.items():
+                results += self.after_hit(s2, p)
+            return results
+
+        special, elemental = action == SPECIAL, action == ELEMENTAL
+        for p, damage in self.damage(s[ATK], special, elemental):
+            s2 = self.tick(s)
+            self.hurt(s, s2, damage)
+            if elemental:
+                s2[CHARGE] -= 30
+            else:
+                s2[CHARGE] = min(100, s[CHARGE] + 10)
+            if special:
+                s2[COOLDOWN] = SPECIAL_COOLDOWN_TURNS
+            results += self.after_hit(s2, p)
+        return results
+
+    def enemy_turn(self, s, p):
+        hits = [(1.0 - self.enemy_elemental, self.enemy_hit), (self.enemy_elemental, self.enemy_elemental_hit)]
+        if s[EHP] <= 0:
+            hits = [(1.0, 0)]  # the target is down; only the rest of the group attacks
+        elif self.enemy_hit == self.enemy_elemental_hit or not self.enemy_elemental:
+            hits = [(1.0, self.enemy_hit)]
+        results = []
+        for q, damage in hits:
+            hp = max(0, s[HP] - damage - s[REST_HIT])
+            results.append((p * q, "lost" if hp <= 0 else "move", s[:HP] + (hp,) + s[HP + 1:]))
+        return results
+
+    # --- Values ---
+    def items_value(self, s):
+        return sum(w * n for w, n in zip(ITEM_WEIGHTS, s[POTIONS:CRYSTALS + 1]))
+
+    def terminal(self, kind, s):
+        if kind == "lost":
+            return 0.0
+        base = WIN_VALUE if kind == "won" else FLED_VALUE
+        return base + HP_WEIGHT * s[HP] / self.max_hp + self.items_value(s)
+
+    def estimate(self, s):
+        """Leaf value from a damage race at expected rates."""
+        hits = self.damage(s[ATK], False, False)
+        dealt = sum(p * d for p, d in hits)
+        taken = s[REST_HIT]
+        if s[EHP] > 0:
+            taken += (1.0 - self.enemy_elemental) * self.enemy_hit + self.enemy_elemental * self.enemy_elemental_hit
+        turns_to_kill = math.ceil((s[EHP] + s[REST]) / dealt)
+        turns_to_die = math.ceil((s[HP] + 20 * s[POTIONS]) / taken)
+        win = 1.0 / (1.0 + (turns_to_kill / max(turns_to_die, 1)) ** 3)
+        hp_left = max(0.0, s[HP] - (turns_to_kill - 1) * taken)
+        return win * (WIN_VALUE + HP_WEIGHT * hp_left / self.max_hp) + self.items_value(s)
+
+
+class Advisor:
+    def __init__(self, budget=BUDGET, max_depth=MAX_DEPTH, cache_path=None):
+        self.budget = budget
+        self.max_depth = max_depth
+        self.cache_path = cache_path
+        self.battle = None
+        self.table = {}         # (state, depth) -> value, for self.battle
+        self.openings = {}      # opening key -> [action, item]
+        self.openings_dirty = False
+        self.nodes = 0
+        self.deadline = 0.0
+        if cache_path:
+            try:
+                with open(cache_path, "r") as f:
+                    self.openings = json.load(f)
+            except (OSError, ValueError):
+                self.openings = {}
+
+    def suggest(self, engine):
+        """Best (action, item) for the current turn plus search info."""
+        started = time.perf_counter()
+        battle = self.battle
+        if battle is None or battle.key != Battle(engine).key:
+            battle = self.battle = Battle(engine)
+            self.table = {}
+        state = battle.state(engine)
+
+        opening = None
+        if state[EHP] == engine.enemy["max_hp"]:
+            opening = repr((battle.key, state))
+            cached = self.openings.get(opening)
+            if cached:
+                return tuple(cached), {"depth": None, "value": None, "nodes": 0, "cached": True,
+                                       "ms": round((time.perf_counter() - started) * 1000, 2)}
+
+        best, depth, value = self.search(battle, state, started + self.budget * DEADLINE_SHARE)
+        if opening and depth:
+            self.openings[opening] = list(best)
+            self.openings_dirty = True
+            if len(self.openings) > OPENING_LIMIT:
+                del self.openings[next(iter(self.openings))]
+        return best, {"depth": depth, "value": value, "nodes": self.nodes, "cached": False,
+                      "ms": round((time.perf_counter() - started) * 1000, 2)}
+
+    def policy(self, engine):
+        """Policy for BattleEngine.fight."""
+        (action, item), _ = self.suggest(engine)
+        return action, item
+
+    def search(self, battle, state, deadline):
+        self.deadline = deadline
+        self.nodes = 0
+        if len(self.table) > TT_LIMIT:
+            self.table = {}
+        actions = battle.actions(state)
+        best, best_depth, best_value = actions[0], 0, None
+        for depth in range(1, self.max_depth + 1):
+            depth_started = time.perf_counter()
+            try:
+                scored = [(self.action_value(battle, state, action, depth), action) for action in actions]
+            except _Timeout:
+                break
+            best_value, best = max(scored, key=lambda pair: pair[0])
+            best_depth = depth
+            now = time.perf_counter()
+            if (now - depth_started) * NEXT_DEPTH_COST > deadline - now:
+                break  # the next depth would not finish in time
+            # put the best first so the next depth's search order helps the tie-break
+            actions.sort(key=lambda a: a != best)
+        return best, best_depth, best_value
+
+    def action_value(self, battle, s, action, depth):
+        total = 0.0
+        for p, kind, s2 in battle.outcomes(s, action):
+            if kind == "move":
+                total += p * self.value(battle, s2, depth - 1)
+            else:
+                total += p * battle.terminal(kind, s2)
+        return total
+
+    def value(self, battle, s, depth):
+        self.nodes += 1
+        if self.nodes % CHECK_EVERY == 0 and time.perf_counter() > self.deadline:
+            raise _Timeout()
+        key = (s, depth)
+        cached = self.table.get(key)
+        if cached is not None:
+            return cached
+        if depth == 0:
+            result = battle.estimate(s)
+        else:
+            result = max(self.action_value(battle, s, action, depth) for action in battle.actions(s))
+        self.table[key] = result
+        return result
+
+    def save(self):
+        if not (self.cache_path and self.openings_dirty):
+            return
+        tmp = self.cache_path + ".tmp"
+        try:
+            with open(tmp, "w") as f:
+                json.dump(self.openings, f)
+            os.replace(tmp, self.cache_path)
+            self.openings_dirty = False
+        except OSError:
+            pass
@@ -0,0 +1,217 @@
+"""
+Monte Carlo balance analyzer for the RPG content tables.
+
+Simulates battles for every class x enemy type x player level cell with the
+engine's scripted policy, spread over a process pool, and writes win rate,
+turns to kill, HP remaining and gold/XP per day as JSON and CSV.
+
+Results are cached per cell together with a hash of everything the cell
+depends on (class and enemy stats, shared tables, the source of the engine
+and the rule modules it delegates to, battle count and seed), so a rerun
+after a content tweak only recomputes the cells whose inputs changed.
+
+    python rpg_balance.py --battles 20000 --levels 1-10 --out balance
+    python rpg_balance.py --classes Mage Rogue --enemies Dragon --workers 8
+    python rpg_balance.py --vector --battles 1000000   # NumPy lockstep simulator
+"""
+
+import argparse
+import csv
+import hashlib
+import inspect
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import rpg_content
+import rpg_effects
+import rpg_engine
+import rpg_horde
+from rpg_engine import (BattleEngine, classes, enemy_types, element_system, shop_items,
+                        elemental_skills, new_game_state, scripted_policy)
+
+CACHE_FILE = "balance_cache.json"
+RULE_MODULES = (rpg_engine, rpg_effects, rpg_horde, rpg_content)  # sources behind engine_fingerprint()
+
+
+# --- Cells ---
+def parse_levels(text):
+    if "-" in text:
+        lo, hi = text.split("-", 1)
+        return list(range(int(lo), int(hi) + 1))
+    return [int(x) for x in text.split(",")]
+
+
+def cell_key(cls, enemy, level):
+    return f"{cls}|{enemy}|{level}"
+
+
+def engine_fingerprint(vector=False):
+    # the rules live in the engine and the modules it delegates to
+    source = "".join(inspect.getsource(module) for module in RULE_MODULES)
+    if vector:
+        import rpg_vectorsim
+        source += inspect.getsource(rpg_vectorsim)
+    return hashlib.sha256(source.encode("utf-8")).hexdigest()
+
+
+def cell_hash(cls, enemy, level, battles, seed, engine_hash):
+    # Everything a cell's result depends on; elements and items are shared by all cells
+    payload = json.dumps({
+        "class": classes[cls], "enemy": enemy_types[enemy], "level": level,
+        "elements": element_system, "items": shop_items, "skills": elemental_skills,
+        "battles": battles, "seed": seed, "engine": engine_hash,
+    }, sort_keys=True, default=list)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def make_player(engine, cls, level):
+    engine.choose_class(cls)
+    for _ in range(level - 1):
+        engine.level_up()
+    return engine.player
+
+
+def clone_player(template):
+    player = dict(template)
+    player["inventory"] = dict(template["inventory"])
+    player["equipment"] = dict(template["equipment"])
+    player["element_mastery"] = dict(template["element_mastery"])
+    player["skills"] = list(template["skills"])
+    # heap entries and timers are replaced, never edited, so shallow copies do
+    player["effects"] = list(template["effects"])
+    player["modifiers"] = dict(template["modifiers"])
+    player["timers"] = dict(template["timers"])
+    return player
+
+
+# --- Worker ---
+def simulate_cell(cls, enemy, level, battles, seed):
+    engine = BattleEngine(seed=f"{seed}|{cls}|{enemy}|{level}")
+    template = clone_player(make_player(engine, cls, level))
+
+    wins = losses = fled = timeouts = 0
+    turns_to_kill = 0
+    hp_left = 0.0
+    gold = xp = 0
+    for _ in range(battles):
+        engine.player = player = clone_player(template)
+        engine.game_state = new_game_state()
+        engine.roll_enemy(enemy)
+        gold_before = player["gold"]
+        xp_reward = enemy_types[enemy]["xp"] * engine.enemy["level"]
+
+        result = engine.fight(scripted_policy)
+        outcome = result["outcome"]
+        if outcome == "won":
+            wins += 1
+            turns_to_kill += result["turns"]
+            hp_left += result["hp_left"] / template["max_hp"]
+            gold += player["gold"] - gold_before
+            xp += xp_reward
+        elif outcome == "lost":
+            losses += 1
+        elif outcome == "fled":
+            fled += 1
+        else:
+            timeouts += 1
+
+    return {
+        "class": cls, "enemy": enemy, "level": level, "battles": battles,
+        "win_rate": wins / battles,
+        "loss_rate": losses / battles,
+        "timeout_rate": timeouts / battles,
+        "mean_turns_to_kill": turns_to_kill / wins if wins else None,
+        "mean_hp_left_pct": 100.0 * hp_left / wins if wins else None,
+        # one battle per in-game day
+        "gold_per_day": gold / battles,
+        "xp_per_day": xp / battles,
+    }
+
+
+# --- Sweep ---
+def load_cache(path):
+    try:
+        with open(path, "r") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def save_cache(path, cache):
+    tmp = path + ".tmp"
+    with open(tmp, "w") as f:
+        json.dump(cache, f)
+    os.replace(tmp, path)
+
+
+def sweep(class_names, enemy_names, levels, battles, seed, workers=None, cache_path=CACHE_FILE,
+          force=False, vector=False, progress=print):
+    engine_hash = engine_fingerprint(vector)
+    if vector:
+        from rpg_vectorsim import simulate_cell as worker
+    else:
+        worker = simulate_cell
+    cache = {} if force else load_cache(cache_path)
+    results = {}
+    todo = []
+    for cls in class_names:
+        for enemy in enemy_names:
+            for level in levels:
+                key = cell_key(cls, enemy, level)
+                digest = cell_hash(cls, enemy, level, battles, seed, engine_hash)
+                cached = cache.get(key)
+                if cached and cached["hash"] == digest:
+                    results[key] = cached["result"]
+                else:
+                    todo.append((key, digest, (cls, enemy, level, battles, seed)))
+
+    progress(f"{len(results)} cells cached, {len(todo)} to simulate ({len(todo) * battles:,} battles)")
+    started = time.time()
+    if todo:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = {pool.submit(worker, *args): (key, digest) for key, digest, args in todo}
+            for done, future in enumerate(as_completed(futures), 1):
+                key, digest = futures[future]
+                results[key] = future.result()
+                cache[key] = {"hash": digest, "result": results[key]}
+                if done % 20 == 0 or done == len(todo):
+                    progress(f"  {done}/{len(todo)} cells, {time.time() - started:.1f}s")
+        save_cache(cache_path, cache)
+    return [results[cell_key(c, e, l)] for c in class_names for e in enemy_names for l in levels]
+
+
+def write_reports(rows, out):
+    with open(out + ".json", "w") as f:
+        json.dump({"generated": time.strftime("%Y-%m-%dT%H:%M:%S"), "cells": rows}, f, indent=1)
+    with open(out + ".csv", "w", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=list(rows[0].keys()))
+        writer.writeheader()
+        writer.writerows(rows)
+    return out + ".json", out + ".csv"
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Monte Carlo balance sweep for the RPG")
+    parser.add_argument("--battles", type=int, default=10000, help="battles per cell")
+    parser.add_argument("--levels", default="1-10", help="player levels, e.g. 1-10 or 1,5,10")
+    parser.add_argument("--classes", nargs="*", default=list(classes))
+    parser.add_argument("--enemies", nargs="*", default=list(enemy_types))
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--workers", type=int, default=None, help="processes (default: all cores)")
+    parser.add_argument("--cache", default=CACHE_FILE)
+    parser.add_argument("--force", action="store_true", help="ignore the cache and recompute everything")
+    parser.add_argument("--vector", action="store_true", help="use the NumPy simulator (rpg_vectorsim)")
+    parser.add_argument("--out", default="balance_report", help="report path without extension")
+    args = parser.parse_args(argv)
+
+    started = time.time()
+    rows = sweep(args.classes, args.enemies, parse_levels(args.levels), args.battles, args.seed,
+                 workers=args.workers, cache_path=args.cache, force=args.force, vector=args.vector)
+    paths = write_reports(rows, args.out)
+    print(f"Wrote {', '.join(paths)} in {time.time() - started:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,415 @@
+"""
+Benchmarks for the RPG, with a baseline check for CI.
+
+Three layers, each timed where Test.py spends its time:
+
+    micro    calculate_damage, calculate_element_advantage, spawn_enemy and
+             level_up, per call
+    battle   whole battles played with the scripted policy, per turn and per
+             battle, both inline and step by step (as Test.py plays them),
+             and one turn against a group of 1 or 30 enemies
+    save     a save (snapshot queued and on disk) and a load (snapshot plus
+             journal) next to a battle log of 10 to 1,000,000 lines; the
+             log is archived by BattleLog and not part of the save, so these
+             should stay flat as the log grows
+    widget   update_status, log_message and a turn against 1 or 30 enemies,
+             including the redraw, on a real Tk; needs a display, so an Xvfb server is started when DISPLAY
+             is unset (the group is reported as skipped without either)
+
+Every benchmark reports the median and minimum time per unit over several
+runs, in microseconds, and the whole set is written as JSON. Given a
+baseline (an earlier --out file), any median that grew by more than the
+tolerance is printed as a REGRESSION and the exit status is 1:
+
+    python rpg_bench.py --out bench_results.json
+    python rpg_bench.py --baseline bench_results.json --tolerance 0.25
+    python rpg_bench.py --quick --groups micro battle   # a few seconds
+"""
+
+import argparse
+import atexit
+import contextlib
+import json
+import os
+import platform
+import select
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+from rpg_engine import (BattleEngine, calculate_damage, calculate_element_advantage, classes,
+                        new_player, new_enemy, new_game_state, scripted_policy)
+from rpg_log import BattleLog
+from rpg_save import SaveStore
+
+RESULTS_FILE = "bench_results.json"
+GROUPS = ("micro", "battle", "save", "widget")
+LOG_SIZES = (10, 1000, 100000, 1000000)  # battle log lines next to the save
+QUICK_LOG_SIZES = (10, 1000, 10000)
+REPEAT = 7             # runs per benchmark; the median run is reported
+RUN_SECONDS = 0.05     # micro benchmarks loop until one run takes this long
+TOLERANCE = 0.25       # allowed growth of a median over the baseline
+MIN_DELTA_US = 0.25    # ... and never flag less than this, whatever the ratio
+SEED = 1
+GROUP_SIZES = (1, 30)  # enemies in the group turn benchmarks
+BATTLES = 30           # battles per game at most; most games are lost sooner
+
+
+# --- Timing ---
+def measure(fn, number=None, repeat=REPEAT):
+    """Time ``fn()``; returns {median_us, min_us, runs, number} per call."""
+    if number is None:
+        number = 1
+        while True:
+            started = time.perf_counter_ns()
+            for _ in range(number):
+                fn()
+            if time.perf_counter_ns() - started >= RUN_SECONDS * 1e9:
+                break
+            number *= 2
+    runs = []
+    for _ in range(repeat):
+        started = time.perf_counter_ns()
+        for _ in range(number):
+            fn()
+        runs.append((time.perf_counter_ns() - started) / number / 1000)
+    return summary(runs, number)
+
+
+def summary(samples, number=1):
+    return {"median_us": round(statistics.median(samples), 3), "min_us": round(min(samples), 3),
+            "runs": len(samples), "number": number}
+
+
+def new_engine(seed=SEED, player_class="Warrior", log=None):
+    engine = BattleEngine(player=new_player(), enemy=new_enemy(), game_state=new_game_state(),
+                          seed=seed, log=log)
+    engine.choose_class(player_class)
+    engine.spawn_enemy()
+    return engine
+
+
+# --- Micro ---
+def bench_micro(quick=False):
+    engine = new_engine()
+    player, enemy, rng = engine.player, engine.enemy, engine.rng
+    elements = list({stats["elemen"] for stats in classes.values()})
+    pairs = [(a, b) for a in elements for b in elements]
+    pair = iter(())
+
+    def element_advantage():
+        nonlocal pair
+        try:
+            a, b = next(pair)
+        except StopIteration:
+            pair = iter(pairs)
+            a, b = next(pair)
+        calculate_element_advantage(a, b)
+
+    # level_up changes these; put them back so every call does the same work
+    before = {key: player[key] for key in ("level", "xp", "xp_to_next", "max_hp", "hp",
+                                           "base_attack", "base_defense", "attack", "defense")}
+    potions, skills = player["inventory"].get("Healing Potion", 0), list(player["skills"])
+
+    def level_up():
+        engine.level_up()
+        player.update(before)
+        player["inventory"]["Healing Potion"] = potions
+        player["skills"][:] = skills
+
+    repeat = 3 if quick else REPEAT
+    return {
+        "micro.calculate_damage": measure(lambda: calculate_damage(player, enemy, False, False, rng), repeat=repeat),
+        "micro.calculate_damage.special": measure(lambda: calculate_damage(player, enemy, True, False, rng),
+                                                  repeat=repeat),
+        "micro.calculate_element_advantage": measure(element_advantage, repeat=repeat),
+        "micro.spawn_enemy": measure(engine.spawn_enemy, repeat=repeat),
+        "micro.level_up": measure(level_up, repeat=repeat),
+    }
+
+
+# --- Battles ---
+def play(deferred, games, seed=SEED):
+    """Play ``games`` seeded games to the end; returns (microseconds, turns, battles)."""
+    elapsed = turns = battles = 0
+    for game in range(games):
+        engine = new_engine(seed + game, list(classes)[game % len(classes)])
+        if deferred:
+            engine.defer()
+        for _ in range(BATTLES):
+            if not engine.game_state["game_active"]:
+                break
+            started = time.perf_counter_ns()
+            result = engine.fight(scripted_policy)
+            elapsed += time.perf_counter_ns() - started
+            turns += result["turns"]
+            battles += 1
+    return elapsed / 1000, turns, battles
+
+
+def bench_battle(quick=False):
+    # the same seeded games every run, so runs differ only in timing
+    results = {}
+    for mode, deferred in (("inline", False), ("steps", True)):
+        per_turn, per_battle = [], []
+        for _ in range(3 if quick else REPEAT):
+            elapsed, turns, battles = play(deferred, 20 if quick else 100)
+            per_turn.append(elapsed / turns)
+            per_battle.append(elapsed / battles)
+        results[f"battle.turn.{mode}"] = summary(per_turn)
+        results[f"battle.full.{mode}"] = summary(per_battle)
+
+    repeat = 3 if quick else REPEAT
+    for size in GROUP_SIZES:
+        engine = new_engine()
+        turn = group_turn(engine, size)
+        results[f"battle.group_turn.{size}"] = measure(turn, repeat=repeat)
+        if size > 1:
+            results[f"battle.area_attack.{size}"] = measure(
+                lambda: (turn.heal(), engine.area_attack("Hujan Halilintar", 1.0)), repeat=repeat)
+    return results
+
+
+def group_turn(engine, size):
+    """An attack and the reply of ``size`` Goblins; every call starts from full HP."""
+    player = engine.player
+    player["base_defense"] = player["defense"] = 30  # Goblins hit for 1, so nobody dies
+    engine.start_encounter(["Goblin"] * size, level=1)
+    members = list(engine.horde.members)
+
+    def heal():
+        player["hp"] = player["max_hp"]
+        for enemy in members:
+            enemy["hp"] = enemy["max_hp"]
+
+    def turn():
+        heal()
+        engine.act("attack")
+        engine.run_steps()
+
+    turn.heal = heal
+    return turn
+
+
+# --- Saves ---
+def fill_log(log, lines):
+    for n in range(lines):
+        log.append(f"⚔️ You dealt {n % 37 + 3} damage to the Goblin! (turn {n})")
+    log.flush()
+
+
+def bench_save(quick=False):
+    results = {}
+    repeat = 5 if quick else 15
+    for lines in QUICK_LOG_SIZES if quick else LOG_SIZES:
+        with tempfile.TemporaryDirectory(prefix="rpg_bench_") as directory:
+            log = BattleLog(archive_path=os.path.join(directory, "battle_log.jsonl"))
+            engine = new_engine(log=log)
+            started = time.perf_counter_ns()
+            fill_log(log, lines)
+            fill_us = (time.perf_counter_ns() - started) / 1000
+            state = {"player": engine.player, "game_state": engine.game_state}
+            saves = SaveStore(os.path.join(directory, "slot-001.sav"))
+
+            def save():
+                engine.run_steps()
+                saves.snapshot(state)
+                saves.drain()
+
+            results[f"save.log_{lines}"] = measure(save, number=1, repeat=repeat)
+            results[f"save.log_{lines}"]["bytes"] = os.path.getsize(saves.path)
+            results[f"load.log_{lines}"] = measure(saves.load, number=1, repeat=repeat)
+            results[f"log.append.log_{lines}"] = summary([fill_us / lines])
+            saves.close()
+            atexit.unregister(saves.close)
+            log.close()
+    return results
+
+
+# --- Widgets ---
+@contextlib.contextmanager
+def virtual_display():
+    """Yield None with a usable DISPLAY, or the reason there is none."""
+    if os.environ.get("DISPLAY"):
+        yield None
+        return
+    xvfb = shutil.which("Xvfb")
+    if not xvfb:
+        yield "no DISPLAY set and Xvfb is not installed"
+        return
+    # -displayfd: Xvfb picks a free display and writes its number when ready
+    read_fd, write_fd = os.pipe()
+    server = subprocess.Popen([xvfb, "-displayfd", str(write_fd), "-screen", "0", "1280x1024x24",
+                               "-nolisten", "tcp"], pass_fds=(write_fd,),
+                              stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    os.close(write_fd)
+    try:
+        ready, _, _ = select.select([read_fd], [], [], 10)
+        number = os.read(read_fd, 16).decode().strip() if ready else ""
+        if not number:
+            yield "Xvfb did not start"
+            return
+        os.environ["DISPLAY"] = ":" + number
+        try:
+            yield None
+        finally:
+            del os.environ["DISPLAY"]
+    finally:
+        os.close(read_fd)
+        server.terminate()
+        server.wait()
+
+
+def bench_widget(quick=False):
+    """update_status and log_message on a real RPGGame; {} plus the skip reason."""
+    with virtual_display() as missing:
+        if missing:
+            return {}, missing
+        import tkinter as tk
+        cwd = os.getcwd()
+        with tempfile.TemporaryDirectory(prefix="rpg_bench_") as directory:
+            os.chdir(directory)  # saves/, the log archive and the advisor cache land here
+            try:
+                import Test
+                try:
+                    game = Test.RPGGame()
+                except tk.TclError as e:
+                    return {}, f"Tk could not open the display: {e}"
+                atexit.unregister(game.advisor.save)
+                try:
+                    return widget_results(game, quick), None
+                finally:
+                    game.root.destroy()
+            finally:
+                os.chdir(cwd)
+
+
+def widget_results(game, quick):
+    root = game.root
+    game.engine.choose_class("Warrior")
+    game.scenes.show("battle")
+    root.update()
+    player = game.player
+    repeat = 3 if quick else REPEAT
+
+    def update_status():
+        player["hp"] = player["hp"] - 1 if player["hp"] > 1 else player["max_hp"]
+        game.update_status()
+        root.update_idletasks()
+
+    def log_message():
+        game.log_message("⚔️ You dealt 12 damage to the Goblin!")
+        root.update_idletasks()  # runs the after_idle flush into the log widget
+
+    def log_turn():
+        # a typical turn logs a handful of lines that land in one insert
+        for _ in range(6):
+            game.log_message("⚔️ You dealt 12 damage to the Goblin!")
+        root.update_idletasks()
+
+    results = {
+        "widget.update_status": measure(update_status, repeat=repeat),
+        "widget.log_message": measure(log_message, repeat=repeat),
+        "widget.log_turn": measure(log_turn, repeat=repeat),
+    }
+    for size in GROUP_SIZES:
+        turn = group_turn(game.engine, size)
+
+        def redrawn_turn():
+            turn()
+            root.update_idletasks()
+
+        results[f"widget.group_turn.{size}"] = measure(redrawn_turn, repeat=repeat)
+    return results
+
+
+# --- Report ---
+def run(groups, quick=False):
+    report = {
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "machine": f"{platform.system()} {platform.machine()} {platform.node()}",
+        "quick": quick,
+        "results": {},
+        "skipped": {},
+    }
+    for group in groups:
+        started = time.perf_counter()
+        if group == "widget":
+            results, reason = bench_widget(quick)
+            if reason:
+                report["skipped"][group] = reason
+        else:
+            results = {"micro": bench_micro, "battle": bench_battle, "save": bench_save}[group](quick)
+        report["results"].update(results)
+        print(f"{group}: {len(results)} benchmarks in {time.perf_counter() - started:.1f}s", file=sys.stderr)
+    return report
+
+
+def compare(report, baseline, tolerance=TOLERANCE):
+    """[(name, baseline median, median)] for every median above the allowance."""
+    regressions = []
+    for name, result in report["results"].items():
+        base = baseline.get("results", {}).get(name)
+        if base is None:
+            continue
+        now, before = result["median_us"], base["median_us"]
+        if now > before * (1 + tolerance) and now - before > MIN_DELTA_US:
+            regressions.append((name, before, now))
+    return regressions
+
+
+def print_report(report, baseline=None):
+    base = (baseline or {}).get("results", {})
+    print(f"{'benchmark':<36}{'median us':>14}{'min us':>14}{'baseline':>14}{'change':>9}")
+    for name, result in report["results"].items():
+        line = f"{name:<36}{result['median_us']:>14,.3f}{result['min_us']:>14,.3f}"
+        if name in base:
+            before = base[name]["median_us"]
+            change = (result["median_us"] - before) / before if before else 0.0
+            line += f"{before:>14,.3f}{change:>+9.0%}"
+        if "bytes" in result:
+            line = f"{line:<87}   {result['bytes']:,} bytes"
+        print(line)
+    for group, reason in report["skipped"].items():
+        print(f"{group}: skipped ({reason})")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the RPG engine, saves and widgets")
+    parser.add_argument("--groups", nargs="*", choices=GROUPS, default=list(GROUPS))
+    parser.add_argument("--quick", action="store_true", help="fewer runs and log sizes up to 10,000 lines")
+    parser.add_argument("--out", default=RESULTS_FILE, help="where the JSON results are written")
+    parser.add_argument("--baseline", help="earlier results to compare against; regressions exit with 1")
+    parser.add_argument("--tolerance", type=float, default=TOLERANCE,
+                        help="allowed growth of a median over the baseline (0.25 = 25%%)")
+    args = parser.parse_args(argv)
+
+    baseline = None
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+    report = run(args.groups, args.quick)
+    with open(args.out, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print_report(report, baseline)
+    print(f"Wrote {args.out}")
+
+    if baseline is None:
+        return
+    if baseline.get("machine") != report["machine"] or baseline.get("quick") != report["quick"]:
+        print(f"note: baseline is from {baseline.get('machine')} (quick={baseline.get('quick')}); "
+              f"times may not be comparable")
+    regressions = compare(report, baseline, args.tolerance)
+    for name, before, now in regressions:
+        print(f"REGRESSION {name}: {now:,.3f} us, baseline {before:,.3f} us "
+              f"(+{(now - before) / before:.0%}, allowed +{args.tolerance:.0%})")
+    if regressions:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,303 @@
+"""
+Game content for the RPG, loaded from the JSON files in content/.
+
+Every *.json file in the directory holds one or more sections (elements,
+classes, enemies, items, skills, area_skills, encounters); files are merged in name order, so a mod
+can ship e.g. content/zz_undead.json with extra enemies or override an
+existing entry. The merged data is validated and compiled into integer-id
+tables:
+
+- element_index and a 4x4 (N x N) advantage matrix
+- one EnemyStats row per enemy plus column tuples for array style use
+- item indexes by type, the drop table and the spawn pool
+- per location and level band encounter tables, as Vose alias tables so a
+  spawn costs two random numbers however many enemies a table lists; a band
+  with a "group" range spawns that many enemies at once
+
+The compiled Content is pickled under content/.cache/, keyed by a hash of the
+raw file bytes, so later start-ups skip parsing and validation entirely.
+"""
+
+import glob
+import hashlib
+import json
+import os
+import pickle
+from collections import namedtuple
+
+CONTENT_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "content")
+CACHE_DIR_NAME = ".cache"
+FORMAT_VERSION = 3  # bump when the compiled layout changes
+
+SECTIONS = ("elements", "classes", "enemies", "items", "skills", "area_skills", "encounters")
+ITEM_TYPES = ("consumable", "weapon", "armor", "accessory", "special")
+ITEM_SLOTS = {"weapon": "weapon", "armor": "armor", "accessory": "accessory"}
+RANDOM_ELEMENT = "Random"
+
+EnemyStats = namedtuple("EnemyStats", "id name hp_lo hp_hi attack_lo attack_hi defense_lo defense_hi "
+                                      "xp gold element_id element speed")
+EncounterTable = namedtuple("EncounterTable", "lo hi names prob alias group_lo group_hi")
+
+
+class ContentError(ValueError):
+    pass
+
+
+# --- Loading ---
+def content_files(directory):
+    return sorted(glob.glob(os.path.join(directory, "*.json")))
+
+
+def content_hash(paths):
+    digest = hashlib.sha256(f"v{FORMAT_VERSION}".encode())
+    for path in paths:
+        digest.update(os.path.basename(path).encode("utf-8"))
+        with open(path, "rb") as f:
+            digest.update(f.read())
+    return digest.hexdigest()
+
+
+def read_sections(paths):
+    merged = {section: {} for section in SECTIONS}
+    for path in paths:
+        with open(path, "r", encoding="utf-8") as f:
+            try:
+                data = json.load(f)
+            except ValueError as e:
+                raise ContentError(f"{os.path.basename(path)}: {e}") from None
+        for section, entries in data.items():
+            if section not in merged:
+                raise ContentError(f"{os.path.basename(path)}: unknown section {section!r}")
+            if not isinstance(entries, dict):
+                raise ContentError(f"{os.path.basename(path)}: section {section!r} must be an object")
+            merged[section].update(entries)
+    return merged
+
+
+# --- Validation ---
+def _require(entry, where, fields):
+    for field, kind in fields.items():
+        if field not in entry:
+            raise ContentError(f"{where}: missing {field!r}")
+        if not isinstance(entry[field], kind) or isinstance(entry[field], bool) and kind is not bool:
+            raise ContentError(f"{where}: {field!r} must be {getattr(kind, '__name__', kind)}")
+
+
+def _range(entry, where, field):
+    value = entry[field]
+    if not (isinstance(value, list) and len(value) == 2 and all(isinstance(v, int) for v in value)):
+        raise ContentError(f"{where}: {field!r} must be [low, high] integers")
+    if value[0] > value[1]:
+        raise ContentError(f"{where}: {field!r} low {value[0]} is above high {value[1]}")
+
+
+def validate(data):
+    elements = data["elements"]
+    if not elements:
+        raise ContentError("no elements defined")
+    for name, entry in elements.items():
+        where = f"element {name!r}"
+        _require(entry, where, {"weakness": str, "strength": str, "color": str, "icon": str})
+        for field in ("weakness", "strength"):
+            if entry[field] not in elements:
+                raise ContentError(f"{where}: {field} {entry[field]!r} is not an element")
+
+    for name, entry in data["classes"].items():
+        where = f"class {name!r}"
+        _require(entry, where, {"hp": int, "attack": int, "defense": int, "speed": int,
+                                "special_ability": str, "elemen": str, "description": str})
+        if entry["elemen"] not in elements:
+            raise ContentError(f"{where}: unknown element {entry['elemen']!r}")
+        if entry["hp"] <= 0:
+            raise ContentError(f"{where}: hp must be positive")
+
+    if not data["enemies"]:
+        raise ContentError("no enemies defined")
+    for name, entry in data["enemies"].items():
+        where = f"enemy {name!r}"
+        _require(entry, where, {"xp": int, "gold": int, "elemen": str})
+        for field in ("hp_range", "attack_range", "defense_range"):
+            if field not in entry:
+                raise ContentError(f"{where}: missing {field!r}")
+            _range(entry, where, field)
+        if entry["hp_range"][0] <= 0:
+            raise ContentError(f"{where}: hp_range must be positive")
+        if entry["elemen"] not in elements and entry["elemen"] != RANDOM_ELEMENT:
+            raise ContentError(f"{where}: unknown element {entry['elemen']!r}")
+        speed = entry.get("speed", 0)  # turn order in a group; also the crit chance, like the player's
+        if not isinstance(speed, int) or isinstance(speed, bool) or not 0 <= speed <= 100:
+            raise ContentError(f"{where}: speed must be an integer from 0 to 100")
+
+    for name, entry in data["items"].items():
+        where = f"item {name!r}"
+        _require(entry, where, {"price": int, "type": str})
+        if entry["type"] not in ITEM_TYPES:
+            raise ContentError(f"{where}: type must be one of {', '.join(ITEM_TYPES)}")
+        bonus = {"weapon": "attack_bonus", "armor": "defense_bonus", "accessory": "hp_bonus"}.get(entry["type"])
+        if bonus and not isinstance(entry.get(bonus), int):
+            raise ContentError(f"{where}: {entry['type']} needs an integer {bonus!r}")
+    if not any(entry.get("drop") for entry in data["items"].values()):
+        # enemies roll their loot from these
+        raise ContentError("items: at least one item needs \"drop\": true")
+
+    for element in data["skills"]:
+        if element not in elements:
+            raise ContentError(f"skills: unknown element {element!r}")
+    for element in elements:
+        skills = data["skills"].get(element)
+        # a bare string would pass as a list of one-letter names
+        if not isinstance(skills, list) or not skills or not all(isinstance(s, str) for s in skills):
+            raise ContentError(f"skills: element {element!r} needs a non-empty list of skill names")
+    known_skills = {skill for skills in data["skills"].values() for skill in skills}
+    for name, share in data["area_skills"].items():
+        if name not in known_skills:
+            raise ContentError(f"area_skills: {name!r} is not a skill of any element")
+        if not isinstance(share, (int, float)) or isinstance(share, bool) or not 0 < share <= 1:
+            raise ContentError(f"area_skills: {name!r} needs the share of damage dealt to the other enemies, in (0, 1]")
+
+    for location, bands in data["encounters"].items():
+        where = f"encounters {location!r}"
+        if not isinstance(bands, list) or not bands:
+            raise ContentError(f"{where}: needs a non-empty list of level bands")
+        for band in bands:
+            if not isinstance(band, dict) or "levels" not in band or "enemies" not in band:
+                raise ContentError(f"{where}: every band needs 'levels' and 'enemies'")
+            _range(band, where, "levels")
+            if "group" in band:
+                _range(band, where, "group")
+                if band["group"][0] < 1:
+                    raise ContentError(f"{where} {band['levels']}: 'group' must be at least 1")
+            weights = band["enemies"]
+            if not isinstance(weights, dict) or not weights:
+                raise ContentError(f"{where} {band['levels']}: 'enemies' must map enemy names to weights")
+            for name, weight in weights.items():
+                if name not in data["enemies"]:
+                    raise ContentError(f"{where} {band['levels']}: unknown enemy {name!r}")
+                if not isinstance(weight, (int, float)) or isinstance(weight, bool) or weight <= 0:
+                    raise ContentError(f"{where} {band['levels']}: weight of {name!r} must be positive")
+
+
+# --- Alias tables ---
+def build_alias(weights):
+    """Vose's alias method: (prob, alias) lists for O(1) weighted sampling."""
+    n = len(weights)
+    total = float(sum(weights))
+    scaled = [w * n / total for w in weights]
+    prob, alias = [1.0] * n, list(range(n))
+    small = [i for i, p in enumerate(scaled) if p < 1.0]
+    large = [i for i, p in enumerate(scaled) if p >= 1.0]
+    while small and large:
+        s, l = small.pop(), large.pop()
+        prob[s], alias[s] = scaled[s], l
+        scaled[l] -= 1.0 - scaled[s]
+        (small if scaled[l] < 1.0 else large).append(l)
+    # whatever is left is 1.0 up to rounding
+    return tuple(prob), tuple(alias)
+
+
+def sample_alias(table, rng):
+    i = int(rng.random() * len(table.names))
+    return table.names[i] if rng.random() < table.prob[i] else table.names[table.alias[i]]
+
+
+# --- Compiled form ---
+class Content:
+    def __init__(self, data, digest):
+        self.digest = digest
+
+        # Dict views with the same shape the game always used
+        self.element_system = data["elements"]
+        self.classes = data["classes"]
+        self.enemy_types = {name: dict(entry, hp_range=tuple(entry["hp_range"]),
+                                       attack_range=tuple(entry["attack_range"]),
+                                       defense_range=tuple(entry["defense_range"]))
+                            for name, entry in data["enemies"].items()}
+        self.shop_items = data["items"]
+        self.elemental_skills = data["skills"]
+        self.area_skills = data["area_skills"]  # skill -> share of its damage dealt to every other enemy
+
+        # Elements: ids and the advantage matrix
+        self.element_names = tuple(self.element_system)
+        self.element_index = {name: i for i, name in enumerate(self.element_names)}
+        self.advantage = tuple(
+            tuple(1.5 if self.element_system[a]["strength"] == d else
+                  0.5 if self.element_system[a]["weakness"] == d else 1.0
+                  for d in self.element_names)
+            for a in self.element_names)
+
+        # Enemies: one row each, plus columns
+        self.enemy_names = tuple(self.enemy_types)
+        self.enemy_index = {name: i for i, name in enumerate(self.enemy_names)}
+        self.enemies = tuple(
+            EnemyStats(i, name, *e["hp_range"], *e["attack_range"], *e["defense_range"], e["xp"], e["gold"],
+                       self.element_index.get(e["elemen"], -1), e["elemen"], e.get("speed", 0))
+            for i, (name, e) in enumerate(self.enemy_types.items()))
+        self.enemy_stats = {row.name: row for row in self.enemies}
+        self.enemy_columns = {field: tuple(getattr(row, field) for row in self.enemies)
+                              for field in EnemyStats._fields}
+        self.spawn_pool = tuple(name for name, e in self.enemy_types.items() if e.get("spawn", True))
+
+        # Items: indexes by type, equipment slots, drops
+        self.item_names = tuple(self.shop_items)
+        self.items_by_type = {kind: tuple(n for n, d in self.shop_items.items() if d["type"] == kind)
+                              for kind in ITEM_TYPES}
+        self.item_slot = {name: ITEM_SLOTS.get(d["type"]) for name, d in self.shop_items.items()}
+        self.drop_items = tuple(n for n, d in self.shop_items.items() if d.get("drop"))
+
+        # Encounters: location -> alias tables sorted by level band
+        self.encounters = {}
+        for location, bands in data["encounters"].items():
+            tables = []
+            for band in sorted(bands, key=lambda b: b["levels"][1]):
+                names = tuple(band["enemies"])
+                group = band.get("group", (1, 1))
+                tables.append(EncounterTable(band["levels"][0], band["levels"][1], names,
+                                             *build_alias([band["enemies"][n] for n in names]), *group))
+            self.encounters[location] = tuple(tables)
+
+    def encounter_table(self, location, level):
+        """Alias table for ``location`` at player ``level``, or None if the location has none."""
+        tables = self.encounters.get(location)
+        if not tables:
+            return None
+        for table in tables:
+            if level <= table.hi:
+                return table
+        return tables[-1]
+
+
+def compile_content(data, digest):
+    validate(data)
+    return Content(data, digest)
+
+
+def load_content(directory=CONTENT_DIR, use_cache=True):
+    paths = content_files(directory)
+    if not paths:
+        raise ContentError(f"no content files in {directory}")
+    digest = content_hash(paths)
+    cache_path = os.path.join(directory, CACHE_DIR_NAME, f"content-{digest[:32]}.pickle")
+
+    if use_cache:
+        try:
+            with open(cache_path, "rb") as f:
+                content = pickle.load(f)
+            if content.digest == digest:
+                return content
+        except Exception:
+            pass  # missing or stale cache, rebuild below
+
+    content = compile_content(read_sections(paths), digest)
+    if use_cache:
+        try:
+            os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+            tmp = cache_path + ".tmp"
+            with open(tmp, "wb") as f:
+                pickle.dump(content, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp, cache_path)
+            for old in glob.glob(os.path.join(os.path.dirname(cache_path), "content-*.pickle")):
+                if old != cache_path:
+                    os.remove(old)
+        except OSError:
+            pass  # read-only install; just compile every time
+    return content
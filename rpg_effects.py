@@ -0,0 +1,119 @@
+"""
+Timed effects for the RPG: buffs, debuffs, damage over time and cooldowns.
+
+Effects live in the unit's own dict (the player), so they are saved,
+journaled and cloned with it like every other field:
+
+    unit["turn"]       turns completed so far
+    unit["effects"]    heap of [due, seq, name, stat, amount, ends, unique]
+    unit["modifiers"]  stat -> sum of the active modifiers
+    unit["timers"]     name -> [expires, seq, stat, modifier] of the current
+                       unique effect
+    unit["effect_seq"] last sequence number handed out
+
+An effect with a stat and no ``per_turn`` adds ``amount`` to that stat
+until it expires; one with ``per_turn`` adds it to the stat itself at the
+end of every turn (a DoT with a negative amount, regeneration with a
+positive one); one without a stat is a plain timer, such as a cooldown.
+Stats are never edited directly: the owner derives them as base value plus
+modifier() after each change.
+
+The heap is keyed by the turn the effect is next due, so tick() only looks
+at entries that are due: each expiry costs O(log n) however many effects
+are active. A unique effect applied again replaces the current one; the old
+heap entry is left in place and skipped when it comes up.
+
+    apply(player, "Strength Elixir", 3, "attack", 5)
+    tick(player)                    # end of a turn
+    remaining(player, "Strength Elixir")  -> 2
+"""
+
+import heapq
+
+DUE, SEQ, NAME, STAT, AMOUNT, ENDS, UNIQUE = range(7)
+
+
+def new_effects():
+    """Fields to merge into a fresh unit dict."""
+    return {"turn": 0, "effects": [], "modifiers": {}, "timers": {}, "effect_seq": 0}
+
+
+def apply(unit, name, turns, stat=None, amount=0, per_turn=False, unique=True):
+    """Start an effect lasting the next ``turns`` turns.
+
+    Applied during a turn, it covers the ``turns`` turns after the current
+    one and ends with the tick of the last; a per-turn effect applies its
+    amount at the end of each of them. Returns the heap entry.
+    """
+    turn = unit["turn"]
+    expires = turn + 1 + turns
+    seq = unit["effect_seq"] = unit["effect_seq"] + 1
+    modifies = stat is not None and not per_turn
+    if unique:
+        clear(unit, name)
+        unit["timers"][name] = [expires, seq, stat if modifies else None, amount if modifies else 0]
+    if modifies:
+        _modify(unit, stat, amount)
+    due = turn + 2 if per_turn else expires
+    entry = [due, seq, name, stat, amount, expires if per_turn else None, unique]
+    heapq.heappush(unit["effects"], entry)
+    return entry
+
+
+def remaining(unit, name):
+    """Turns left on the current unique effect ``name``, 0 when none."""
+    timer = unit["timers"].get(name)
+    return max(0, timer[0] - unit["turn"]) if timer else 0
+
+
+def modifier(unit, stat):
+    return unit["modifiers"].get(stat, 0)
+
+
+def tick(unit):
+    """End a turn: run per-turn effects and expire the ones that are due.
+
+    Returns [(name, stat, amount, expired)] for everything that happened,
+    in due order; per-turn effects report the amount they applied.
+    """
+    unit["turn"] += 1
+    turn = unit["turn"]
+    heap = unit["effects"]
+    events = []
+    while heap and heap[0][DUE] <= turn:
+        entry = heapq.heappop(heap)
+        name, stat, amount, ends = entry[NAME], entry[STAT], entry[AMOUNT], entry[ENDS]
+        timer = unit["timers"].get(name)
+        if entry[UNIQUE] and (timer is None or timer[1] != entry[SEQ]):
+            continue  # replaced by a later application
+        if ends is not None:
+            value = max(0, unit[stat] + amount)
+            cap = unit.get("max_" + stat)
+            unit[stat] = value if cap is None else min(cap, value)
+            expired = entry[DUE] >= ends
+            if not expired:
+                heapq.heappush(heap, [entry[DUE] + 1, entry[SEQ], name, stat, amount, ends, entry[UNIQUE]])
+        else:
+            if stat is not None:
+                _modify(unit, stat, -amount)
+            expired = True
+        if expired and entry[UNIQUE]:
+            del unit["timers"][name]
+        events.append((name, stat, amount, expired))
+    return events
+
+
+def clear(unit, name):
+    """End the unique effect ``name`` now, without waiting for its turn."""
+    timer = unit["timers"].pop(name, None)
+    if timer is not None and timer[2] is not None:
+        # the heap entry stays until it is due and is skipped then
+        _modify(unit, timer[2], -timer[3])
+
+
+def _modify(unit, stat, amount):
+    total = unit["modifiers"].get(stat, 0) + amount
+    if total:
+        unit["modifiers"][stat] = total
+    else:
+        unit["modifiers"].pop(stat, None)
@@ -0,0 +1,812 @@
+"""
+Headless battle engine for the RPG in Test.py.
+
+BattleEngine owns the player, enemy and game_state dicts and applies the game
+rules to them. It never touches Tk: every visible consequence of an action is
+emitted as an event, ``(kind, data)``, to the subscribed listeners, so a view
+can render it while simulations and tests run the same rules without a
+display.
+
+An action resolves in steps: the player's move, then follow-ups such as the
+enemy's reply, rewards, a level-up, loot and the next spawn, each queued
+with then(). By default they run at once, inside the action. After defer()
+they wait in ``engine.steps`` and run_step() runs one at a time, so a view
+can pace, animate or fast-forward a turn.
+
+An encounter can be a group (see rpg_horde.py). ``engine.enemy`` is always
+the target; area skills and the enemies' turn go over the whole group in
+one step each and report it with one event, whatever its size.
+
+    engine = BattleEngine(seed=1)
+    engine.choose_class("Mage")
+    engine.spawn_enemy()
+    engine.subscribe(lambda kind, data: print(kind, data))
+    engine.attack()
+"""
+
+import random
+from collections import deque
+from functools import partial
+
+import rpg_effects
+from rpg_content import load_content, sample_alias
+from rpg_horde import Horde, describe
+from rpg_log import BattleLog
+
+# --- Content (content/*.json, compiled by rpg_content) ---
+CONTENT = load_content()
+element_system = CONTENT.element_system
+classes = CONTENT.classes
+enemy_types = CONTENT.enemy_types
+shop_items = CONTENT.shop_items
+elemental_skills = CONTENT.elemental_skills
+area_skills = CONTENT.area_skills
+ELEMENT_INDEX = CONTENT.element_index
+ADVANTAGE = CONTENT.advantage
+
+# --- Engine events ---
+LOG = "log"                  # data: message text
+STATUS = "status"            # data: None, player/enemy/game_state changed
+ENEMY_SPAWNED = "enemy_spawned"  # data: enemy type
+GAME_OVER = "game_over"      # data: None
+REVIVED = "revived"          # data: None
+HIT = "hit"                  # data: {"by", "action", "damage", "critical", "multiplier"}; a batch
+                             # (area skill, group turn) has "hits" and "multipliers" instead of
+                             # "multiplier", and "critical" counts the crits
+LEVEL_UP = "level_up"        # data: the new level
+
+ACTIONS = ("attack", "special", "elemental", "heal", "item", "flee")
+
+# --- Timed effects (rpg_effects), in player turns ---
+ELIXIR = "Strength Elixir"
+ELIXIR_BONUS, ELIXIR_TURNS = 5, 3
+SPECIAL_COOLDOWN = "special_cooldown"
+SPECIAL_COOLDOWN_TURNS = 3
+ELEMENTAL_EVENT = "Elemental Event"
+EVENT_BONUS, EVENT_TURNS = 5, 10
+# player fields derived from effects: stat -> base field, counter -> effect name
+DERIVED_STATS = {"attack": "base_attack", "defense": "base_defense"}
+EFFECT_COUNTERS = {"buff_turns": ELIXIR, "special_cooldown": SPECIAL_COOLDOWN}
+
+
+def new_player():
+    player = {
+        "name": "Hero",
+        "class": None,
+        "elemen": None,
+        "hp": 0,
+        "max_hp": 0,
+        "attack": 0,
+        "base_attack": 0,
+        "defense": 0,
+        "base_defense": 0,
+        "speed": 0,
+        "level": 1,
+        "xp": 0,
+        "xp_to_next": 100,
+        "gold": 50,
+        "inventory": {
+            "Healing Potion": 3,
+            "Strength Elixir": 1,
+            "Bomb": 1
+        },
+        "equipment": {
+            "weapon": None,
+            "armor": None,
+            "accessory": None
+        },
+        "buff_turns": 0,        # derived from the effects, see derive_stats
+        "special_cooldown": 0,
+        "elemental_charge": 0,
+        "skills": [],
+        "quests": [],
+        "location": "Forest",
+        "element_mastery": {"Solar": 0, "Taufan": 0, "Gempa": 0, "Halilintar": 0}
+    }
+    player.update(rpg_effects.new_effects())
+    return player
+
+
+def new_enemy():
+    return {
+        "name": "Goblin",
+        "hp": 0,
+        "max_hp": 0,
+        "attack": 0,
+        "defense": 0,
+        "level": 1,
+        "type": "Goblin",
+        "elemen": None,
+        "speed": 0,  # turn order in a group, and crits on enemy turns
+        "gold": 0
+    }
+
+
+def new_game_state():
+    return {
+        "current_turn": "player",
+        "game_active": True,
+        "boss_defeated": False,
+        "day": 1,
+        "playtime": 0,  # seconds played, kept up to date by the view when saving
+        "elemental_events": []
+    }
+
+
+def upgrade_player(data):
+    """A saved player dict with the fields added since it was written.
+
+    Saves from before timed effects kept the elixir and the special
+    cooldown as bare counters; they become effects with the turns left.
+    """
+    player = new_player()
+    player.update(data)
+    if "effects" not in data:
+        player.update(rpg_effects.new_effects())
+        if data.get("buff_turns", 0) > 0:
+            rpg_effects.apply(player, ELIXIR, data["buff_turns"], "attack", ELIXIR_BONUS)
+        if data.get("special_cooldown", 0) > 0:
+            rpg_effects.apply(player, SPECIAL_COOLDOWN, data["special_cooldown"])
+        rpg_effects.tick(player)  # as if applied on the turn that was saved
+    derive_stats(player)
+    return player
+
+
+def derive_stats(player):
+    """Recompute the player fields that follow from base values and effects."""
+    for stat, base in DERIVED_STATS.items():
+        player[stat] = player[base] + rpg_effects.modifier(player, stat)
+    for counter, name in EFFECT_COUNTERS.items():
+        player[counter] = rpg_effects.remaining(player, name)
+
+
+def calculate_element_advantage(attacker_element, defender_element):
+    if not attacker_element or not defender_element:
+        return 1.0
+    # 1.5 when the attacker is strong against the defender, 0.5 when weak
+    return ADVANTAGE[ELEMENT_INDEX[attacker_element]][ELEMENT_INDEX[defender_element]]
+
+
+def calculate_damage(attacker, defender, is_special=False, is_elemental=False, rng=random):
+    base_damage = attacker["attack"]
+    if is_special:
+        base_damage = int(base_damage * 1.5)
+
+    # Element advantage calculation
+    element_multiplier = 1.0
+    if is_elemental and attacker.get("elemen") and defender.get("elemen"):
+        element_multiplier = calculate_element_advantage(attacker["elemen"], defender["elemen"])
+
+    damage = max(1, int((base_damage - defender["defense"] // 2) * element_multiplier))
+
+    # Critical hit chance based on speed
+    crit_chance = attacker["speed"] / 100
+    if rng.random() < crit_chance:
+        damage = int(damage * 1.5)
+        return damage, True, element_multiplier
+
+    return damage, False, element_multiplier
+
+
+def get_element_icon(element):
+    return element_system.get(element, {}).get("icon", "⚡")
+
+
+class BattleEngine:
+    def __init__(self, player=None, enemy=None, game_state=None, seed=None, rng=None, log=None):
+        self.player = player if player is not None else new_player()
+        self.enemy = enemy if enemy is not None else new_enemy()
+        self.game_state = game_state if game_state is not None else new_game_state()
+        self.rng = rng if rng is not None else random.Random(seed)
+        self.battle_log = log if log is not None else BattleLog()  # bounded, not part of saves
+        self.horde = Horde(self.enemy)  # everyone in the fight; self.enemy is the target
+        self.listeners = []
+        self.last_outcome = None  # "won" or "fled" once the current enemy is gone
+        self.outcome_hp = 0       # player HP at that moment, before rewards and level-ups
+        self.encounter_key = None  # (location, level) of the cached encounter table
+        self.encounter = None
+        self.steps = None          # deque of pending steps once defer() was called
+        self.batch = None          # steps queued by the step that is running
+
+    # --- Events ---
+    def subscribe(self, listener):
+        self.listeners.append(listener)
+
+    def unsubscribe(self, listener):
+        self.listeners.remove(listener)
+
+    def emit(self, kind, data=None):
+        for listener in self.listeners:
+            listener(kind, data)
+
+    def log(self, message):
+        self.battle_log.append(message)
+        self.emit(LOG, message)
+
+    def status(self):
+        self.emit(STATUS)
+
+    # --- Steps ---
+    def defer(self):
+        """Queue follow-up steps in self.steps instead of running them."""
+        self.steps = deque()
+
+    def then(self, *steps):
+        """Run ``steps`` once the current one is done, ahead of older steps."""
+        if self.steps is None:
+            for step in steps:
+                step()
+        elif self.batch is not None:
+            self.batch.extend(steps)
+        else:
+            self.steps.extend(steps)
+
+    def run_step(self):
+        """Run the next queued step; False when there was none."""
+        if not self.steps:
+            return False
+        step = self.steps.popleft()
+        self.batch = []
+        try:
+            step()
+        finally:
+            batch, self.batch = self.batch, None
+            # follow-ups of this step come before anything queued earlier
+            self.steps.extendleft(reversed(batch))
+        return True
+
+    def run_steps(self):
+        while self.steps and self.run_step():
+            pass
+
+    # --- Setup ---
+    def choose_class(self, chosen_class):
+        stats = classes[chosen_class]
+        self.player["class"] = chosen_class
+        self.player["elemen"] = stats["elemen"]
+        self.player["hp"] = stats["hp"]
+        self.player["max_hp"] = stats["hp"]
+        self.player["attack"] = stats["attack"]
+        self.player["base_attack"] = stats["attack"]
+        self.player["defense"] = stats["defense"]
+        self.player["base_defense"] = stats["defense"]
+        self.player["speed"] = stats["speed"]
+
+        # Initialize elemental skills
+        self.player["skills"] = [elemental_skills[stats["elemen"]][0]]  # Start with first skill
+
+    # --- Rules ---
+    def calculate_element_advantage(self, attacker_element, defender_element):
+        return calculate_element_advantage(attacker_element, defender_element)
+
+    def calculate_damage(self, attacker, defender, is_special=False, is_elemental=False):
+        return calculate_damage(attacker, defender, is_special, is_elemental, self.rng)
+
+    def tick_effects(self):
+        """End the player's turn: expire timed effects and run per-turn ones."""
+        for name, stat, amount, expired in rpg_effects.tick(self.player):
+            if stat == "hp":
+                self.log(f"{'💚' if amount > 0 else '☠️'} {name}: {amount:+} HP")
+            if not expired:
+                continue
+            if name == ELIXIR:
+                self.log("💨 Your Strength Elixir effect wore off!")
+            elif name == ELEMENTAL_EVENT:
+                self.log("🌠 The elemental event's power fades.")
+        derive_stats(self.player)
+        if self.player["hp"] <= 0 and self.game_state["game_active"]:
+            self.player_defeated()
+
+    def player_defeated(self):
+        self.log("💀 You were defeated... Game Over.")
+        self.game_state["game_active"] = False
+        self.emit(GAME_OVER)
+
+    def can_act(self):
+        return self.game_state["game_active"] and self.player["hp"] > 0 and self.enemy["hp"] > 0
+
+    def act(self, action, item=None):
+        """Dispatch one of ACTIONS; ``item`` names the inventory item for "item"."""
+        if action == "attack":
+            self.attack()
+        elif action == "special":
+            self.attack(is_special=True)
+        elif action == "elemental":
+            self.attack(is_elemental=True)
+        elif action == "heal":
+            self.heal()
+        elif action == "item":
+            self.use_item(item)
+        elif action == "flee":
+            self.flee()
+        else:
+            raise ValueError(f"Unknown action: {action}")
+
+    def attack(self, is_special=False, is_elemental=False):
+        if not self.can_act():
+            return
+
+        if is_special and self.player["special_cooldown"] > 0:
+            self.log(f"❌ {classes[self.player['class']]['special_ability']} is on cooldown for {self.player['special_cooldown']} more turns!")
+            return
+
+        if is_elemental and self.player["elemental_charge"] < 30:
+            self.log("❌ Not enough elemental charge! Need 30 charge.")
+            return
+
+        damage, is_critical, element_multiplier = self.calculate_damage(self.player, self.enemy, is_special, is_elemental)
+        self.enemy["hp"] = max(0, self.enemy["hp"] - damage)
+        self.emit(HIT, {"by": "player", "action": "special" if is_special else "elemental" if is_elemental else "attack",
+                        "damage": damage, "critical": is_critical, "multiplier": element_multiplier})
+
+        # Element charge generation
+        if not is_elemental:
+            self.player["elemental_charge"] = min(100, self.player["elemental_charge"] + 10)
+
+        if is_special:
+            ability_name = classes[self.player["class"]]["special_ability"]
+            self.log(f"✨ You use {ability_name} on the {self.enemy['name']} for {damage} damage!")
+            rpg_effects.apply(self.player, SPECIAL_COOLDOWN, SPECIAL_COOLDOWN_TURNS)
+        elif is_elemental:
+            self.player["elemental_charge"] -= 30
+            skill_name = self.rng.choice(elemental_skills[self.player["elemen"]])
+            element_effect = ""
+            if element_multiplier > 1:
+                element_effect = " 🎯 EFFECTIVE!"
+            elif element_multiplier < 1:
+                element_effect = " 💤 INEFFECTIVE!"
+            self.log(f"{get_element_icon(self.player['elemen'])} You use {skill_name} for {damage} damage!{element_effect}")
+            if skill_name in area_skills:
+                self.area_attack(skill_name, area_skills[skill_name])
+        else:
+            crit_text = " 💥 CRITICAL!" if is_critical else ""
+            self.log(f"⚔️ You strike the {self.enemy['name']} for {damage} damage!{crit_text}")
+
+        # Handle element mastery
+        if is_elemental:
+            self.player["element_mastery"][self.player["elemen"]] += 1
+
+        self.tick_effects()
+
+        # Check if enemies are defeated (enemy_turn does nothing once the game is over)
+        if self.horde.defeated() and self.game_state["game_active"]:
+            self.then(partial(self.defeat_enemy, is_elemental=is_elemental, drop_chance=0.3), self.status)
+        else:
+            self.then(self.enemy_turn, self.status)
+
+    def area_attack(self, skill_name, share):
+        """``skill_name`` also hits every other enemy standing, for ``share`` of its damage."""
+        others = self.horde.others()
+        if not others:
+            return
+        total = crits = 0
+        multipliers = []
+        for enemy in others:
+            damage, is_critical, element_multiplier = self.calculate_damage(self.player, enemy, is_elemental=True)
+            damage = max(1, int(damage * share))
+            enemy["hp"] = max(0, enemy["hp"] - damage)
+            total += damage
+            crits += is_critical
+            multipliers.append(element_multiplier)
+        self.emit(HIT, {"by": "player", "action": "area", "damage": total, "critical": crits,
+                        "hits": len(others), "multipliers": multipliers})
+        crit_text = f" 💥 {crits} CRITICAL!" if crits else ""
+        self.log(f"🌊 {skill_name} sweeps over {len(others)} more {'enemy' if len(others) == 1 else 'enemies'} "
+                 f"for {total} damage!{crit_text}")
+
+    def defeat_enemy(self, is_elemental=False, drop_chance=0.0):
+        fallen = self.horde.take_defeated()
+        if not fallen:
+            return
+        gold_earned = sum(enemy["gold"] for enemy in fallen)
+        xp_earned = sum(CONTENT.enemy_stats[enemy["type"]].xp * enemy["level"] for enemy in fallen)
+        self.player["gold"] += gold_earned
+
+        if len(fallen) == 1:
+            self.log(f"🎉 You defeated the {fallen[0]['name']}! 🎉")
+        else:
+            self.log(f"🎉 You defeated {len(fallen)} enemies: {describe(self.horde.groups(fallen))}! 🎉")
+        self.log(f"💰 You found {gold_earned} gold!")
+
+        rewards = [partial(self.gain_xp, xp_earned),
+                   *(partial(self.check_quest_progress, enemy["type"]) for enemy in fallen),
+                   partial(self.find_loot, is_elemental, drop_chance)]
+        if self.horde.retarget():
+            # the rest of the group fights on
+            self.log(f"🎯 {len(self.horde)} left: {describe(self.horde.groups())}")
+            self.then(*rewards, self.enemy_turn)
+            return
+        self.last_outcome = "won"
+        self.outcome_hp = self.player["hp"]
+        self.then(*rewards, self.spawn_enemy)
+
+    def find_loot(self, is_elemental=False, drop_chance=0.0):
+        # Chance to find item
+        if drop_chance and self.rng.random() < drop_chance:
+            found_item = self.rng.choice(CONTENT.drop_items)
+            self.player["inventory"][found_item] = self.player["inventory"].get(found_item, 0) + 1
+            self.log(f"🎁 You found a {found_item}!")
+
+        # Elemental mastery reward
+        if is_elemental:
+            self.player["element_mastery"][self.player["elemen"]] += 5
+            self.log(f"🌟 +5 {self.player['elemen']} Mastery!")
+
+    def heal(self):
+        if not self.can_act():
+            return
+
+        if self.player["inventory"].get("Healing Potion", 0) > 0:
+            heal_amount = self.rng.randint(15, 25)
+            self.player["hp"] = min(self.player["max_hp"], self.player["hp"] + heal_amount)
+            self.player["inventory"]["Healing Potion"] -= 1
+            self.log(f"🧪 You used a Healing Potion and recovered {heal_amount} HP!")
+
+            if self.player["inventory"]["Healing Potion"] == 0:
+                del self.player["inventory"]["Healing Potion"]
+        else:
+            self.log("No Healing Potions left!")
+            return
+
+        self.tick_effects()
+        self.then(self.enemy_turn, self.status)
+
+    def use_item(self, item):
+        if self.player["inventory"].get(item, 0) <= 0:
+            self.log(f"❌ You have no {item} left!")
+            return
+
+        if item == "Healing Potion":
+            self.heal()
+        elif item == "Strength Elixir":
+            # a second elixir refreshes the boost rather than stacking it
+            rpg_effects.apply(self.player, ELIXIR, ELIXIR_TURNS, "attack", ELIXIR_BONUS)
+            self.player["inventory"][item] -= 1
+            self.log(f"💪 You used a Strength Elixir! Attack boosted for {ELIXIR_TURNS} turns.")
+            self.tick_effects()
+            self.then(self.enemy_turn)
+        elif item == "Bomb":
+            damage = self.rng.randint(15, 25)
+            self.enemy["hp"] = max(0, self.enemy["hp"] - damage)
+            self.player["inventory"][item] -= 1
+            self.log(f"💣 You threw a Bomb! {self.enemy['name']} took {damage} damage!")
+            self.emit(HIT, {"by": "player", "action": "bomb", "damage": damage, "critical": False, "multiplier": 1.0})
+            self.tick_effects()
+            if not self.horde.defeated():
+                self.then(self.enemy_turn)
+            elif self.game_state["game_active"]:
+                self.then(self.defeat_enemy)
+        elif item == "Elemental Crystal":
+            self.player["elemental_charge"] = 100
+            self.player["inventory"][item] -= 1
+            self.log(f"💎 Elemental Crystal used! Charge set to 100!")
+            self.tick_effects()
+        elif item == "Phoenix Down":
+            if self.player["hp"] <= 0:
+                self.player["hp"] = self.player["max_hp"] // 2
+                self.player["inventory"][item] -= 1
+                self.log("🕊️ Phoenix Down used! You've been revived!")
+                self.game_state["game_active"] = True
+                self.emit(REVIVED)
+            else:
+                self.log("❌ You can only use Phoenix Down when defeated!")
+
+        # Clean up inventory if item count reaches zero (heal() may already have)
+        if self.player["inventory"].get(item) == 0:
+            del self.player["inventory"][item]
+
+        self.then(self.status)
+
+    def enemy_turn(self):
+        if len(self.horde) > 1:
+            self.horde_turn()
+            return
+        if self.enemy["hp"] > 0 and self.game_state["game_active"]:
+            # Enemy has chance to use elemental attack
+            use_elemental = self.rng.random() < 0.3 and self.enemy["elemen"]
+
+            damage, is_critical, element_multiplier = self.calculate_damage(self.enemy, self.player, is_elemental=use_elemental)
+            self.player["hp"] = max(0, self.player["hp"] - damage)
+            self.emit(HIT, {"by": "enemy", "action": "elemental" if use_elemental else "attack",
+                            "damage": damage, "critical": is_critical, "multiplier": element_multiplier})
+
+            crit_text = " 💥 CRITICAL!" if is_critical else ""
+            if use_elemental:
+                element_effect = ""
+                if element_multiplier > 1:
+                    element_effect = " 🎯 EFFECTIVE!"
+                elif element_multiplier < 1:
+                    element_effect = " 💤 INEFFECTIVE!"
+                self.log(f"{get_element_icon(self.enemy['elemen'])} {self.enemy['name']} uses elemental attack for {damage} damage!{element_effect}{crit_text}")
+            else:
+                self.log(f"The {self.enemy['name']} hits you for {damage} damage!{crit_text}")
+
+            if self.player["hp"] <= 0:
+                self.player_defeated()
+
+    def horde_turn(self):
+        """Every enemy standing attacks, fastest first, resolved in one pass."""
+        if not self.game_state["game_active"]:
+            return
+        hp = self.player["hp"]
+        total = crits = hits = 0
+        multipliers = []
+        groups = {}  # name -> [hits, damage]
+        for enemy in self.horde.alive():
+            use_elemental = self.rng.random() < 0.3 and enemy["elemen"]
+            damage, is_critical, element_multiplier = self.calculate_damage(enemy, self.player, is_elemental=use_elemental)
+            total += damage
+            crits += is_critical
+            hits += 1
+            multipliers.append(element_multiplier)
+            group = groups.setdefault(enemy["name"], [0, 0])
+            group[0] += 1
+            group[1] += damage
+            if total >= hp:
+                break  # the rest never get their turn
+        if not hits:
+            return
+        self.player["hp"] = max(0, hp - total)
+        self.emit(HIT, {"by": "enemy", "action": "group", "damage": total, "critical": crits,
+                        "hits": hits, "multipliers": multipliers})
+
+        for name, (count, damage) in groups.items():
+            if count == 1:
+                self.log(f"The {name} hits you for {damage} damage!")
+            else:
+                self.log(f"{count} {name}s hit you for {damage} damage!")
+        if crits:
+            self.log(f"💥 {crits} CRITICAL {'hit' if crits == 1 else 'hits'}!")
+
+        if self.player["hp"] <= 0:
+            self.player_defeated()
+
+    def gain_xp(self, amount):
+        self.player["xp"] += amount
+        self.log(f"⭐ You gained {amount} XP!")
+
+        if self.player["xp"] >= self.player["xp_to_next"]:
+            self.then(self.level_up)
+
+    def level_up(self):
+        self.player["level"] += 1
+        self.player["xp"] = 0
+        self.player["xp_to_next"] = int(self.player["xp_to_next"] * 1.5)
+
+        # Stat increases
+        hp_increase = self.rng.randint(10, 20)
+        self.player["max_hp"] += hp_increase
+        self.player["hp"] = self.player["max_hp"]
+
+        self.player["base_attack"] += 2
+        self.player["base_defense"] += 1
+        derive_stats(self.player)  # active buffs carry over
+
+        # Add potion on level up
+        self.player["inventory"]["Healing Potion"] = self.player["inventory"].get("Healing Potion", 0) + 1
+
+        # Chance to learn new elemental skill
+        if self.player["level"] % 3 == 0 and len(self.player["skills"]) < len(elemental_skills[self.player["elemen"]]):
+            available_skills = [s for s in elemental_skills[self.player["elemen"]] if s not in self.player["skills"]]
+            if available_skills:
+                new_skill = self.rng.choice(available_skills)
+                self.player["skills"].append(new_skill)
+                self.log(f"🎓 You learned a new skill: {new_skill}!")
+
+        self.log(f"⬆️ Level Up! You are now Level {self.player['level']}!")
+        self.log(f"❤️ Max HP increased by {hp_increase}!")
+        self.log(f"⚔️ Attack increased to {self.player['attack']}!")
+        self.log(f"🛡️ Defense increased to {self.player['defense']}!")
+        self.log(f"🧪 You received a Healing Potion!")
+        self.emit(LEVEL_UP, self.player["level"])
+
+    def spawn_enemy(self):
+        self.game_state["day"] += 1
+
+        # Elemental events based on day
+        if self.game_state["day"] % 7 == 0:
+            self.trigger_elemental_event()
+
+        # Chance to spawn boss every 5 days
+        if self.game_state["day"] % 5 == 0 and not self.game_state["boss_defeated"]:
+            enemy_type = "Dragon"
+            self.game_state["boss_defeated"] = True
+            self.roll_enemy(enemy_type)
+        else:
+            enemy_type = self.roll_encounter()
+            self.start_encounter([enemy_type, *self.roll_group()])
+
+        if len(self.horde) == 1:
+            self.log(f"\n⚔️ Day {self.game_state['day']}: A {self.enemy['name']} (Lvl {self.enemy['level']}) approaches!\n")
+        else:
+            self.log(f"\n⚔️ Day {self.game_state['day']}: A group of {len(self.horde)} approaches: "
+                     f"{describe(self.horde.groups())}!\n")
+            self.log(f"🎯 Target: {self.enemy['name']} (Lvl {self.enemy['level']})")
+        self.log(f"Element: {get_element_icon(self.enemy['elemen'])} {self.enemy['elemen']}")
+
+        # Show element advantage info
+        advantage = calculate_element_advantage(self.player["elemen"], self.enemy["elemen"])
+        if advantage > 1:
+            self.log(f"🎯 Your element is effective against {self.enemy['elemen']}!")
+        elif advantage < 1:
+            self.log(f"💤 Your element is weak against {self.enemy['elemen']}!")
+
+        self.emit(ENEMY_SPAWNED, enemy_type)
+        self.emit(STATUS)
+
+    def roll_encounter(self):
+        """Weighted pick from the encounter table for the player's location and level."""
+        key = (self.player["location"], self.player["level"])
+        if key != self.encounter_key:
+            # tables are compiled with the content; only the lookup follows the player
+            self.encounter_key = key
+            self.encounter = CONTENT.encounter_table(*key)
+        if self.encounter is None:
+            return self.rng.choice(CONTENT.spawn_pool)  # location without a table
+        return sample_alias(self.encounter, self.rng)
+
+    def roll_group(self):
+        """Enemy types joining the one just rolled, when its table spawns groups."""
+        table = self.encounter
+        if table is None or table.group_hi <= 1:
+            return []
+        size = self.rng.randint(table.group_lo, table.group_hi)
+        return [sample_alias(table, self.rng) for _ in range(size - 1)]
+
+    def start_encounter(self, enemy_types, level=None):
+        """Fight one freshly rolled enemy per name in ``enemy_types``; the first is the target."""
+        self.roll_enemy(enemy_types[0], level)
+        others = []
+        for enemy_type in enemy_types[1:]:
+            enemy = new_enemy()
+            self.roll_enemy(enemy_type, level, enemy)
+            others.append(enemy)
+        self.horde.reset(self.enemy, others)
+
+    def next_target(self):
+        """Aim at the next enemy standing, in turn order."""
+        if not self.can_act() or not self.horde.next_target():
+            return False
+        self.log(f"🎯 Target: {self.enemy['name']} (HP {self.enemy['hp']}/{self.enemy['max_hp']})")
+        self.emit(STATUS)
+        return True
+
+    def roll_enemy(self, enemy_type, level=None, enemy=None):
+        """Fill ``enemy`` with freshly rolled stats for ``enemy_type``.
+
+        By default that is self.enemy, alone in a new fight.
+        """
+        stats = CONTENT.enemy_stats[enemy_type]
+        rng = self.rng
+        if enemy is None:
+            enemy = self.enemy
+            self.horde.reset(enemy)
+
+        enemy["name"] = enemy_type
+        enemy["type"] = enemy_type
+
+        # Set enemy element ("Random" elements have no fixed id)
+        if stats.element_id < 0:
+            enemy["elemen"] = rng.choice(CONTENT.element_names)
+        else:
+            enemy["elemen"] = stats.element
+
+        if level is None:
+            level = max(1, self.player["level"] - 1 + rng.randint(0, 2))
+        enemy["level"] = level
+        enemy["max_hp"] = rng.randint(stats.hp_lo, stats.hp_hi) + (level * 5)
+        enemy["hp"] = enemy["max_hp"]
+        enemy["attack"] = rng.randint(stats.attack_lo, stats.attack_hi) + (level * 2)
+        enemy["defense"] = rng.randint(stats.defense_lo, stats.defense_hi) + (level * 1)
+        enemy["speed"] = stats.speed
+        enemy["gold"] = stats.gold + (level * 2)
+
+    def trigger_elemental_event(self):
+        event_element = self.rng.choice(CONTENT.element_names)
+        events = {
+            "Solar": "A solar eclipse empowers Solar element!",
+            "Taufan": "A great storm enhances Taufan element!",
+            "Gempa": "Earth tremors boost Gempa element!",
+            "Halilintar": "Lightning storm strengthens Halilintar element!"
+        }
+
+        event_msg = events[event_element]
+        self.log(f"\n🌠 ELEMENTAL EVENT: {event_msg}")
+
+        # Bonus for players using matching element
+        if self.player["elemen"] == event_element:
+            self.player["elemental_charge"] = 100
+            rpg_effects.apply(self.player, ELEMENTAL_EVENT, EVENT_TURNS, "attack", EVENT_BONUS)
+            derive_stats(self.player)
+            self.log(f"🌟 Your {event_element} powers are enhanced! +{EVENT_BONUS} Attack for {EVENT_TURNS} turns, Full Charge!")
+            self.game_state["elemental_events"].append(f"Day {self.game_state['day']}: {event_element} Event")
+
+    def buy_item(self, item):
+        """Buy one ``item`` from the shop; returns False when gold is short."""
+        details = shop_items[item]
+        if self.player["gold"] < details["price"]:
+            return False
+        self.player["gold"] -= details["price"]
+
+        if details["type"] == "consumable" or details["type"] == "special":
+            self.player["inventory"][item] = self.player["inventory"].get(item, 0) + 1
+            self.log(f"🛒 You bought a {item}!")
+        else:
+            self.player["equipment"][CONTENT.item_slot[item]] = item
+
+            if "attack_bonus" in details:
+                self.player["base_attack"] += details["attack_bonus"]
+            if "defense_bonus" in details:
+                self.player["base_defense"] += details["defense_bonus"]
+            if "hp_bonus" in details:
+                self.player["max_hp"] += details["hp_bonus"]
+
+            derive_stats(self.player)  # keeps an active elixir or event bonus
+            self.log(f"🛒 You bought and equipped {item}!")
+
+        self.emit(STATUS)
+        return True
+
+    def flee(self):
+        self.tick_effects()
+        if not self.game_state["game_active"]:
+            return  # finished off by a damage-over-time effect
+        if self.rng.random() < 0.7:
+            self.last_outcome = "fled"
+            self.outcome_hp = self.player["hp"]
+            self.log("🏃‍♂️ You successfully fled from battle!")
+            self.then(self.spawn_enemy, self.status)
+        else:
+            self.log("❌ You failed to flee!")
+            self.then(self.enemy_turn, self.status)
+
+    def check_quest_progress(self, enemy_type):
+        if enemy_type == "Dragon":
+            self.log("🏆 QUEST COMPLETE: Dragon Slayer! You've defeated the mighty dragon!")
+            self.player["gold"] += 100
+            self.log("💰 You received 100 gold as reward!")
+
+    # --- Headless play ---
+    def fight(self, policy, max_turns=200):
+        """Play the current enemy to the end with ``policy(engine) -> (action, item)``.
+
+        The battle ends when the enemy is killed or fled from, or the player
+        falls. Returns the outcome ("won", "fled", "lost" or "timeout") and
+        turn and HP counts.
+        """
+        day = self.game_state["day"]
+        start_hp = self.player["hp"]
+        self.last_outcome = None
+        turns = 0
+        while turns < max_turns and self.game_state["game_active"] and self.game_state["day"] == day:
+            action, item = policy(self)
+            self.act(action, item)
+            self.run_steps()  # only needed when the engine was deferred
+            turns += 1
+        hp_left = self.player["hp"]
+        if not self.game_state["game_active"]:
+            outcome = "lost"
+        elif self.game_state["day"] != day:
+            outcome = self.last_outcome
+            hp_left = self.outcome_hp
+        else:
+            outcome = "timeout"
+        return {
+            "outcome": outcome,
+            "turns": turns,
+            "hp_lost": start_hp - hp_left,
+            "hp_left": hp_left,
+        }
+
+
+def scripted_policy(engine):
+    """Simple fixed priority policy used by simulations and auto-play."""
+    player = engine.player
+    if player["hp"] < player["max_hp"] * 0.3 and player["inventory"].get("Healing Potion", 0) > 0:
+        return "heal", None
+    if player["elemental_charge"] >= 30 and \
+            calculate_element_advantage(player["elemen"], engine.enemy["elemen"]) >= 1.0:
+        return "elemental", None
+    if player["special_cooldown"] == 0:
+        return "special", None
+    return "attack", None
@@ -0,0 +1,133 @@
+"""
+Turn history for the RPG: rewind the last turns exactly, dice included.
+
+History keeps a bounded ring of snapshots of a BattleEngine, one captured
+before each action: the player, the enemies of the encounter, game_state,
+the outcome of the last fight and the state of the engine's rng, so the
+turns played again after a rewind roll the same numbers as the first time.
+
+Snapshots are persistent: a snapshot never changes once taken, so the next
+one shares everything that did not change with it. A section (or enemy) is
+a table of field -> value; capture() compares the live fields with the
+previous table, copies only the ones that differ into a new table and keeps
+referring to the previous values for the rest. A section with no change
+reuses the previous table whole. A turn that changes the HP, the XP and
+one inventory count copies those three fields; the inventory of the other
+snapshots, the skills, the effects heap and the unchanged enemies of a
+group stay shared. (The battle log is not game state: it lives in BattleLog
+and a rewind only adds a line to it.)
+
+rewind(n) puts the engine back to the state before the n-th last action in
+one step: fields that differ from the snapshot get a fresh copy of its
+value (observable Models mark just those dirty), then the rng is reset.
+
+Practice mode in Test.py turns it on; Ctrl+Z rewinds a turn:
+
+    RPG_REWIND=200 python Test.py     # keep the last 200 turns
+
+    history = History(engine, size=100)
+    history.capture()                 # before each action
+    engine.act("attack")
+    history.rewind(1)                 # back to before the attack
+"""
+
+import os
+from collections import deque
+
+HISTORY_TURNS = 100  # snapshots kept by default
+
+_MISSING = object()
+
+
+def _copy(value):
+    """Deep copy of the lists and dicts the engine keeps in its state."""
+    if type(value) is list:
+        return [_copy(item) for item in value]
+    if type(value) is dict:
+        return {key: _copy(item) for key, item in value.items()}
+    return value
+
+
+def share(table, data):
+    """A snapshot table of ``data`` that shares its unchanged values (or,
+    with no change at all, the whole table) with ``table``."""
+    if table is None or table.keys() != data.keys():
+        return {key: _copy(value) for key, value in data.items()}
+    changed = [key for key, value in data.items() if table[key] != value]
+    if not changed:
+        return table
+    table = dict(table)  # new table of the same values; only the changed ones are copied
+    for key in changed:
+        table[key] = _copy(data[key])
+    return table
+
+
+def restore(data, table):
+    """Put the fields of ``table`` back into the live dict ``data``."""
+    for key in [key for key in data if key not in table]:
+        del data[key]
+    for key, value in table.items():
+        if data.get(key, _MISSING) != value:
+            data[key] = _copy(value)  # the snapshot keeps its own copy
+
+
+class History:
+    def __init__(self, engine, size=HISTORY_TURNS):
+        self.engine = engine
+        self.snapshots = deque(maxlen=size)
+        self.last = None  # the newest snapshot taken, still shared after a rewind drops it
+
+    @classmethod
+    def from_env(cls, engine):
+        size = int(os.environ.get("RPG_REWIND", "0"))
+        return cls(engine, size) if size > 0 else None
+
+    def __len__(self):
+        return len(self.snapshots)
+
+    def capture(self):
+        """Snapshot the engine; call it between turns (no steps pending)."""
+        engine = self.engine
+        last = self.last
+        enemy = share(last and last["enemy"], engine.enemy)
+        old = last["members"] if last else ()
+        members = tuple(
+            None if member is engine.enemy
+            else share(old[i] if i < len(old) and old[i] is not None else None, member)
+            for i, member in enumerate(engine.horde.members))
+        snapshot = {
+            "player": share(last and last["player"], engine.player),
+            "game_state": share(last and last["game_state"], engine.game_state),
+            "enemy": enemy,
+            "members": members,  # turn order; None marks the target, engine.enemy
+            "outcome": (engine.last_outcome, engine.outcome_hp),
+            "rng": engine.rng.getstate(),
+        }
+        self.snapshots.append(snapshot)
+        self.last = snapshot
+        return snapshot
+
+    def rewind(self, turns=1):
+        """Undo the last ``turns`` actions (as many as are kept); returns how many were undone."""
+        turns = min(turns, len(self.snapshots))
+        if turns <= 0:
+            return 0
+        for _ in range(turns - 1):
+            self.snapshots.pop()
+        snapshot = self.snapshots.pop()  # captured again by the next action
+        engine = self.engine
+        restore(engine.player, snapshot["player"])
+        restore(engine.game_state, snapshot["game_state"])
+        restore(engine.enemy, snapshot["enemy"])
+        engine.horde.target = engine.enemy
+        engine.horde.members = [engine.enemy if table is None else _copy(table)
+                                for table in snapshot["members"]]
+        engine.last_outcome, engine.outcome_hp = snapshot["outcome"]
+        engine.rng.setstate(snapshot["rng"])
+        self.last = snapshot
+        engine.status()
+        return turns
+
+    def clear(self):
+        self.snapshots.clear()
+        self.last = None
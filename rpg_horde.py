@@ -0,0 +1,106 @@
+"""
+Enemy groups for the RPG: one fight against any number of enemies.
+
+Horde holds the members of the current encounter, fastest first (equal
+speeds keep spawn order), which is the order they act in. One member is
+the target. It is the engine's enemy dict itself, so the rules, the odds,
+the advisor and the view's bindings keep reading and writing engine.enemy
+as in a one-on-one fight; the other members are plain dicts of the same
+shape, and retarget() swaps one of them into the target dict.
+
+The engine resolves an area skill and the enemies' turn in one pass over
+the members and applies the result once: one HIT event, one log line per
+enemy type and one status update, so a turn against thirty enemies costs
+the view no more redraws than a turn against one.
+
+    horde = Horde(engine.enemy)
+    horde.reset(engine.enemy, [orc, slime])
+    horde.alive()          # members standing, in turn order
+    horde.take_defeated()  # members at 0 HP, removed from the fight
+"""
+
+
+class Horde:
+    def __init__(self, target):
+        self.target = target      # the engine's enemy dict
+        self.members = [target]   # turn order
+
+    def __len__(self):
+        return len(self.members)
+
+    def reset(self, target, others=()):
+        """Start a fight against ``target`` and ``others``."""
+        self.target = target
+        # sorted() is stable, so equal speeds act in spawn order
+        self.members = sorted([target, *others], key=lambda enemy: -enemy["speed"])
+
+    def alive(self):
+        return [enemy for enemy in self.members if enemy["hp"] > 0]
+
+    def others(self):
+        """Members standing besides the target."""
+        target = self.target
+        return [enemy for enemy in self.members if enemy is not target and enemy["hp"] > 0]
+
+    def defeated(self):
+        """Whether any member is down and waiting to be taken out of the fight."""
+        return any(enemy["hp"] <= 0 for enemy in self.members)
+
+    def take_defeated(self):
+        """Remove the members at 0 HP; returns copies of them, target first."""
+        fallen = []
+        for enemy in self.members:
+            if enemy["hp"] <= 0:
+                if enemy is self.target:
+                    fallen.insert(0, dict(enemy))
+                else:
+                    fallen.append(dict(enemy))
+        if fallen:
+            self.members = [enemy for enemy in self.members if enemy["hp"] > 0]
+        return fallen
+
+    def retarget(self, member=None):
+        """Make ``member`` the target, by default the first one standing
+        unless the target still is. False when nobody is left."""
+        target = self.target
+        if member is None:
+            if target["hp"] > 0 and any(enemy is target for enemy in self.members):
+                return True
+            alive = self.alive()
+            if not alive:
+                return False
+            member = alive[0]
+        if member is target:
+            return True
+        # the target dict takes over the member's stats and its place in the order
+        members = self.members
+        old = next((i for i, enemy in enumerate(members) if enemy is target), None)
+        new = next(i for i, enemy in enumerate(members) if enemy is member)
+        if old is not None:
+            members[old] = dict(target)
+        target.update(member)
+        members[new] = target
+        return True
+
+    def next_target(self):
+        """Aim at the member standing after the target, in turn order."""
+        alive = self.alive()
+        if len(alive) < 2:
+            return False
+        at = next((i for i, enemy in enumerate(alive) if enemy is self.target), -1)
+        return self.retarget(alive[(at + 1) % len(alive)])
+
+    def groups(self, enemies=None):
+        """[(name, count, hp)] of ``enemies`` (the members standing by default),
+        in order of first appearance."""
+        groups = {}
+        for enemy in self.alive() if enemies is None else enemies:
+            group = groups.setdefault(enemy["name"], [0, 0])
+            group[0] += 1
+            group[1] += enemy["hp"]
+        return [(name, count, hp) for name, (count, hp) in groups.items()]
+
+
+def describe(groups):
+    """'Goblin x3, Orc' for the (name, count, hp) rows of Horde.groups()."""
+    return ", ".join(name if count == 1 else f"{name} x{count}" for name, count, _ in groups)
@@ -0,0 +1,249 @@
+"""
+Load generator for rpg_server: many sessions played at once, with the
+throughput and latency the clients see.
+
+Each client opens one connection and plays its share of the sessions in
+turn, one request in flight: a game picks its action like scripted_policy
+from the state in the last reply, now and then buys a potion, and starts
+over in a new session when it is lost. Latency is measured from writing a
+request to reading its reply, so it includes the wait behind the other
+connections' requests: about connections / throughput, on top of the
+handling time the server reports in the last line. A share of the sessions
+can be left alone (--cold) for longer than the server's idle time, so they
+are resumed from disk when they come back.
+
+    python rpg_server.py &
+    python rpg_loadgen.py --sessions 5000 --clients 100 --seconds 20
+
+    # start a private server on a free port, evict after 5 s idle
+    python rpg_loadgen.py --spawn --idle 5 --cold 0.2 --max-p99 50
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+
+from rpg_engine import classes
+from rpg_server import HOST, PORT
+from rpg_telemetry import percentile
+
+SESSIONS = 2000
+CLIENTS = 50
+SECONDS = 10.0
+BUY_EVERY = 25  # requests between potion purchases
+
+
+def choose(state):
+    """(action, item) for the state of a reply, in the spirit of scripted_policy."""
+    player = state["player"]
+    if player["hp"] < player["max_hp"] * 0.3 and state["inventory"].get("Healing Potion", 0) > 0:
+        return "heal", None
+    if player["elemental_charge"] >= 30:
+        return "elemental", None
+    if player["special_cooldown"] == 0:
+        return "special", None
+    return "attack", None
+
+
+class Client:
+    def __init__(self, host, port, games, rng):
+        self.host = host
+        self.port = port
+        self.games = games   # [session id, state], one per game this client plays
+        self.rng = rng
+        self.latency = []
+        self.errors = 0
+        self.lost = 0
+        self.reader = None
+        self.writer = None
+
+    async def request(self, message):
+        started = time.perf_counter()
+        self.writer.write((json.dumps(message) + "\n").encode("utf-8"))
+        line = await self.reader.readline()
+        self.latency.append(time.perf_counter() - started)
+        if not line:
+            raise ConnectionError("server closed the connection")
+        reply = json.loads(line)
+        if not reply["ok"]:
+            self.errors += 1
+        return reply
+
+    async def connect(self):
+        self.reader, self.writer = await asyncio.open_connection(self.host, self.port)
+
+    async def new_game(self, game):
+        reply = await self.request({"op": "new", "class": self.rng.choice(list(classes))})
+        game[0], game[1] = reply["session"], reply["state"]
+
+    async def play(self, game, turn):
+        session, state = game
+        if not state["active"]:
+            self.lost += 1
+            await self.request({"op": "close", "session": session})
+            await self.new_game(game)
+            return
+        if turn % BUY_EVERY == 0 and state["player"]["gold"] >= 20:
+            message = {"op": "buy", "session": session, "item": "Healing Potion"}
+        else:
+            action, item = choose(state)
+            message = {"op": "act", "session": session, "action": action, "item": item}
+        reply = await self.request(message)
+        if reply["ok"]:
+            game[1] = reply["state"]
+
+    async def run(self, until, cold_until=None, cold=()):
+        turn = 0
+        while time.perf_counter() < until:
+            for game in self.games:
+                if time.perf_counter() >= until:
+                    break
+                if cold_until is not None and id(game) in cold and time.perf_counter() < cold_until:
+                    continue
+                await self.play(game, turn)
+            turn += 1
+
+    def close(self):
+        if self.writer is not None:
+            self.writer.close()
+
+
+async def stats(host, port):
+    reader, writer = await asyncio.open_connection(host, port)
+    writer.write(b'{"op": "stats"}\n')
+    reply = json.loads(await reader.readline())
+    writer.close()
+    return reply["stats"]
+
+
+async def run(host, port, sessions, clients, seconds, cold, idle, seed=None):
+    rng = random.Random(seed)
+    pool = [Client(host, port, [], random.Random(rng.random())) for _ in range(clients)]
+    for i in range(sessions):
+        pool[i % clients].games.append([None, None])
+    for client in pool:
+        await client.connect()
+
+    started = time.perf_counter()
+    await asyncio.gather(*(_create(client) for client in pool))
+    setup = time.perf_counter() - started
+
+    # the cold share sits out long enough for the server to evict it, then plays on
+    cold_games = {id(game) for client in pool for game in client.games if rng.random() < cold}
+    cold_until = time.perf_counter() + idle + 2 if cold_games else None
+    for client in pool:
+        client.latency = []
+    started = time.perf_counter()
+    await asyncio.gather(*(client.run(started + seconds, cold_until, cold_games) for client in pool))
+    elapsed = time.perf_counter() - started
+    server = await stats(host, port)
+    for client in pool:
+        client.close()
+
+    latency = [value for client in pool for value in client.latency]
+    return {
+        "sessions": sessions,
+        "clients": clients,
+        "setup_s": setup,
+        "seconds": elapsed,
+        "requests": len(latency),
+        "throughput": len(latency) / elapsed,
+        "p50_ms": percentile(latency, 50) * 1000,
+        "p95_ms": percentile(latency, 95) * 1000,
+        "p99_ms": percentile(latency, 99) * 1000,
+        "max_ms": max(latency) * 1000,
+        "errors": sum(client.errors for client in pool),
+        "games_lost": sum(client.lost for client in pool),
+        "server": server,
+    }
+
+
+async def _create(client):
+    for game in client.games:
+        await client.new_game(game)
+
+
+def print_report(report):
+    server = report["server"]
+    print(f"{report['sessions']:,} sessions over {report['clients']} connections "
+          f"(created in {report['setup_s']:.1f} s), played for {report['seconds']:.1f} s")
+    print(f"requests   {report['requests']:,}   {report['throughput']:,.0f}/s")
+    print(f"latency    p50 {report['p50_ms']:.2f} ms   p95 {report['p95_ms']:.2f} ms   "
+          f"p99 {report['p99_ms']:.2f} ms   max {report['max_ms']:.2f} ms")
+    print(f"errors     {report['errors']}   games lost {report['games_lost']}")
+    print(f"server     {server.get('live', 0):,} live, {server.get('evicted', 0):,} evicted, "
+          f"{server.get('resumed', 0):,} resumed, p99 {server.get('p99_ms')} ms handling")
+
+
+def spawn_server(directory, idle, max_live):
+    """Start rpg_server on a free port; returns (process, port) once it accepts connections."""
+    with socket.socket() as probe:
+        probe.bind((HOST, 0))
+        port = probe.getsockname()[1]
+    command = [sys.executable, os.path.join(os.path.dirname(os.path.abspath(__file__)), "rpg_server.py"),
+               "--port", str(port), "--dir", directory, "--idle", str(idle), "--max-live", str(max_live)]
+    process = subprocess.Popen(command, stdout=subprocess.DEVNULL)
+    deadline = time.monotonic() + 10
+    while time.monotonic() < deadline:
+        try:
+            socket.create_connection((HOST, port), timeout=0.2).close()
+            return process, port
+        except OSError:
+            if process.poll() is not None:
+                break
+            time.sleep(0.05)
+    process.kill()
+    raise SystemExit("rpg_server did not start")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Play many RPG sessions against rpg_server and report latency")
+    parser.add_argument("--host", default=HOST)
+    parser.add_argument("--port", type=int, default=PORT)
+    parser.add_argument("--sessions", type=int, default=SESSIONS)
+    parser.add_argument("--clients", type=int, default=CLIENTS, help="connections, one request in flight each")
+    parser.add_argument("--seconds", type=float, default=SECONDS)
+    parser.add_argument("--cold", type=float, default=0.0,
+                        help="share of sessions left idle past --idle, so they are resumed from disk")
+    parser.add_argument("--spawn", action="store_true", help="start a server of our own on a free port")
+    parser.add_argument("--idle", type=float, default=5.0, help="idle seconds before eviction (--spawn)")
+    parser.add_argument("--max-live", type=int, default=100000, help="sessions kept in memory (--spawn)")
+    parser.add_argument("--seed", type=int)
+    parser.add_argument("--json", action="store_true", help="print the report as JSON")
+    parser.add_argument("--max-p99", type=float, help="exit with 1 when p99 latency exceeds this, in ms")
+    args = parser.parse_args(argv)
+
+    process = None
+    directory = None
+    host, port = args.host, args.port
+    if args.spawn:
+        directory = tempfile.TemporaryDirectory(prefix="rpg_sessions_")
+        process, port = spawn_server(directory.name, args.idle, args.max_live)
+        host = HOST
+    try:
+        report = asyncio.run(run(host, port, args.sessions, args.clients, args.seconds,
+                                 args.cold, args.idle, args.seed))
+    finally:
+        if process is not None:
+            process.terminate()
+            process.wait()
+            directory.cleanup()
+
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        print_report(report)
+    if args.max_p99 is not None and report["p99_ms"] > args.max_p99:
+        print(f"p99 latency {report['p99_ms']:.2f} ms is over {args.max_p99} ms")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
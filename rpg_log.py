@@ -0,0 +1,109 @@
+"""
+Bounded battle log for the RPG.
+
+BattleLog keeps the most recent messages in a ring buffer, so memory stays
+flat however long a session runs. With an archive path every message is also
+spilled to disk (one JSON string per line, written in batches), and a sparse
+index of page offsets lets a viewer read any page of the full history
+without loading the file:
+
+    log = BattleLog(capacity=500, archive_path="battle_log.jsonl")
+    log.append("The Goblin hits you for 4 damage!")
+    log.read(0, 100)        # first 100 messages, from disk if needed
+    log.read(len(log) - 20) # the last 20, straight from memory
+"""
+
+import json
+from array import array
+from collections import deque
+
+LOG_CAPACITY = 500     # messages kept in memory
+PAGE_LINES = 200       # messages per archive page (one index entry each)
+FLUSH_EVERY = 256      # pending messages that force a write to the archive
+
+
+class BattleLog:
+    def __init__(self, capacity=LOG_CAPACITY, archive_path=None):
+        self.recent = deque(maxlen=capacity)
+        self.total = 0                   # messages ever appended
+        self.archive_path = archive_path
+        self.pending = []                # appended but not yet on disk
+        self.page_offsets = array("q")   # file offset of message n * PAGE_LINES
+        self.archived = 0                # messages written to the archive
+        self.archive_size = 0
+        if archive_path:
+            # the archive belongs to one session; start it empty
+            try:
+                open(archive_path, "w").close()
+            except OSError:
+                self.archive_path = None
+
+    def __len__(self):
+        return self.total
+
+    @property
+    def first_in_memory(self):
+        return self.total - len(self.recent)
+
+    @property
+    def oldest(self):
+        """Number of the oldest message that can still be read."""
+        return 0 if self.archive_path else self.first_in_memory
+
+    def append(self, message):
+        self.recent.append(message)
+        self.total += 1
+        if self.archive_path:
+            self.pending.append(message)
+            if len(self.pending) >= FLUSH_EVERY:
+                self.flush()
+
+    def flush(self):
+        """Write pending messages to the archive in one go."""
+        if not self.pending:
+            return
+        chunks = []
+        offset = self.archive_size
+        for message in self.pending:
+            if self.archived % PAGE_LINES == 0:
+                self.page_offsets.append(offset)
+            line = (json.dumps(message, ensure_ascii=False) + "\n").encode("utf-8")
+            chunks.append(line)
+            offset += len(line)
+            self.archived += 1
+        try:
+            with open(self.archive_path, "ab") as f:
+                f.write(b"".join(chunks))
+        except OSError:
+            # keep playing without history rather than failing the turn
+            self.archive_path = None
+        self.archive_size = offset
+        self.pending = []
+
+    def read(self, start, count=PAGE_LINES):
+        """Return up to ``count`` messages starting at message number ``start``."""
+        end = min(self.total, start + count)
+        if start < self.first_in_memory:
+            self.flush()  # a failed write drops the archive, so flush before looking at oldest
+        start = max(self.oldest, start)  # without an archive, older messages are gone
+        if start >= end:
+            return []
+        if start >= self.first_in_memory:
+            base = self.first_in_memory
+            return [self.recent[i - base] for i in range(start, end)]
+
+        page = start // PAGE_LINES
+        lines = []
+        with open(self.archive_path, "rb") as f:
+            f.seek(self.page_offsets[page])
+            index = page * PAGE_LINES
+            for raw in f:
+                if index >= end:
+                    break
+                if index >= start:
+                    lines.append(json.loads(raw))
+                index += 1
+        return lines
+
+    def close(self):
+        self.flush()
@@ -0,0 +1,105 @@
+"""
+Observable state for the RPG view.
+
+Model is a dict that records which keys were assigned a new value. The
+engine keeps mutating player/enemy/game_state with plain item assignment,
+so the rules and the simulators (which use ordinary dicts) are unaffected.
+
+Bindings maps (model, field) pairs to the widget updates that display them.
+Changes only mark fields dirty; one flush per Tk idle cycle then runs every
+affected update exactly once, however many times the fields changed:
+
+    bindings = Bindings(root)
+    bindings.watch(player, ("hp", "max_hp"), lambda: bar.config(value=player["hp"]))
+    player["hp"] -= 5      # nothing redrawn yet
+    player["hp"] += 2      # still one redraw, on the next idle
+"""
+
+_MISSING = object()
+
+
+class Model(dict):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.dirty = set()
+        self.on_change = None  # called with the model when a clean model turns dirty
+
+    def __setitem__(self, key, value):
+        if dict.get(self, key, _MISSING) == value:
+            return  # same value, nothing to redraw
+        dict.__setitem__(self, key, value)
+        self.mark(key)
+
+    def update(self, *args, **kwargs):
+        for key, value in dict(*args, **kwargs).items():
+            self[key] = value
+
+    def reset(self, data):
+        """Replace the whole contents (a new game) and mark every key dirty."""
+        dict.clear(self)
+        dict.update(self, data)
+        self.mark(*self)
+
+    def mark(self, *keys):
+        was_clean = not self.dirty
+        self.dirty.update(keys)
+        if was_clean and self.on_change:
+            self.on_change(self)
+
+    def take_dirty(self):
+        dirty, self.dirty = self.dirty, set()
+        return dirty
+
+
+class Bindings:
+    def __init__(self, root):
+        self.root = root
+        self.watchers = {}     # id(model) -> {field: [update, ...]}
+        self.pending = []      # models with dirty fields
+        self.job = None
+
+    def watch(self, model, fields, update):
+        fields_map = self.watchers.setdefault(id(model), {})
+        for field in fields:
+            fields_map.setdefault(field, []).append(update)
+        model.on_change = self.changed
+        if model.dirty:
+            self.changed(model)
+
+    def changed(self, model):
+        self.pending.append(model)
+        if self.job is None:
+            self.job = self.root.after_idle(self.flush)
+
+    def flush(self):
+        self.job = None
+        updates = []
+        seen = set()
+        pending, self.pending = self.pending, []
+        for model in pending:
+            fields_map = self.watchers.get(id(model), {})
+            for field in model.take_dirty():
+                for update in fields_map.get(field, ()):
+                    if id(update) not in seen:
+                        seen.add(id(update))
+                        updates.append(update)
+        for update in updates:
+            update()
+
+    def refresh(self):
+        """Run every update now, e.g. after the widgets were first built."""
+        seen = set()
+        for fields_map in self.watchers.values():
+            for updates in fields_map.values():
+                for update in updates:
+                    if id(update) not in seen:
+                        seen.add(id(update))
+                        update()
+
+    def cancel(self):
+        if self.job is not None:
+            try:
+                self.root.after_cancel(self.job)
+            except Exception:
+                pass
+            self.job = None
@@ -0,0 +1,172 @@
+"""
+Exact battle odds for the RPG, without sampling.
+
+A hit has only a handful of outcomes: the crit roll (speed / 100) and, on
+the enemy's turn, the 30% elemental roll. damage_distribution() runs the
+engine's own calculate_damage once per branch, with the roll fixed, so the
+numbers always follow the rules in rpg_engine:
+
+    damage_distribution(player, enemy, "attack")  ->  ((9, 0.9), (13, 0.1))
+
+turns_to_kill() convolves such distributions turn after turn over the
+defender's remaining HP and returns the exact chance of the kill landing on
+each turn. Both are memoized on the stats that matter (attack, speed and
+element of the attacker, defense and element of the defender, the action,
+the HP), so preview() can be recomputed on every status change.
+
+    odds = preview(engine)
+    odds["attack"].kill_chance(1)   # chance the next attack finishes the enemy
+    odds["enemy"].median_turns()    # turns until the enemy would beat you
+"""
+
+import math
+from collections import namedtuple
+from functools import lru_cache
+
+from rpg_engine import calculate_damage
+
+MAX_TURNS = 100            # turns followed by turns_to_kill; the rest is ``beyond``
+ENEMY_ELEMENTAL_CHANCE = 0.3
+ACTIONS = ("attack", "special", "elemental", "enemy_turn")
+
+
+class Odds(namedtuple("Odds", "damage turns beyond")):
+    """damage: ((damage, p), ...); turns[i]: chance of the kill on turn i + 1."""
+
+    __slots__ = ()
+
+    def kill_chance(self, within=1):
+        return sum(self.turns[:within])
+
+    def median_turns(self):
+        """Turn by which the kill is at least 50% likely, None beyond MAX_TURNS."""
+        total = 0.0
+        for turn, p in enumerate(self.turns, 1):
+            total += p
+            if total >= 0.5:
+                return turn
+        return None
+
+    def damage_range(self):
+        return self.damage[0][0], self.damage[-1][0]
+
+    def mean_damage(self):
+        return sum(damage * p for damage, p in self.damage)
+
+
+class _Roll:
+    """Stands in for the engine's rng with a fixed rng.random() result."""
+
+    def __init__(self, value):
+        self.value = value
+
+    def random(self):
+        return self.value
+
+
+_NO_CRIT, _CRIT = _Roll(1.0), _Roll(0.0)
+
+
+def _attacker_key(attacker):
+    return (attacker["attack"], attacker["speed"], attacker.get("elemen"))
+
+
+def _defender_key(defender):
+    return (defender["defense"], defender.get("elemen"))
+
+
+# --- Damage of one action ---
+def damage_distribution(attacker, defender, action="attack"):
+    """((damage, probability), ...) for one ``action`` of ``attacker``.
+
+    ``action`` is "attack", "special" or "elemental" for the player, or
+    "enemy_turn" for the enemy's move (elemental 30% of the time when it
+    has an element).
+    """
+    return _damage(_attacker_key(attacker), _defender_key(defender), action)
+
+
+@lru_cache(maxsize=4096)
+def _damage(attacker_key, defender_key, action):
+    attack, speed, attacker_element = attacker_key
+    defense, defender_element = defender_key
+    attacker = {"attack": attack, "speed": speed, "elemen": attacker_element}
+    defender = {"defense": defense, "elemen": defender_element}
+
+    if action not in ACTIONS:
+        raise ValueError(f"Unknown action: {action}")
+    if action == "enemy_turn":
+        elemental = ENEMY_ELEMENTAL_CHANCE if attacker_element else 0.0
+        branches = [(1.0 - elemental, False, False), (elemental, False, True)]
+    else:
+        branches = [(1.0, action == "special", action == "elemental")]
+
+    crit = speed / 100
+    merged = {}
+    for chance, is_special, is_elemental in branches:
+        if not chance:
+            continue
+        for roll, p in ((_NO_CRIT, 1.0 - crit), (_CRIT, crit)):
+            if p <= 0:
+                continue
+            damage = calculate_damage(attacker, defender, is_special, is_elemental, roll)[0]
+            merged[damage] = merged.get(damage, 0.0) + chance * p
+    return tuple(sorted(merged.items()))
+
+
+# --- Turns to kill ---
+@lru_cache(maxsize=4096)
+def turns_to_kill(hp, first, rest=None, max_turns=MAX_TURNS):
+    """Exact chance that ``hp`` reaches 0 on turn 1, 2, ... ``max_turns``.
+
+    ``first`` is the damage distribution of the first turn and ``rest`` the
+    one repeated after it (``first`` again when None). Returns
+    (probabilities by turn, probability of needing more turns).
+    """
+    rest = first if rest is None else rest
+    alive = [0.0] * (hp + 1)  # alive[h]: chance the defender is left on h HP
+    alive[hp] = 1.0
+    turns = []
+    for turn in range(max_turns):
+        dist = first if turn == 0 else rest
+        after = [0.0] * (hp + 1)
+        killed = 0.0
+        for h, p in enumerate(alive):
+            if not p:
+                continue
+            for damage, q in dist:
+                left = h - damage
+                if left <= 0:
+                    killed += p * q
+                else:
+                    after[left] += p * q
+        turns.append(killed)
+        alive = after
+        if not any(alive):
+            break
+    beyond = 1.0 - math.fsum(turns)
+    return tuple(turns), beyond if beyond > 1e-12 else 0.0  # drop float dust
+
+
+def odds(attacker, defender, action="attack", rest_action="attack"):
+    """Odds of ``attacker`` beating ``defender`` opening with ``action``.
+
+    Special goes on cooldown and the elemental skill needs more charge
+    afterwards, so later turns are ``rest_action``.
+    """
+    damage = damage_distribution(attacker, defender, action)
+    rest = damage if action == rest_action else damage_distribution(attacker, defender, rest_action)
+    turns, beyond = turns_to_kill(max(1, defender["hp"]), damage, rest)
+    return Odds(damage, turns, beyond)
+
+
+def preview(engine):
+    """Odds of each attack the player can make now, plus the enemy's ("enemy")."""
+    player, enemy = engine.player, engine.enemy
+    result = {"attack": odds(player, enemy)}
+    if player["special_cooldown"] == 0:
+        result["special"] = odds(player, enemy, "special")
+    if player["elemental_charge"] >= 30:
+        result["elemental"] = odds(player, enemy, "elemental")
+    result["enemy"] = odds(enemy, player, "enemy_turn", "enemy_turn")
+    return result
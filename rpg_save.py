@@ -0,0 +1,350 @@
+"""
+Crash-safe saves for the RPG: a snapshot plus an append-only journal.
+
+    saves/slot-001.sav             full state, replaced atomically
+    saves/slot-001.sav.journal     one JSON line per recorded turn: the
+                                   fields that changed since the last record
+
+record() diffs the saved sections against the last recorded copy and queues
+the delta; snapshot() queues the whole state in the binary format of
+rpg_state, checked against its schema. Only the encoding of these small
+payloads happens on the caller's (Tk) thread. A background
+writer appends journal lines and writes snapshots (temp file, fsync,
+rename), then truncates the journal, so a save never stalls a frame.
+
+Every record carries a sequence number and the snapshot stores the last one
+it includes, so load() replays only the journal tail that is newer than the
+snapshot. A torn last line from a crash mid-append is ignored. Saves from
+before the binary format (slot-001.json) are still read, migrated to the
+current version, and replaced by a .sav on the first snapshot after load.
+
+SaveSlots keeps any number of such saves in saves/ and a small index.json
+with per-slot metadata (class, level, day, gold, timestamp, playtime), so a
+load menu can list every slot without opening the save files. Index entries
+remember the file sizes and mtimes they were built from; list() stats the
+directory and re-reads only slots whose files no longer match.
+"""
+
+import atexit
+import json
+import os
+import queue
+import threading
+from datetime import datetime
+
+from rpg_state import SAVE_VERSION, SaveError, encode, is_binary, migrate, read, validate
+
+SAVE_FILE = "rpg_save.json"  # single save used before slots existed
+SAVE_DIR = "saves"
+INDEX_FILE = "index.json"
+EXTENSION = ".sav"
+LEGACY_EXTENSION = ".json"  # slots written before the binary format
+SECTIONS = ("player", "game_state")
+
+
+def _copy(value):
+    return json.loads(json.dumps(value))
+
+
+def write_atomic(path, data):
+    tmp = path + ".tmp"
+    if isinstance(data, str):
+        data = data.encode("utf-8")
+    with open(tmp, "wb") as f:
+        f.write(data)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+
+
+def legacy_path(path):
+    """The JSON save a .sav path replaces."""
+    return path[:-len(EXTENSION)] + LEGACY_EXTENSION if path.endswith(EXTENSION) else None
+
+
+def read_save(path):
+    """Snapshot at ``path`` (or the JSON save it replaces) with its journal
+    tail applied, migrated to SAVE_VERSION; None when unreadable."""
+    for candidate in (path, legacy_path(path)):
+        if candidate is None:
+            continue
+        try:
+            with open(candidate, "rb") as f:
+                blob = f.read()
+        except OSError:
+            continue
+        try:
+            return _read_save(candidate, blob)
+        except (ValueError, KeyError, TypeError, AttributeError):  # SaveError included
+            return None
+    return None
+
+
+def _read_save(path, blob):
+    if not is_binary(blob):
+        # JSON saves are migrated after the replay: their journal was written
+        # by the same version of the game as the snapshot
+        data = json.loads(blob)
+        if not isinstance(data, dict):
+            raise SaveError("not a save")
+        stale = True
+    else:
+        data = read(blob)
+        stale = False
+    seq = data.get("seq", 0)  # version 1 saves have no journal
+    replayed = 0
+    try:
+        with open(path + ".journal", "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    break  # torn write at the end of the journal
+                if record["seq"] <= seq:
+                    continue  # already in the snapshot
+                for section, changed in record["set"].items():
+                    data[section].update(changed)
+                seq = record["seq"]
+                replayed += 1
+    except OSError:
+        pass
+    if stale:
+        data = validate(migrate(data))
+    elif replayed:
+        data = validate(data)
+    data["seq"] = seq
+    data["replayed"] = replayed
+    data["path"] = path
+    return data
+
+
+class SaveStore:
+    def __init__(self, path=SAVE_FILE, on_snapshot=None):
+        self.path = path
+        self.journal_path = path + ".journal"
+        self.on_snapshot = on_snapshot  # called on the writer thread with (path, slot_meta)
+        self.seq = 0          # last sequence number handed out
+        self.last = None      # section -> copy of what has been recorded
+        self.jobs = queue.Queue()
+        self.error = None     # last error from the writer thread
+        self.writer = threading.Thread(target=self._run, name="save-writer", daemon=True)
+        self.writer.start()
+        atexit.register(self.close)
+
+    # --- Tk thread ---
+    def record(self, state):
+        """Journal the fields of ``state`` that changed since the last record."""
+        if self.last is None:
+            return self.snapshot(state)
+        changes = {}
+        for section in SECTIONS:
+            last = self.last[section]
+            changed = {key: value for key, value in state[section].items() if last.get(key, object()) != value}
+            if changed:
+                changes[section] = changed
+        if not changes:
+            return False
+        self.seq += 1
+        line = json.dumps({"seq": self.seq, "set": changes})
+        for section, changed in changes.items():
+            self.last[section].update(_copy(changed))
+        self.jobs.put(("append", line))
+        return True
+
+    def snapshot(self, state):
+        """Queue a full snapshot; the journal is emptied once it is on disk."""
+        data = {section: state[section] for section in SECTIONS}
+        timestamp = datetime.now().isoformat()
+        blob = encode(data, self.seq, timestamp)  # SaveError if the state breaks the schema
+        self.last = _copy(data)
+        self.jobs.put(("snapshot", (blob, slot_meta(dict(data, timestamp=timestamp)))))
+        return True
+
+    def load(self):
+        """Return the saved sections, snapshot plus journal tail, or None."""
+        self.drain()
+        data = read_save(self.path)
+        if data is None:
+            return None
+        self.seq = data["seq"]
+        self.last = _copy({section: data[section] for section in SECTIONS})
+        if data["path"] != self.path:
+            # an older JSON save: rewrite it in the current format before
+            # anything is journaled next to the new path
+            self.snapshot(data)
+        return data
+
+    def drain(self):
+        """Block until everything queued so far is on disk."""
+        self.jobs.join()
+
+    def close(self):
+        if self.writer.is_alive():
+            self.jobs.put(None)
+            self.writer.join()
+
+    # --- Writer thread ---
+    def _run(self):
+        journal = None
+        while True:
+            job = self.jobs.get()
+            try:
+                if job is None:
+                    return
+                kind, payload = job
+                if kind == "append":
+                    if journal is None:
+                        journal = open(self.journal_path, "a", encoding="utf-8")
+                    journal.write(payload + "\n")
+                    journal.flush()
+                    os.fsync(journal.fileno())
+                else:
+                    blob, meta = payload
+                    write_atomic(self.path, blob)
+                    # everything journaled so far is in the snapshot now
+                    if journal is not None:
+                        journal.close()
+                    journal = open(self.journal_path, "w", encoding="utf-8")
+                    old = legacy_path(self.path)
+                    if old:
+                        for stale in (old, old + ".journal"):
+                            if os.path.exists(stale):
+                                os.remove(stale)
+                    if self.on_snapshot:
+                        self.on_snapshot(self.path, meta)
+            except OSError as e:
+                self.error = e
+            finally:
+                self.jobs.task_done()
+                if job is None and journal is not None:
+                    journal.close()
+
+
+# --- Slots ---
+def slot_meta(data):
+    player, game_state = data["player"], data["game_state"]
+    return {
+        "class": player.get("class"),
+        "level": player.get("level", 1),
+        "day": game_state.get("day", 1),
+        "gold": player.get("gold", 0),
+        "timestamp": data.get("timestamp"),
+        "playtime": game_state.get("playtime", 0),
+    }
+
+
+def _file_stamp(path):
+    try:
+        snap = os.stat(path)
+    except OSError:
+        return None
+    try:
+        journal = os.path.getsize(path + ".journal")
+    except OSError:
+        journal = 0
+    return [snap.st_mtime_ns, snap.st_size, journal]
+
+
+class SaveSlots:
+    def __init__(self, directory=SAVE_DIR, legacy_path=SAVE_FILE):
+        self.directory = directory
+        self.index_path = os.path.join(directory, INDEX_FILE)
+        self.lock = threading.Lock()  # snapshots of different slots finish on different threads
+        self.index = {}
+        self.rebuilt = 0  # entries re-read by the last list()
+        os.makedirs(directory, exist_ok=True)
+        try:
+            with open(self.index_path, "r", encoding="utf-8") as f:
+                self.index = json.load(f)
+        except (OSError, ValueError):
+            self.index = {}
+        self._adopt_legacy(legacy_path)
+
+    def _adopt_legacy(self, legacy_path):
+        # The pre-slot rpg_save.json becomes a slot of its own
+        # (as a JSON slot, converted like any other on its first snapshot)
+        target = os.path.join(self.directory, "rpg_save" + LEGACY_EXTENSION)
+        if legacy_path and os.path.exists(legacy_path) and "rpg_save" not in self.slot_names():
+            os.replace(legacy_path, target)
+            if os.path.exists(legacy_path + ".journal"):
+                os.replace(legacy_path + ".journal", target + ".journal")
+
+    def path(self, slot):
+        return os.path.join(self.directory, slot + EXTENSION)
+
+    def slot_names(self):
+        names = set()
+        with os.scandir(self.directory) as entries:
+            for entry in entries:
+                for extension in (EXTENSION, LEGACY_EXTENSION):
+                    if entry.name.endswith(extension) and entry.name != INDEX_FILE:
+                        names.add(entry.name[:-len(extension)])
+        return sorted(names)
+
+    def new_slot(self):
+        taken = set(self.slot_names()) | set(self.index)
+        n = 1
+        while f"slot-{n:03d}" in taken:
+            n += 1
+        return f"slot-{n:03d}"
+
+    def open(self, slot):
+        return SaveStore(self.path(slot), on_snapshot=self._snapshot_written)
+
+    def list(self):
+        """Index entries for every slot on disk, newest first.
+
+        Only stats the files; a slot is re-read when its stamp differs from
+        the index (written by another process, crashed before indexing,
+        journal grew since the last snapshot).
+        """
+        with self.lock:
+            on_disk = set(self.slot_names())
+            changed = False
+            for slot in list(self.index):
+                if slot not in on_disk:
+                    del self.index[slot]
+                    changed = True
+            self.rebuilt = 0
+            for slot in on_disk:
+                stamp = _file_stamp(self.path(slot)) or _file_stamp(legacy_path(self.path(slot)))
+                entry = self.index.get(slot)
+                if entry and entry.get("stamp") == stamp:
+                    continue
+                data = read_save(self.path(slot))
+                if data is None:
+                    continue  # unreadable; leave it out of the menu
+                self.index[slot] = dict(slot_meta(data), stamp=stamp)
+                self.rebuilt += 1
+                changed = True
+            if changed:
+                self._write_index()
+            entries = [dict(entry, slot=slot) for slot, entry in self.index.items()]
+        entries.sort(key=lambda e: e.get("timestamp") or "", reverse=True)
+        return entries
+
+    def delete(self, slot):
+        with self.lock:
+            for save in (self.path(slot), legacy_path(self.path(slot))):
+                for path in (save, save + ".journal"):
+                    if os.path.exists(path):
+                        os.remove(path)
+            if self.index.pop(slot, None) is not None:
+                self._write_index()
+
+    def _snapshot_written(self, path, meta):
+        slot = os.path.basename(path)[:-len(EXTENSION)]
+        with self.lock:
+            self.index[slot] = dict(meta, stamp=_file_stamp(path))
+            self._write_index()
+
+    def _write_index(self):
+        try:
+            write_atomic(self.index_path, json.dumps(self.index, indent=1))
+        except OSError:
+            pass  # the index is only a cache; list() rebuilds it
+
+
+def format_playtime(seconds):
+    minutes = int(seconds) // 60
+    return f"{minutes // 60}h {minutes % 60:02d}m"
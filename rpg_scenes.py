@@ -0,0 +1,41 @@
+"""
+Scene manager for the RPG: one Tk root, one frame per screen.
+
+A scene is built the first time it is shown and kept afterwards. Switching
+only unpacks one frame and packs another, so going from class select to
+battle to game over, or starting a new game, never creates a second Tcl
+interpreter or rebuilds a screen.
+
+    scenes = SceneManager(root, bg="#2c2f33")
+    scenes.add("battle", build_battle)   # build(frame) -> enter() or None
+    scenes.show("battle")                # builds once, then calls enter()
+"""
+
+import tkinter as tk
+
+
+class SceneManager:
+    def __init__(self, root, **frame_options):
+        self.root = root
+        self.frame_options = frame_options
+        self.builders = {}
+        self.frames = {}
+        self.enters = {}
+        self.current = None
+
+    def add(self, name, build):
+        self.builders[name] = build
+
+    def show(self, name, enter=True):
+        """Switch to ``name``; ``enter=False`` returns to a scene as it was left."""
+        if name not in self.frames:
+            frame = tk.Frame(self.root, **self.frame_options)
+            self.enters[name] = self.builders[name](frame)
+            self.frames[name] = frame
+        if self.current != name:
+            if self.current is not None:
+                self.frames[self.current].pack_forget()
+            self.frames[name].pack(fill="both", expand=True)
+            self.current = name
+        if enter and self.enters[name]:
+            self.enters[name]()
@@ -0,0 +1,381 @@
+"""
+Session server for the RPG: many headless games behind one asyncio loop.
+
+Every session is a BattleEngine, the rules RPGGame in Test.py renders, with
+a short BattleLog. The server speaks JSON lines over TCP on localhost: one
+request object per line, one reply per line, in order, so any client that
+can open a socket can play:
+
+    {"op": "new", "class": "Mage"}
+    {"op": "act", "session": "9f1c04d2e6ab3870", "action": "attack"}
+    {"op": "act", "session": "9f1c04d2e6ab3870", "action": "item", "item": "Bomb"}
+    {"op": "buy", "session": "9f1c04d2e6ab3870", "item": "Iron Sword"}
+    {"op": "state", "session": "9f1c04d2e6ab3870"}
+    {"op": "close", "session": "9f1c04d2e6ab3870"}
+    {"op": "stats"}
+
+"action" is one of rpg_engine.ACTIONS (attack, special, elemental, heal,
+item, flee); "item" names one of rpg_engine.shop_items. A defeated player
+can only use an item (a Phoenix Down) and cannot buy. A reply is
+{"ok": true, "session", "state", "log"}: a summary of the player, the
+target and the day, and the battle log lines the request added. Errors
+come back as {"ok": false, "error"} and keep the connection open. An "id"
+in a request is echoed in its reply.
+
+Sessions are small: the dicts of the game, a log that is emptied once its
+lines are sent and a slot in an LRU, ~4.5 KB each (the dice come from one
+rng shared by every session). A sweep every SWEEP_SECONDS writes the
+sessions idle for ``idle`` seconds, and the least recently used ones beyond
+``max_live``, to <directory>/<session>.sav in the binary format of
+rpg_state (~350 bytes: player, game_state and the target) and drops them;
+the next request for one reads it back. Only the encoding (~50 us) happens
+on the loop, at most EVICT_BATCH sessions before the sweep yields to
+waiting requests; a writer thread does the file I/O, and a session asked
+for while its file is being written resumes from the encoded bytes. A
+resumed group fight keeps its target only.
+
+A request never waits on anything: it runs one action and its follow-ups
+straight through, ~80 us, and a session on disk is read back on the spot
+(a ~350 byte file, ~30 us from the page cache). Handing that read to a
+thread costs more under load, since each hop back to the loop waits behind
+every request already queued. Lines longer than MAX_LINE end the
+connection. Stopping the server (Ctrl+C, SIGTERM) writes every live session
+to disk, so they survive a restart.
+
+    python rpg_server.py                             # 127.0.0.1:8765, sessions/
+    python rpg_server.py --port 9000 --idle 60 --max-live 2000
+    python rpg_loadgen.py --spawn --sessions 5000    # see rpg_loadgen.py
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import re
+import secrets
+import signal
+import sys
+import time
+import traceback
+from collections import Counter, OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+
+from rpg_engine import ACTIONS, BattleEngine, classes, shop_items
+from rpg_log import BattleLog
+from rpg_save import write_atomic
+from rpg_state import decode, encode
+from rpg_telemetry import percentile
+
+HOST = "127.0.0.1"
+PORT = 8765
+SESSION_DIR = "sessions"
+IDLE_SECONDS = 300.0     # sessions untouched this long are written to disk
+MAX_LIVE = 10000         # sessions kept in memory; the least recently used beyond go to disk
+SWEEP_SECONDS = 1.0
+EVICT_BATCH = 16         # sessions encoded per sweep step (~2 ms) before yielding to requests
+MAX_LINE = 4096          # bytes in a request line
+SESSION_LOG_LINES = 64   # log lines one request can add; sent with the reply, then dropped
+LATENCY_SAMPLES = 10000  # recent request times behind the "stats" percentiles
+
+SESSION_ID = re.compile(r"[0-9a-f]{16}")  # also the file name, so nothing else gets near the disk
+PLAYER_FIELDS = ("class", "elemen", "level", "hp", "max_hp", "xp", "xp_to_next", "gold",
+                 "attack", "defense", "special_cooldown", "elemental_charge", "location")
+ENEMY_FIELDS = ("name", "elemen", "level", "hp", "max_hp")
+
+
+class RequestError(ValueError):
+    """A request the server cannot carry out; its message goes back to the client."""
+
+
+class Session:
+    __slots__ = ("id", "engine", "used")
+
+    def __init__(self, session_id, engine):
+        self.id = session_id
+        self.engine = engine
+        self.used = time.monotonic()
+
+
+def summary(engine):
+    """The part of a session's state a client needs to show it and pick an action."""
+    player = engine.player
+    enemy = engine.enemy
+    return {
+        "day": engine.game_state["day"],
+        "active": engine.game_state["game_active"],
+        "player": {field: player[field] for field in PLAYER_FIELDS},
+        "inventory": player["inventory"],
+        "equipment": player["equipment"],
+        "enemy": {field: enemy[field] for field in ENEMY_FIELDS},
+        "enemies": len(engine.horde.alive()),
+    }
+
+
+def shop_item(request):
+    """The "item" of ``request``, which has to be one the shop sells."""
+    item = request.get("item")
+    if not isinstance(item, str) or item not in shop_items:
+        raise RequestError(f"unknown item {item!r}")
+    return item
+
+
+def _remove_file(path):
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+class SessionServer:
+    def __init__(self, directory=SESSION_DIR, idle=IDLE_SECONDS, max_live=MAX_LIVE):
+        self.directory = directory
+        self.idle = idle
+        self.max_live = max_live
+        self.rng = random.Random()  # shared: sessions need dice, not a stream of their own
+        self.live = OrderedDict()   # session id -> Session, least recently used first
+        self.evicting = {}          # session id -> encoded bytes on their way to disk
+        self.writer = ThreadPoolExecutor(max_workers=1)  # one thread keeps writes in order
+        self.stats = Counter()
+        self.latency = deque(maxlen=LATENCY_SAMPLES)
+        self.server = None
+        self.sweeper = None
+        os.makedirs(directory, exist_ok=True)
+
+    def path(self, session_id):
+        return os.path.join(self.directory, session_id + ".sav")
+
+    # --- Sessions ---
+    def engine(self, player=None, enemy=None, game_state=None):
+        return BattleEngine(player, enemy, game_state, rng=self.rng,
+                            log=BattleLog(capacity=SESSION_LOG_LINES))
+
+    def create(self, chosen_class):
+        if chosen_class not in classes:
+            raise RequestError(f"unknown class {chosen_class!r}; one of {', '.join(classes)}")
+        engine = self.engine()
+        engine.choose_class(chosen_class)
+        engine.log(f"You chose {chosen_class} class!")
+        engine.spawn_enemy()
+        session_id = secrets.token_hex(8)
+        while session_id in self.live or session_id in self.evicting or os.path.exists(self.path(session_id)):
+            session_id = secrets.token_hex(8)
+        session = self.live[session_id] = Session(session_id, engine)
+        self.stats["created"] += 1
+        return session
+
+    def session(self, session_id):
+        """The live session ``session_id``, read back from disk if it was evicted."""
+        if type(session_id) is not str or not SESSION_ID.fullmatch(session_id):
+            raise RequestError("missing or malformed session id")
+        session = self.live.get(session_id)
+        if session is None:
+            blob = self.evicting.get(session_id) or self.load(session_id)
+            data = decode(blob, as_dicts=True)
+            engine = self.engine(data["player"], data.get("enemy"), data["game_state"])
+            session = self.live[session_id] = Session(session_id, engine)
+            self.stats["resumed"] += 1
+        self.live.move_to_end(session_id)
+        session.used = time.monotonic()
+        return session
+
+    def load(self, session_id):
+        try:
+            with open(self.path(session_id), "rb") as f:
+                return f.read()
+        except FileNotFoundError:
+            raise RequestError("no such session") from None
+
+    def evict(self, session):
+        """Encode ``session`` and hand it to the writer; it leaves memory once written."""
+        engine = session.engine
+        blob = encode({"player": engine.player, "game_state": engine.game_state, "enemy": engine.enemy})
+        del self.live[session.id]
+        self.evicting[session.id] = blob
+        self.stats["evicted"] += 1
+        future = asyncio.get_running_loop().run_in_executor(
+            self.writer, write_atomic, self.path(session.id), blob)
+        future.add_done_callback(partial(self._written, session.id, blob))
+
+    def _written(self, session_id, blob, future):
+        if future.exception() is not None:
+            # keep serving it from memory rather than losing the game
+            self.stats["write_errors"] += 1
+            print(f"rpg_server: could not write session {session_id}: {future.exception()}", file=sys.stderr)
+        elif self.evicting.get(session_id) is blob:  # not evicted again since
+            del self.evicting[session_id]
+
+    def discard(self, session_id):
+        self.live.pop(session_id, None)
+        self.evicting.pop(session_id, None)
+        asyncio.get_running_loop().run_in_executor(self.writer, _remove_file, self.path(session_id))
+        self.stats["closed"] += 1
+
+    async def sweep(self):
+        """Evict idle sessions and the ones beyond max_live, oldest first."""
+        live = self.live
+        evicted = 0
+        while live:
+            session = next(iter(live.values()))
+            if len(live) <= self.max_live and time.monotonic() - session.used < self.idle:
+                break
+            self.evict(session)
+            evicted += 1
+            if evicted % EVICT_BATCH == 0:
+                await asyncio.sleep(0)
+        return evicted
+
+    async def sweep_forever(self):
+        while True:
+            await asyncio.sleep(SWEEP_SECONDS)
+            try:
+                await self.sweep()
+            except Exception:
+                traceback.print_exc()
+
+    # --- Requests ---
+    def dispatch(self, request):
+        op = request.get("op")
+        if op == "new":
+            session = self.create(request.get("class"))
+            return self.reply(session, 0)
+        if op == "stats":
+            return {"ok": True, "stats": self.report()}
+        if op not in ("act", "buy", "state", "close"):
+            raise RequestError(f"unknown op {op!r}")
+
+        session = self.session(request.get("session"))
+        engine = session.engine
+        start = len(engine.battle_log)
+        if op == "act":
+            action = request.get("action")
+            if action not in ACTIONS:
+                raise RequestError(f"unknown action {action!r}; one of {', '.join(ACTIONS)}")
+            item = shop_item(request) if action == "item" else None
+            # defeated players can only use an item (a Phoenix Down)
+            if not engine.game_state["game_active"] and action != "item":
+                raise RequestError("the game is over; use a Phoenix Down or start a new session")
+            engine.act(action, item)
+        elif op == "buy":
+            item = shop_item(request)
+            # as in the game, the shop is closed once the player is down
+            if not engine.game_state["game_active"]:
+                raise RequestError("the game is over; use a Phoenix Down or start a new session")
+            if not engine.buy_item(item):
+                raise RequestError("not enough gold")
+        elif op == "close":
+            self.discard(session.id)
+            return {"ok": True, "session": session.id}
+        return self.reply(session, start)
+
+    def reply(self, session, start):
+        log = session.engine.battle_log
+        lines = log.read(start, len(log) - start)
+        log.recent.clear()  # sent; the count goes on, so the next reply starts after them
+        return {"ok": True, "session": session.id, "state": summary(session.engine), "log": lines}
+
+    def handle(self, line):
+        started = time.perf_counter()
+        request = None
+        try:
+            request = json.loads(line)
+            if type(request) is not dict:
+                raise RequestError("expected a JSON object")
+            reply = self.dispatch(request)
+        except ValueError as e:  # RequestError, bad JSON, a corrupt session file
+            reply = {"ok": False, "error": str(e)}
+        except Exception:
+            traceback.print_exc()
+            reply = {"ok": False, "error": "internal error"}
+        if type(request) is dict and "id" in request:
+            reply["id"] = request["id"]
+        self.stats["requests"] += 1
+        if not reply["ok"]:
+            self.stats["errors"] += 1
+        self.latency.append(time.perf_counter() - started)
+        return (json.dumps(reply, ensure_ascii=False) + "\n").encode("utf-8")
+
+    async def serve_client(self, reader, writer):
+        self.stats["connections"] += 1
+        try:
+            while True:
+                try:
+                    line = await reader.readline()
+                except ValueError:  # longer than the stream limit
+                    writer.write(b'{"ok": false, "error": "request line too long"}\n')
+                    break
+                if not line:
+                    break
+                if line.strip():
+                    writer.write(self.handle(line))
+                    await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    def report(self):
+        latency = list(self.latency)
+        return {
+            **self.stats,
+            "live": len(self.live),
+            "writing": len(self.evicting),
+            "p50_ms": round(percentile(latency, 50) * 1000, 3) if latency else None,
+            "p99_ms": round(percentile(latency, 99) * 1000, 3) if latency else None,
+        }
+
+    # --- Lifetime ---
+    async def start(self, host=HOST, port=PORT):
+        self.server = await asyncio.start_server(self.serve_client, host, port, limit=MAX_LINE)
+        self.sweeper = asyncio.create_task(self.sweep_forever())
+        return self.server
+
+    async def stop(self):
+        """Stop serving and write every live session to disk."""
+        if self.server is not None:
+            self.server.close()
+        if self.sweeper is not None:
+            self.sweeper.cancel()
+        for session in list(self.live.values()):
+            self.evict(session)
+        await asyncio.get_running_loop().run_in_executor(None, partial(self.writer.shutdown, wait=True))
+
+    async def run(self, host=HOST, port=PORT):
+        server = await self.start(host, port)
+        task = asyncio.current_task()
+        try:
+            asyncio.get_running_loop().add_signal_handler(signal.SIGTERM, task.cancel)
+        except (NotImplementedError, AttributeError):
+            pass  # Windows: Ctrl+C only
+        print(f"Serving RPG sessions on {host}:{server.sockets[0].getsockname()[1]} "
+              f"(sessions in {self.directory}/)", flush=True)
+        try:
+            await server.serve_forever()
+        except asyncio.CancelledError:
+            pass
+        finally:
+            await self.stop()
+            print(f"Stopped; {self.stats['evicted']} sessions written to {self.directory}/", flush=True)
+
+
+# --- Command line ---
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serve headless RPG sessions as JSON lines over TCP")
+    parser.add_argument("--host", default=HOST)
+    parser.add_argument("--port", type=int, default=PORT, help="0 picks a free port")
+    parser.add_argument("--dir", default=SESSION_DIR, help="where evicted sessions are written")
+    parser.add_argument("--idle", type=float, default=IDLE_SECONDS,
+                        help="seconds without a request before a session goes to disk")
+    parser.add_argument("--max-live", type=int, default=MAX_LIVE, help="sessions kept in memory")
+    args = parser.parse_args(argv)
+
+    server = SessionServer(args.dir, args.idle, args.max_live)
+    try:
+        asyncio.run(server.run(args.host, args.port))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
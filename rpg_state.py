@@ -0,0 +1,669 @@
+"""
+Typed save state for the RPG and its compact binary format.
+
+Player (with its Inventory), Enemy and GameState are __slots__ classes with
+one typed field per key of the dicts the engine plays on, so a save is
+checked field by field when it is read instead of being update()d into the
+game as whatever JSON it held. The engine and the view keep playing on
+dicts (observable Models in Test.py, plain dicts in the simulators);
+from_dict() and to_dict() convert at the save boundary, with the defaults
+of new_player() / new_game_state() for fields a save does not have.
+
+Snapshots are written in a binary layout (little endian):
+
+    b"RPGB", u16 format version, u8 section count
+    string table: u32 byte length, then every distinct string once, UTF-8,
+                  separated by NUL; everything else refers to strings by a
+                  u16 id (1 for the first, 0 for None)
+    u64 journal seq, u16 timestamp id
+    per section: u16 name id
+                 the scalar fields and the entry count of each list or map,
+                 in one struct compiled with the class
+                 the entries of all those lists and maps, in one struct
+                 built from the counts
+                 nested objects (the player's inventory) the same way
+
+Each class compiles its field list once (State.__init_subclass__) into the
+struct formats and per-field checkers, so a section decodes in two
+unpack_from() calls and its values come out typed: a binary save needs no
+field checks, only JSON saves and replayed journal tails do.
+
+Older saves are upgraded by explicit migrations: MIGRATIONS[n] turns a
+version n save dict into version n + 1, and migrate() runs every step
+between the version on disk and SAVE_VERSION. A field added to the schema
+needs a default in new_player() / new_game_state() or a migration.
+
+    python rpg_state.py export saves/slot-001.sav            # JSON on stdout
+    python rpg_state.py export saves/slot-001.sav -o slot.json
+    python rpg_state.py info saves/                          # version and sizes
+"""
+
+import argparse
+import glob
+import json
+import keyword
+import os
+import struct
+import sys
+
+from rpg_engine import new_enemy, new_game_state, new_player, upgrade_player
+
+MAGIC = b"RPGB"
+SAVE_VERSION = 3    # 1: bare JSON, 2: JSON + journal seq, 3: binary
+NONE = 0            # string id of None
+NO_INT = -2 ** 31   # a missing optional int
+MAX_ITEMS = 0xFFFF  # strings in a save, entries in a list or map
+
+_HEADER = struct.Struct("<4sHB")
+_U16 = struct.Struct("<H")
+_U32 = struct.Struct("<I")
+_SEQ = struct.Struct("<QH")
+
+# Field kinds and their struct codes:
+#   i  int32    q  int64    i?  int32 or None    ?  bool
+#   s  str      s?  str or None
+# and compound fields: ("list", "s"), ("map", "i") (str -> int),
+# ("records", kinds) (a list of fixed-shape lists), ("keyed", kinds)
+# (str -> fixed-shape list) and a State class for a nested object.
+_CODES = {"i": "i", "q": "q", "i?": "i", "?": "?", "s": "H", "s?": "H"}
+_LIMITS = {"i": 2 ** 31, "i?": 2 ** 31, "q": 2 ** 63}
+
+
+class SaveError(ValueError):
+    pass
+
+
+# --- Field checks ---
+# A checker returns the value (lists and maps copied) or raises SaveError with
+# the path below the field, e.g. "[2]: expected an integer"; callers prefix
+# their own part, so the message is only built when a save is broken.
+def _checker(kind):
+    if isinstance(kind, type):
+        return kind._checked
+    if isinstance(kind, tuple):
+        shape, inner = kind
+        check = _record_checker(inner) if shape in ("records", "keyed") else _checker(inner)
+        return _list_checker(check) if shape in ("list", "records") else _map_checker(check)
+    if kind == "?":
+        return _check_bool
+    if kind.startswith("s"):
+        check = _check_str
+    else:
+        check = _int_checker(_LIMITS[kind])
+    if kind.endswith("?"):
+        return lambda value: None if value is None else check(value)
+    return check
+
+
+def _check_bool(value):
+    if type(value) is not bool:
+        raise SaveError(": expected true or false")
+    return value
+
+
+def _check_str(value):
+    if type(value) is not str or "\0" in value:
+        raise SaveError(": expected a string")
+    return value
+
+
+def _int_checker(limit):
+    def check(value):
+        if type(value) is not int:
+            raise SaveError(": expected an integer")
+        if not -limit < value < limit:
+            raise SaveError(f": {value} is out of range")
+        return value
+    return check
+
+
+def _list_checker(check):
+    def checked(value):
+        if type(value) is not list:
+            raise SaveError(": expected a list")
+        out = []
+        for i, item in enumerate(value):
+            try:
+                out.append(check(item))
+            except SaveError as e:
+                raise SaveError(f"[{i}]{e}") from None
+        return out
+    return checked
+
+
+def _map_checker(check):
+    def checked(value):
+        if not isinstance(value, dict):
+            raise SaveError(": expected an object")
+        out = {}
+        for key, item in value.items():
+            _check_str(key)
+            try:
+                out[key] = check(item)
+            except SaveError as e:
+                raise SaveError(f".{key}{e}") from None
+        return out
+    return checked
+
+
+def _record_checker(kinds):
+    checks = [_checker(kind) for kind in kinds]
+
+    def checked(value):
+        if type(value) is not list or len(value) != len(checks):
+            raise SaveError(f": expected a list of {len(checks)} values")
+        out = []
+        for i, (check, item) in enumerate(zip(checks, value)):
+            try:
+                out.append(check(item))
+            except SaveError as e:
+                raise SaveError(f"[{i}]{e}") from None
+        return out
+    return checked
+
+
+def _copier(kind):
+    """Copy of a field value for to_dict(); None for immutable scalars."""
+    if isinstance(kind, type):
+        return kind.to_dict
+    if isinstance(kind, tuple):
+        shape = kind[0]
+        if shape == "list":
+            return list
+        if shape == "records":
+            return lambda rows: [list(row) for row in rows]
+        if shape == "map":
+            return dict
+        return lambda rows: {key: list(row) for key, row in rows.items()}
+    return None
+
+
+# --- Binary fields ---
+def _packed(values, texts, optional, strings):
+    """``values`` as packed: strings (and None) as ids, a None int as NO_INT."""
+    values = list(values)
+    for i in texts:
+        values[i] = strings.id(values[i])
+    for i in optional:
+        if values[i] is None:
+            values[i] = NO_INT
+    return values
+
+
+def _unpacked(values, texts, optional, table):
+    """Reverse of _packed(), in place."""
+    for i in texts:
+        values[i] = table[values[i]]
+    for i in optional:
+        if values[i] == NO_INT:
+            values[i] = None
+    return values
+
+
+def _entries(kind):
+    """(struct code of one entry, values per entry, build, flatten) for a
+    list or map field. build(flat, table) makes the field from its unpacked
+    entries; flatten(value, strings) lists the values to pack."""
+    shape, inner = kind
+    if shape == "list":
+        return ("H", 1,
+                lambda flat, table: [table[i] for i in flat],
+                lambda value, strings: [strings.id(item) for item in value])
+    if shape == "map":
+        def flatten(value, strings):
+            flat = []
+            for key, item in value.items():
+                flat += (strings.id(key), item)
+            return flat
+        return ("H" + _CODES[inner], 2,
+                lambda flat, table: dict(zip([table[i] for i in flat[::2]], flat[1::2])),
+                flatten)
+
+    keyed = shape == "keyed"
+    width = len(inner) + keyed
+    texts = [i for i, k in enumerate(inner) if k in ("s", "s?")]
+    optional = [i for i, k in enumerate(inner) if k == "i?"]
+
+    def build(flat, table):
+        rows = [list(flat[i + keyed:i + width]) for i in range(0, len(flat), width)]
+        for row in rows:
+            _unpacked(row, texts, optional, table)
+        return dict(zip([table[i] for i in flat[::width]], rows)) if keyed else rows
+
+    def flatten(value, strings):
+        flat = []
+        for key, row in (value.items() if keyed else zip(value, value)):
+            if keyed:
+                flat.append(strings.id(key))
+            flat += _packed(row, texts, optional, strings)
+        return flat
+
+    return ("H" if keyed else "") + "".join(_CODES[k] for k in inner), width, build, flatten
+
+
+# --- Typed state ---
+def _attr(key):
+    return key + "_" if keyword.iskeyword(key) else key
+
+
+def slots(fields):
+    """__slots__ for a State subclass with these FIELDS."""
+    return tuple(_attr(key) for key, _ in fields)
+
+
+class State:
+    """Base of the typed state classes.
+
+    A subclass lists its FIELDS as (dict key, kind) pairs, scalars first,
+    sets ``__slots__ = slots(FIELDS)`` and gives DEFAULTS, a function
+    returning a dict with every field; the rest is compiled from FIELDS
+    when the class is defined.
+    """
+
+    __slots__ = ()
+    FIELDS = ()
+    DEFAULTS = dict
+
+    def __init_subclass__(cls):
+        fields = cls.FIELDS
+        kinds = [kind for _, kind in fields]
+        scalars = [kind for kind in kinds if kind in _CODES]
+        entries = [kind for kind in kinds if isinstance(kind, tuple)]
+        nested = [kind for kind in kinds if isinstance(kind, type)]
+        assert kinds == scalars + entries + nested, "scalars, then lists and maps, then nested states"
+        cls.KEYS = frozenset(key for key, _ in fields)
+        cls.NAMES = tuple(key for key, _ in fields)
+        descriptors = [getattr(cls, _attr(key)) for key, _ in fields]
+        cls.SETTERS = tuple(d.__set__ for d in descriptors)
+        cls.OUT = tuple((key, d.__get__, _copier(kind)) for (key, kind), d in zip(fields, descriptors))
+        cls.CHECKS = tuple((key, _checker(kind)) for key, kind in fields)
+        # scalars and the entry count of each list or map share one struct
+        cls.STRUCT = struct.Struct("<" + "".join(_CODES[kind] for kind in scalars) + "H" * len(entries))
+        cls.SCALARS = len(scalars)
+        cls.TEXTS = [i for i, kind in enumerate(scalars) if kind in ("s", "s?")]
+        cls.OPTIONAL = [i for i, kind in enumerate(scalars) if kind == "i?"]
+        cls.ENTRIES = tuple(_entries(kind) for kind in entries)
+        cls.LAYOUTS = {}  # entry counts -> (struct, [(build, start, end)])
+        cls.NESTED = tuple(nested)
+
+    def __init__(self, **values):
+        defaults = self.DEFAULTS() if self.KEYS - values.keys() else values
+        for (key, _), set_value in zip(self.FIELDS, self.SETTERS):
+            set_value(self, values[key] if key in values else defaults[key])
+
+    def __eq__(self, other):
+        return type(self) is type(other) and self.to_dict() == other.to_dict()
+
+    def __repr__(self):
+        return f"{type(self).__name__}({self.to_dict()!r})"
+
+    @classmethod
+    def _make(cls, values):
+        state = object.__new__(cls)
+        for set_value, value in zip(cls.SETTERS, values):
+            set_value(state, value)
+        return state
+
+    @classmethod
+    def from_dict(cls, data, where=None):
+        """Check ``data`` against FIELDS; missing fields get their default."""
+        try:
+            return cls._checked(data)
+        except SaveError as e:
+            raise SaveError(f"{where or cls.__name__}{e}") from None
+
+    @classmethod
+    def _checked(cls, data):
+        if not isinstance(data, dict):
+            raise SaveError(": expected an object")
+        if not data.keys() <= cls.KEYS:
+            raise SaveError(f": unknown fields {', '.join(sorted(data.keys() - cls.KEYS))}")
+        defaults = None
+        values = []
+        for key, check in cls.CHECKS:
+            if key in data:
+                value = data[key]
+            else:
+                defaults = defaults or cls.DEFAULTS()
+                value = defaults[key]
+            try:
+                values.append(check(value))
+            except SaveError as e:
+                raise SaveError(f".{key}{e}") from None
+        return cls._make(values)
+
+    def to_dict(self):
+        data = {}
+        for key, get, copy in self.OUT:
+            value = get(self)
+            data[key] = copy(value) if copy else value
+        return data
+
+    # --- Binary ---
+    def _pack(self, strings, out):
+        values = [get(self) for _, get, _ in self.OUT]
+        n, m = self.SCALARS, self.SCALARS + len(self.ENTRIES)
+        counts = tuple(map(len, values[n:m]))
+        flat = []
+        for (_, _, _, flatten), value in zip(self.ENTRIES, values[n:m]):
+            flat += flatten(value, strings)
+        out.append(self.STRUCT.pack(*_packed(values[:n], self.TEXTS, self.OPTIONAL, strings), *counts))
+        out.append(self._layout(counts)[0].pack(*flat))
+        for state in values[m:]:
+            state._pack(strings, out)
+
+    @classmethod
+    def _layout(cls, counts):
+        """Struct of the list and map entries for these counts, and where each field's are."""
+        layout = cls.LAYOUTS.get(counts)
+        if layout is None:
+            if len(cls.LAYOUTS) >= 256:
+                cls.LAYOUTS.clear()
+            fields, at = [], 0
+            for (_, width, build, _), count in zip(cls.ENTRIES, counts):
+                fields.append((build, at, at + width * count))
+                at += width * count
+            entries = "".join(code * count for (code, *_), count in zip(cls.ENTRIES, counts))
+            layout = cls.LAYOUTS[counts] = (struct.Struct("<" + entries), fields)
+        return layout
+
+    @classmethod
+    def _unpack(cls, blob, pos, table, as_dict=False):
+        values = list(cls.STRUCT.unpack_from(blob, pos))
+        pos += cls.STRUCT.size
+        counts = tuple(values[cls.SCALARS:])
+        entries, fields = cls.LAYOUTS.get(counts) or cls._layout(counts)
+        del values[cls.SCALARS:]
+        for i in cls.TEXTS:
+            values[i] = table[values[i]]
+        for i in cls.OPTIONAL:
+            if values[i] == NO_INT:
+                values[i] = None
+        flat = entries.unpack_from(blob, pos)
+        pos += entries.size
+        for build, start, end in fields:
+            values.append(build(flat[start:end], table))
+        for nested in cls.NESTED:
+            value, pos = nested._unpack(blob, pos, table, as_dict)
+            values.append(value)
+        return (cls._dict(values) if as_dict else cls._make(values)), pos
+
+    @classmethod
+    def _dict(cls, values):
+        """The dict to_dict() gives for these field values."""
+        return dict(zip(cls.NAMES, values))
+
+
+EFFECT = ("i", "i", "s", "s?", "i", "i?", "?")  # rpg_effects heap entry
+TIMER = ("i", "i", "s?", "i")                   # rpg_effects timer
+EQUIPMENT = ("weapon", "armor", "accessory")
+
+
+def _player_defaults():
+    player = new_player()
+    player["inventory"] = dict(player.pop("equipment"), items=player["inventory"])
+    return player
+
+
+class Inventory(State):
+    """Item counts and the equipped item of each slot."""
+
+    FIELDS = (
+        ("weapon", "s?"), ("armor", "s?"), ("accessory", "s?"),
+        ("items", ("map", "i")),
+    )
+    __slots__ = slots(FIELDS)
+
+    @staticmethod
+    def DEFAULTS():
+        return _player_defaults()["inventory"]
+
+
+class Player(State):
+    """The saved player. Its dict keeps "inventory" (item counts) and
+    "equipment" side by side; here both are the Inventory."""
+
+    FIELDS = (
+        ("name", "s"), ("class", "s?"), ("elemen", "s?"), ("location", "s"),
+        ("hp", "i"), ("max_hp", "i"), ("attack", "i"), ("base_attack", "i"),
+        ("defense", "i"), ("base_defense", "i"), ("speed", "i"),
+        ("level", "i"), ("xp", "q"), ("xp_to_next", "q"), ("gold", "q"),
+        ("buff_turns", "i"), ("special_cooldown", "i"), ("elemental_charge", "i"),
+        ("turn", "i"), ("effect_seq", "i"),
+        ("skills", ("list", "s")),
+        ("quests", ("list", "s")),
+        ("element_mastery", ("map", "i")),
+        ("effects", ("records", EFFECT)),
+        ("modifiers", ("map", "i")),
+        ("timers", ("keyed", TIMER)),
+        ("inventory", Inventory),
+    )
+    __slots__ = slots(FIELDS)
+    DEFAULTS = staticmethod(_player_defaults)
+
+    @classmethod
+    def _checked(cls, data):
+        if isinstance(data, dict) and ("inventory" in data or "equipment" in data):
+            data = dict(data)
+            equipment = data.pop("equipment", None)
+            if equipment is None:
+                equipment = dict.fromkeys(EQUIPMENT)
+            elif not isinstance(equipment, dict):
+                raise SaveError(".equipment: expected an object")
+            inventory = dict(equipment)
+            if "inventory" in data:
+                inventory["items"] = data.pop("inventory")
+            data["inventory"] = inventory
+        return super()._checked.__func__(cls, data)
+
+    def to_dict(self):
+        return self._split_inventory(State.to_dict(self))
+
+    @classmethod
+    def _dict(cls, values):
+        return cls._split_inventory(dict(zip(cls.NAMES, values)))
+
+    @staticmethod
+    def _split_inventory(data):
+        inventory = data["inventory"]
+        data["inventory"] = inventory.pop("items")
+        data["equipment"] = inventory
+        return data
+
+
+class Enemy(State):
+    """One enemy, as rolled by BattleEngine.roll_enemy()."""
+
+    FIELDS = (
+        ("name", "s"), ("type", "s"), ("elemen", "s?"),
+        ("hp", "i"), ("max_hp", "i"), ("attack", "i"), ("defense", "i"),
+        ("level", "i"), ("speed", "i"), ("gold", "i"),
+    )
+    __slots__ = slots(FIELDS)
+    DEFAULTS = staticmethod(new_enemy)
+
+
+class GameState(State):
+    """Day, flags and playtime of one game."""
+
+    FIELDS = (
+        ("current_turn", "s"), ("game_active", "?"), ("boss_defeated", "?"),
+        ("day", "i"), ("playtime", "q"),
+        ("elemental_events", ("list", "s")),
+    )
+    __slots__ = slots(FIELDS)
+    DEFAULTS = staticmethod(new_game_state)
+
+
+SECTIONS = {"player": Player, "game_state": GameState}  # what a save holds
+EXTRA_SECTIONS = {"enemy": Enemy}  # written when given (the session server keeps the foe)
+
+
+# --- Binary codec ---
+class _Strings:
+    def __init__(self):
+        self.ids = {None: NONE}
+
+    def id(self, text):
+        found = self.ids.get(text)
+        if found is None:
+            found = self.ids[text] = len(self.ids)
+            if found > MAX_ITEMS:
+                raise SaveError(f"more than {MAX_ITEMS} strings")
+        return found
+
+    def pack(self):
+        blob = "\0".join(list(self.ids)[1:]).encode("utf-8")
+        return _U32.pack(len(blob)) + blob
+
+
+def encode(sections, seq=0, timestamp=None):
+    """Binary snapshot of ``sections`` (name -> dict or State); SaveError if a field is invalid."""
+    strings = _Strings()
+    body = [_SEQ.pack(seq, strings.id(timestamp))]
+    names = [*SECTIONS, *(name for name in EXTRA_SECTIONS if name in sections)]
+    for name in names:
+        cls = SECTIONS.get(name) or EXTRA_SECTIONS[name]
+        state = sections[name]
+        if not isinstance(state, cls):
+            state = cls.from_dict(state, name)
+        body.append(_U16.pack(strings.id(name)))
+        try:
+            state._pack(strings, body)
+        except struct.error as e:
+            raise SaveError(f"{name}: {e}") from None
+    return _HEADER.pack(MAGIC, SAVE_VERSION, len(names)) + strings.pack() + b"".join(body)
+
+
+def decode(blob, as_dicts=False):
+    """{section: State, "version", "seq", "timestamp"} from a binary snapshot;
+    the sections as dicts (what to_dict() gives) with ``as_dicts``."""
+    try:
+        magic, version, count = _HEADER.unpack_from(blob, 0)
+        if magic != MAGIC:
+            raise SaveError("not a binary save")
+        if version != SAVE_VERSION:
+            # the first binary version; older saves are JSON, see MIGRATIONS
+            raise SaveError(f"binary save version {version} is not supported")
+        pos = _HEADER.size
+        (size,) = _U32.unpack_from(blob, pos)
+        pos += 4
+        table = [None, *bytes(blob[pos:pos + size]).decode("utf-8").split("\0")]
+        pos += size
+        seq, stamp = _SEQ.unpack_from(blob, pos)
+        pos += _SEQ.size
+        data = {"version": version, "seq": seq, "timestamp": table[stamp]}
+        for _ in range(count):
+            (name,) = _U16.unpack_from(blob, pos)
+            cls = SECTIONS.get(table[name]) or EXTRA_SECTIONS.get(table[name])
+            if cls is None:
+                raise SaveError(f"unknown section {table[name]!r}")
+            data[table[name]], pos = cls._unpack(blob, pos + 2, table, as_dicts)
+    except (struct.error, IndexError, UnicodeDecodeError) as e:
+        raise SaveError(f"truncated or corrupt save: {e}") from None
+    return data
+
+
+def is_binary(blob):
+    return blob[:len(MAGIC)] == MAGIC
+
+
+def read(blob):
+    """A save (binary, or JSON of any version) as {section: dict, ...},
+    migrated and checked."""
+    if is_binary(blob):
+        return decode(blob, as_dicts=True)
+    try:
+        data = json.loads(blob)
+    except ValueError as e:
+        raise SaveError(f"not a save: {e}") from None
+    return validate(migrate(data))
+
+
+def validate(data):
+    """Check the sections of a save dict against the schema, in place."""
+    for section, cls in SECTIONS.items():
+        data[section] = cls.from_dict(data[section], section).to_dict()
+    return data
+
+
+# --- Migrations ---
+def _v1_to_v2(data):
+    # journal sequence numbers; the battle log moved out of the save
+    data.setdefault("seq", 0)
+    data["game_state"].pop("battle_log", None)
+    return data
+
+
+def _v2_to_v3(data):
+    # counters that became timed effects, and the fields added since
+    data["player"] = upgrade_player(data["player"])
+    return data
+
+
+MIGRATIONS = {1: _v1_to_v2, 2: _v2_to_v3}
+
+
+def migrate(data):
+    """Bring a save dict of any older version up to SAVE_VERSION."""
+    if not isinstance(data, dict):
+        raise SaveError("not a save")
+    version = data.get("version", 1)
+    if type(version) is not int or not 1 <= version <= SAVE_VERSION:
+        raise SaveError(f"save version {version} is not supported (this game writes {SAVE_VERSION})")
+    for section in SECTIONS:
+        if not isinstance(data.get(section), dict):
+            raise SaveError(f"{section}: missing")
+    while version < SAVE_VERSION:
+        data = MIGRATIONS[version](data)
+        version += 1
+    data["version"] = version
+    return data
+
+
+# --- Command line ---
+def main(argv=None):
+    from rpg_save import read_save  # rpg_save builds on this module
+
+    parser = argparse.ArgumentParser(description="Inspect and export RPG saves")
+    commands = parser.add_subparsers(dest="command", required=True)
+    export = commands.add_parser("export", help="write a save (with its journal tail) as JSON")
+    export.add_argument("path")
+    export.add_argument("-o", "--out", help="output file (default: stdout)")
+    info = commands.add_parser("info", help="format, version and size of saves")
+    info.add_argument("paths", nargs="+", help="save files or directories")
+    args = parser.parse_args(argv)
+
+    if args.command == "export":
+        data = read_save(args.path)
+        if data is None:
+            sys.exit(f"{args.path}: not a readable save")
+        data.pop("path")
+        text = json.dumps(data, indent=2, ensure_ascii=False)
+        if args.out:
+            with open(args.out, "w", encoding="utf-8") as f:
+                f.write(text + "\n")
+        else:
+            print(text)
+        return
+
+    for path in args.paths:
+        if os.path.isdir(path):
+            saves = sorted(glob.glob(os.path.join(path, "*.sav")) + glob.glob(os.path.join(path, "*.json")))
+            saves = [save for save in saves if os.path.basename(save) != "index.json"]
+        else:
+            saves = [path]
+        for save in saves:
+            with open(save, "rb") as f:
+                blob = f.read()
+            try:
+                kind = f"binary v{decode(blob)['version']}" if is_binary(blob) else \
+                    f"JSON v{json.loads(blob).get('version', 1)}"
+            except (ValueError, AttributeError) as e:
+                kind = f"unreadable ({e})"
+            journal = os.path.getsize(save + ".journal") if os.path.exists(save + ".journal") else 0
+            print(f"{save}: {kind}, {len(blob):,} bytes, journal {journal:,} bytes")
+
+
+if __name__ == "__main__":
+    main()
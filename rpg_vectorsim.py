@@ -0,0 +1,245 @@
+"""
+NumPy lockstep battle simulator for the RPG (requires numpy).
+
+Runs N battles of one class / enemy type / player level cell at once, with
+HP, attack, defense, speed, elemental charge, cooldown and potions held as
+arrays. Every turn applies the scripted policy from rpg_engine to all live
+battles and resolves the same damage rule as BattleEngine.calculate_damage:
+
+    damage = max(1, int((attack [* 1.5 if special] - defense // 2) * element))
+    crit (random < speed / 100) -> int(damage * 1.5)
+
+with the element multiplier read from the compiled advantage matrix in
+rpg_content. Random draws are made in one batch per turn. Finished battles
+are dropped from the arrays so late turns only touch the battles that are
+still running.
+
+    python rpg_vectorsim.py --cls Mage --enemy Orc --level 3 -n 1000000
+    python rpg_vectorsim.py --cls Rogue --enemy Dragon --level 5 --check
+"""
+
+import argparse
+import math
+import time
+
+import numpy as np
+
+from rpg_balance import clone_player, make_player
+from rpg_engine import CONTENT, SPECIAL_COOLDOWN_TURNS, BattleEngine, enemy_types, new_game_state, scripted_policy
+
+ELEMENT_INDEX = CONTENT.element_index
+ADVANTAGE = np.array(CONTENT.advantage)
+
+MAX_TURNS = 200
+WON, LOST, TIMEOUT = 1, 2, 3
+
+
+def player_template(cls, level, seed=1):
+    engine = BattleEngine(seed=f"{seed}|{cls}|{level}")
+    return clone_player(make_player(engine, cls, level))
+
+
+def roll_enemies(rng, enemy, player_level, n):
+    stats = CONTENT.enemy_stats[enemy]
+    level = np.maximum(1, player_level - 1 + rng.integers(0, 2, size=n, endpoint=True))
+    hp = rng.integers(stats.hp_lo, stats.hp_hi, size=n, endpoint=True) + level * 5
+    attack = rng.integers(stats.attack_lo, stats.attack_hi, size=n, endpoint=True) + level * 2
+    defense = rng.integers(stats.defense_lo, stats.defense_hi, size=n, endpoint=True) + level
+    if stats.element_id < 0:
+        element = rng.integers(0, len(CONTENT.element_names), size=n)
+    else:
+        element = np.full(n, stats.element_id)
+    return level, hp, attack, defense, element
+
+
+def simulate(player, enemy, n, seed=0, max_turns=MAX_TURNS):
+    """Run n battles of ``player`` (a player dict) against fresh ``enemy`` rolls.
+
+    Returns per-battle arrays: outcome, turns, hp_left, max_hp, enemy level.
+    """
+    rng = np.random.default_rng(seed)
+    level, e_hp, e_atk, e_def, e_elem = roll_enemies(rng, enemy, player["level"], n)
+
+    p_elem = ELEMENT_INDEX[player["elemen"]]
+    p_atk, p_def, p_speed = player["attack"], player["defense"], player["speed"]
+    p_max = player["max_hp"]
+    e_crit = CONTENT.enemy_stats[enemy].speed / 100  # enemies crit on speed like the player
+    # per-battle state, compacted as battles finish; ids map back to the output
+    ids = np.arange(n)
+    p_hp = np.full(n, player["hp"], dtype=np.int64)
+    charge = np.full(n, player["elemental_charge"], dtype=np.int64)
+    cooldown = np.full(n, player["special_cooldown"], dtype=np.int64)
+    potions = np.full(n, player["inventory"].get("Healing Potion", 0), dtype=np.int64)
+    e_def_half = e_def // 2
+    # element multipliers never change during a battle
+    player_mult = ADVANTAGE[p_elem, e_elem]
+    enemy_mult = ADVANTAGE[e_elem, p_elem]
+
+    outcome = np.full(n, TIMEOUT, dtype=np.int8)
+    turns = np.zeros(n, dtype=np.int64)
+    hp_left = np.zeros(n, dtype=np.int64)
+
+    for turn in range(1, max_turns + 1):
+        m = len(ids)
+        if m == 0:
+            break
+        crit_roll, heal_roll, enemy_elem_roll = rng.random(m), rng.integers(15, 25, size=m, endpoint=True), rng.random(m)
+        enemy_crit_roll = rng.random(m)
+
+        # --- policy (rpg_engine.scripted_policy) ---
+        heal = (p_hp < p_max * 0.3) & (potions > 0)
+        elemental = ~heal & (charge >= 30) & (player_mult >= 1.0)
+        special = ~heal & ~elemental & (cooldown == 0)
+        attacking = ~heal
+
+        # --- player action ---
+        base = np.where(special, math.floor(p_atk * 1.5), p_atk)
+        mult = np.where(elemental, player_mult, 1.0)
+        damage = np.maximum(1, np.trunc((base - e_def_half) * mult).astype(np.int64))
+        damage = np.where(crit_roll < p_speed / 100, (damage * 1.5).astype(np.int64), damage)
+        e_hp = np.where(attacking, np.maximum(0, e_hp - damage), e_hp)
+        charge = np.where(attacking & ~elemental, np.minimum(100, charge + 10), charge)
+        charge = np.where(elemental, charge - 30, charge)
+        # every turn ends with a tick of the cooldown (rpg_effects), then special restarts it
+        cooldown = np.where(special, SPECIAL_COOLDOWN_TURNS, np.maximum(0, cooldown - 1))
+        p_hp = np.where(heal, np.minimum(p_max, p_hp + heal_roll), p_hp)
+        potions = potions - heal
+
+        # --- enemy reply ---
+        alive = e_hp > 0
+        e_mult = np.where(enemy_elem_roll < 0.3, enemy_mult, 1.0)
+        e_damage = np.maximum(1, np.trunc((e_atk - p_def // 2) * e_mult).astype(np.int64))
+        e_damage = np.where(enemy_crit_roll < e_crit, (e_damage * 1.5).astype(np.int64), e_damage)
+        p_hp = np.where(alive, np.maximum(0, p_hp - e_damage), p_hp)
+
+        won = ~alive
+        lost = alive & (p_hp <= 0)
+        done = won | lost
+        if done.any():
+            finished = ids[done]
+            outcome[finished] = np.where(won[done], WON, LOST)
+            turns[finished] = turn
+            hp_left[finished] = p_hp[done]
+            keep = ~done
+            ids, p_hp, charge, cooldown, potions = ids[keep], p_hp[keep], charge[keep], cooldown[keep], potions[keep]
+            e_hp, e_atk, e_def_half = e_hp[keep], e_atk[keep], e_def_half[keep]
+            player_mult, enemy_mult = player_mult[keep], enemy_mult[keep]
+    turns[ids] = max_turns
+    hp_left[ids] = p_hp
+    return {"outcome": outcome, "turns": turns, "hp_left": hp_left, "max_hp": p_max, "enemy_level": level}
+
+
+def summarize(result, enemy):
+    outcome = result["outcome"]
+    won = outcome == WON
+    wins = int(won.sum())
+    n = len(outcome)
+    stats = enemy_types[enemy]
+    gold = (stats["gold"] + result["enemy_level"][won] * 2).sum() + (100 * wins if enemy == "Dragon" else 0)
+    xp = (stats["xp"] * result["enemy_level"][won]).sum()
+    return {
+        "battles": n,
+        "win_rate": wins / n,
+        "loss_rate": float((outcome == LOST).mean()),
+        "timeout_rate": float((outcome == TIMEOUT).mean()),
+        "mean_turns_to_kill": float(result["turns"][won].mean()) if wins else None,
+        "mean_hp_left_pct": float(100.0 * result["hp_left"][won].mean() / result["max_hp"]) if wins else None,
+        "gold_per_day": float(gold) / n,
+        "xp_per_day": float(xp) / n,
+    }
+
+
+def simulate_cell(cls, enemy, level, battles, seed):
+    """Same contract as rpg_balance.simulate_cell, vectorized."""
+    player = player_template(cls, level, seed)
+    row = {"class": cls, "enemy": enemy, "level": level}
+    row.update(summarize(simulate(player, enemy, battles, seed=seed), enemy))
+    return row
+
+
+# --- Cross-check against the scalar engine ---
+def scalar_battles(player, enemy, n, seed=0):
+    engine = BattleEngine(seed=seed)
+    outcomes, turns, hp_left = [], [], []
+    for _ in range(n):
+        engine.player = clone_player(player)
+        engine.game_state = new_game_state()
+        engine.roll_enemy(enemy)
+        result = engine.fight(scripted_policy, max_turns=MAX_TURNS)
+        outcomes.append(result["outcome"])
+        turns.append(result["turns"])
+        hp_left.append(result["hp_left"])
+    return outcomes, turns, hp_left
+
+
+def z_proportion(p1, n1, p2, n2):
+    pooled = (p1 * n1 + p2 * n2) / (n1 + n2)
+    se = math.sqrt(max(pooled * (1 - pooled) * (1 / n1 + 1 / n2), 1e-12))
+    return float((p1 - p2) / se)
+
+
+def z_means(a, b):
+    a, b = np.asarray(a, dtype=float), np.asarray(b, dtype=float)
+    if len(a) < 2 or len(b) < 2:
+        return 0.0
+    se = math.sqrt(a.var(ddof=1) / len(a) + b.var(ddof=1) / len(b))
+    return 0.0 if se == 0 else float((a.mean() - b.mean()) / se)
+
+
+def cross_check(cls, enemy, level, n_vector=200000, n_scalar=20000, seed=1, limit=4.0):
+    """Compare both simulators on one cell; every |z| must stay under ``limit``."""
+    player = player_template(cls, level, seed)
+
+    t = time.perf_counter()
+    vec = simulate(player, enemy, n_vector, seed=seed)
+    vec_rate = n_vector / (time.perf_counter() - t)
+    t = time.perf_counter()
+    outcomes, turns, hp_left = scalar_battles(player, enemy, n_scalar, seed=seed)
+    scalar_rate = n_scalar / (time.perf_counter() - t)
+
+    v_won = vec["outcome"] == WON
+    s_won = np.array([o == "won" for o in outcomes])
+    checks = {
+        "win_rate": z_proportion(v_won.mean(), n_vector, s_won.mean(), n_scalar),
+        "turns_to_kill": z_means(vec["turns"][v_won], np.array(turns)[s_won]),
+        "hp_left": z_means(vec["hp_left"][v_won], np.array(hp_left)[s_won]),
+    }
+    return {
+        "cell": f"{cls} vs {enemy} @ {level}",
+        "vector_win_rate": float(v_won.mean()),
+        "scalar_win_rate": float(s_won.mean()),
+        "z": {k: round(v, 2) for k, v in checks.items()},
+        "ok": all(abs(v) < limit for v in checks.values()),
+        "vector_battles_per_s": round(vec_rate),
+        "scalar_battles_per_s": round(scalar_rate),
+        "speedup": round(vec_rate / scalar_rate, 1),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Vectorized RPG battle simulator")
+    parser.add_argument("--cls", default="Warrior")
+    parser.add_argument("--enemy", default="Orc")
+    parser.add_argument("--level", type=int, default=1)
+    parser.add_argument("-n", "--battles", type=int, default=1000000)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--check", action="store_true", help="cross-check against the scalar engine")
+    parser.add_argument("--scalar-battles", type=int, default=20000)
+    args = parser.parse_args(argv)
+
+    if args.check:
+        report = cross_check(args.cls, args.enemy, args.level, args.battles, args.scalar_battles, args.seed)
+        for key, value in report.items():
+            print(f"{key:>22}: {value}")
+        raise SystemExit(0 if report["ok"] else 1)
+
+    started = time.perf_counter()
+    row = simulate_cell(args.cls, args.enemy, args.level, args.battles, args.seed)
+    elapsed = time.perf_counter() - started
+    for key, value in row.items():
+        print(f"{key:>20}: {value}")
+    print(f"{args.battles / elapsed:,.0f} battles/s")
+
+
+if __name__ == "__main__":
+    main()